@@ -1,15 +1,48 @@
-from fastapi import APIRouter, HTTPException, Request, Depends, BackgroundTasks
-from app.utilities.stream_response import handle_full_request, handle_range_request
+from fastapi import APIRouter, HTTPException, Request, Response, Depends, BackgroundTasks
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from app.utilities.stream_response import stream_video
 from urllib.parse import quote
 import os
 from media_player.audio_player import AudioPlayer
+from media_player.session_manager import SessionManager, SessionCapacityError
 from app.session_middleware import get_session_id
 from media_player.speech_to_text.process_audio_queue import ProcessAudioQueue
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
-from typing import Dict
-from threading import Lock
-import whisperx
+from media_player.speech_to_text.speaker_tracker import SpeakerTracker
+from media_player.speech_to_text.model_registry import (
+    model_registry,
+    WHISPERX_ALIGN_EN,
+    WHISPERX_DIARIZE,
+    PYANNOTE_EMBEDDING,
+)
+from media_player.speech_to_text.pipeline_stages import WhisperxStages
+from media_player.startup import startup_report, ModelWarmup
+from media_player.speech_to_text.quality_tiers import QualityController, get_tier, register_tier_models
+from media_player.speech_to_text.inference_scheduler import InferenceScheduler
+from media_player.speech_to_text.job_transport import (
+    InProcessTransport,
+    BROKER_AUTHKEY,
+    connect_broker,
+    start_local_broker,
+    format_address,
+)
+from media_player.speech_to_text.transcription_worker import start_worker_threads, start_worker_processes
+from media_player.speech_to_text.batch_transcriber import BatchTranscriber
+from media_player.speech_to_text.transcript_cache import TranscriptCache
+from media_player.speech_to_text.transcript_store import TranscriptStore
+from media_player.ingest import IngestJob
+from media_player.media_catalog import MediaCatalog
+from media_player.pcm_cache import PcmCache, PCM_CACHE_DIR
+from media_player.metrics import metrics, SamplingProfiler
+from media_player.transcript_broadcaster import TranscriptBroadcaster
+from retrieval.phrase_index import open_phrase_index, PHRASE_INDEX_DIR
+from retrieval.claim_cache import ClaimCache
+from retrieval.fact_check import FactChecker, load_verifier, fact_check_event
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, Optional
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import json
+import time
 
 router = APIRouter()
 
@@ -17,61 +50,405 @@ BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 VIDEO_DIR = os.path.join(BASE_DIR, 'media_player', 'video_clips')
 TEMP_AUDIO_DIR = os.path.join(BASE_DIR, 'media_player', 'speech_to_text', 'temp_audio_files')
 
-audio_player = AudioPlayer(temp_dir=TEMP_AUDIO_DIR)
+INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", "thread")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0")) or None
 
-active_threads: Dict[str, Observer] = {}
-active_threads_lock = Lock()
+# With INFERENCE_EXECUTOR=transport, chunks are run by transcription
+# workers through a job transport. JOB_BROKER picks the backend: unset runs
+# the workers on threads here, "local" starts a broker and worker processes
+# on this host, and host:port uses a broker that workers on other hosts
+# share (python -m media_player.speech_to_text.job_transport, which needs
+# JOB_BROKER_AUTHKEY here too). Nothing starts until the app does; see
+# start_job_transport.
+JOB_BROKER = os.getenv("JOB_BROKER")
+JOB_TRANSPORT_OPTIONS = {
+    "lease_seconds": float(os.getenv("JOB_LEASE_SECONDS", "60")),
+    "max_attempts": int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+}
+job_transport = None
+job_broker = None
+job_broker_address = None
+transport_workers = []
+transport_processes = []
+
+
+def connect_job_transport():
+    """
+    The transport the scheduler submits to: the in-process one, or a new
+    connection to the broker.
+    """
+    if job_broker_address is None:
+        if job_transport is None:
+            raise RuntimeError("The job transport has not been started")
+        return job_transport
+    return connect_broker(job_broker_address)
+
+
+def start_job_transport():
+    """
+    Start the job transport INFERENCE_EXECUTOR=transport uses, and the
+    broker and workers JOB_BROKER asks for. Called from the app's lifespan.
+    """
+    global job_transport, job_broker, job_broker_address, transport_workers, transport_processes
+    if INFERENCE_EXECUTOR != "transport" or job_transport is not None:
+        return
+    if not JOB_BROKER:
+        job_transport = InProcessTransport(**JOB_TRANSPORT_OPTIONS)
+        transport_workers = start_worker_threads(job_transport, INFERENCE_WORKERS or 1)
+        return
+    if JOB_BROKER == "local":
+        job_broker = start_local_broker(**JOB_TRANSPORT_OPTIONS)
+        job_broker_address = format_address(job_broker.address)
+        transport_processes = start_worker_processes(job_broker_address, INFERENCE_WORKERS or os.cpu_count() or 1)
+    elif BROKER_AUTHKEY is None:
+        raise RuntimeError(f"JOB_BROKER={JOB_BROKER} needs the broker's JOB_BROKER_AUTHKEY")
+    else:
+        job_broker_address = JOB_BROKER
+    job_transport = connect_job_transport()
+
+
+def stop_job_transport():
+    """
+    Stop the scheduler's workers, then the transport's workers and broker.
+    """
+    global job_transport, job_broker, job_broker_address, transport_workers, transport_processes
+    if job_transport is None:
+        return
+    inference_scheduler.shutdown(wait=False)
+    for worker in transport_workers:
+        worker.stop()
+    for process in transport_processes:
+        process.terminate()
+    for process in transport_processes:
+        process.join(5)
+    if job_broker is not None:
+        job_broker.shutdown()
+    job_transport = job_broker = job_broker_address = None
+    transport_workers, transport_processes = [], []
+
+
+# Shared worker pool that runs every session's chunks
+inference_scheduler = InferenceScheduler(
+    workers=INFERENCE_WORKERS,
+    executor=INFERENCE_EXECUTOR,
+    max_session_depth=int(os.getenv("SESSION_QUEUE_DEPTH", "8")),
+    policy=os.getenv("BACKPRESSURE_POLICY", "coalesce"),
+    transport_factory=connect_job_transport if INFERENCE_EXECUTOR == "transport" else None,
+    result_timeout=float(os.getenv("JOB_RESULT_TIMEOUT", "300")),
+)
+
+# Collects concurrent chunks from all sessions into batched Whisper passes
+batch_transcriber = BatchTranscriber(
+    max_wait=float(os.getenv("BATCH_MAX_WAIT_MS", "150")) / 1000,
+    max_batch_size=int(os.getenv("BATCH_MAX_SIZE", "16")),
+)
+
+# MEMORY_BOUNDED=1 is for long-running deployments: pausing releases a
+# session's queue and models, closed sessions drop their event history, and
+# debug WAVs, per-video transcripts and finished ingest jobs are capped
+MEMORY_BOUNDED = os.getenv("MEMORY_BOUNDED") == "1"
+
+# Processed ranges per media file; replays and seeks reuse them
+transcript_cache = TranscriptCache()
+
+# Each video's transcript so far, indexed by media time for subtitle lookups
+transcript_store = TranscriptStore(
+    max_videos=int(os.getenv("TRANSCRIPT_STORE_VIDEOS", "64")),
+    retention=float(os.getenv("TRANSCRIPT_RETENTION_HOURS", "6")) * 3600 if MEMORY_BOUNDED else None,
+)
+
+# Headless ingest jobs by id
+ingest_jobs: Dict[str, IngestJob] = {}
+INGEST_JOBS_KEEP = int(os.getenv("INGEST_JOBS_KEEP", "32")) if MEMORY_BOUNDED else None
+# Ingests run as background sessions on the inference scheduler; these cap
+# how many run at once and how many chunks each may have in flight
+INGEST_MAX_JOBS = int(os.getenv("INGEST_MAX_JOBS", "2"))
+INGEST_MAX_WORKERS = int(os.getenv("INGEST_MAX_WORKERS", "2"))
+INGEST_RETRY_AFTER = 30
+
+# Probed metadata for every clip, kept current by a filesystem watch
+media_catalog = MediaCatalog(VIDEO_DIR).load()
+media_catalog.start_watching()
 
 device = "cpu"
-model = whisperx.load_model("base", device, compute_type="float32")
+model_registry.start_reaper()
 
+# Steps every session down the quality tiers (smaller or int8 Whisper, no
+# alignment, sparser diarization) when transcripts fall behind live and back
+# up once they catch up; ADAPTIVE_QUALITY=0 pins QUALITY_TIER
+QUALITY_TIER = os.getenv("QUALITY_TIER", "standard")
+register_tier_models(model_registry)
+quality_controller = QualityController(
+    initial=QUALITY_TIER,
+    best=os.getenv("QUALITY_BEST_TIER", QUALITY_TIER),
+    worst=os.getenv("QUALITY_WORST_TIER", "minimal") if os.getenv("ADAPTIVE_QUALITY", "1") == "1" else QUALITY_TIER,
+    scheduler=inference_scheduler,
+    max_lag=float(os.getenv("QUALITY_MAX_LAG", "6")),
+    min_lag=float(os.getenv("QUALITY_MIN_LAG", "2")),
+)
 
-@router.get("/videos")
-async def get_videos():
+# MODEL_WARMUP=background loads the pipeline's models on a background thread
+# once the app has started (see main.py), so browsing and streaming work right
+# away and /readyz turns ready once transcription is; MODEL_WARMUP=lazy loads
+# each on first use. Warmed models stay loaded until shutdown, including the
+# lower tiers' ASR models, so a downgrade under load does not start by
+# loading one; leave a tier's model out of WARMUP_MODELS to let the registry
+# evict it while no session runs at that tier.
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "background")
+WARMUP_MODELS = [
+    name.strip()
+    for name in os.getenv(
+        "WARMUP_MODELS",
+        ",".join((get_tier(QUALITY_TIER).asr_model, WHISPERX_ALIGN_EN, WHISPERX_DIARIZE, PYANNOTE_EMBEDDING,
+                  *quality_controller.fallback_models())),
+    ).split(",")
+    if name.strip()
+]
+model_warmup = None
+if MODEL_WARMUP == "background":
+    model_warmup = ModelWarmup(
+        model_registry, WARMUP_MODELS, stages=WhisperxStages(), asr_name=get_tier(QUALITY_TIER).asr_model,
+        report=startup_report,
+    )
+
+
+# Decoded soundtracks kept on disk so seeks, replays and ingests skip ffmpeg;
+# PCM_CACHE_MAX_GB=0 turns it off
+PCM_CACHE_MAX_GB = float(os.getenv("PCM_CACHE_MAX_GB", "4"))
+pcm_cache = None
+if PCM_CACHE_MAX_GB > 0:
+    pcm_cache = PcmCache(os.getenv("PCM_CACHE_DIR", PCM_CACHE_DIR), max_bytes=int(PCM_CACHE_MAX_GB * 1024 ** 3))
+
+
+# Every PROVISIONAL_INTERVAL seconds of speech, the chunk still being cut is
+# transcribed on its own so subtitles appear before the chunk closes (0
+# disables). Only with the thread executor, which has the models in this
+# process
+PROVISIONAL_INTERVAL = float(os.getenv("PROVISIONAL_INTERVAL", "1.0"))
+provisional_pool = (
+    ThreadPoolExecutor(max_workers=int(os.getenv("PROVISIONAL_WORKERS", "2")), thread_name_prefix="provisional")
+    if PROVISIONAL_INTERVAL and INFERENCE_EXECUTOR == "thread" else None
+)
+
+
+def _create_player(session_id):
+    # Chunks are handed to the transcriber in memory; set SAVE_AUDIO_CHUNKS=1
+    # to also write each one to TEMP_AUDIO_DIR for debugging.
+    player = AudioPlayer(
+        temp_dir=TEMP_AUDIO_DIR, debug_sink=os.getenv("SAVE_AUDIO_CHUNKS") == "1", pcm_cache=pcm_cache,
+        debug_keep=int(os.getenv("SAVED_AUDIO_CHUNKS_KEEP", "100")) if MEMORY_BOUNDED else None,
+        provisional_interval=PROVISIONAL_INTERVAL if provisional_pool is not None else 0,
+    )
+    player.set_session(session_id)
+    return player
+
+
+# Pushes each session's subtitles to its /transcripts/stream subscribers
+transcript_broadcaster = TranscriptBroadcaster()
+
+
+# Speaker embeddings this close to a track's centroid join it; a chunk whose
+# whole-clip embedding matches the current speaker by SKIP_DIARIZATION_THRESHOLD
+# skips diarization (empty disables skipping)
+SPEAKER_TRACK_THRESHOLD = float(os.getenv("SPEAKER_TRACK_THRESHOLD", "0.5"))
+SKIP_DIARIZATION_THRESHOLD = os.getenv("SKIP_DIARIZATION_THRESHOLD", "0.75")
+
+
+# Every final phrase is embedded into a local vector index for /search;
+# VECTOR_INDEX_MODE=ivf switches to approximate search once enough phrases
+# are in to train it. Unset keeps an existing index's mode; setting it to
+# the other mode converts the index on startup
+phrase_index = open_phrase_index(
+    os.getenv("RETRIEVAL_INDEX_DIR", PHRASE_INDEX_DIR),
+    mode=os.getenv("VECTOR_INDEX_MODE") or None,
+    nprobe=int(os.getenv("VECTOR_INDEX_NPROBE", "16")),
+)
+
+# FACT_CHECK_VERIFIER=module:function fact-checks every final phrase of five
+# words or more and streams the verdicts; repeated claims are answered from a
+# cache matching normalized text, then near-duplicate wording
+FACT_CHECK_VERIFIER = os.getenv("FACT_CHECK_VERIFIER")
+fact_checker = None
+if FACT_CHECK_VERIFIER:
+    fact_checker = FactChecker(
+        load_verifier(FACT_CHECK_VERIFIER),
+        cache=ClaimCache(
+            max_entries=int(os.getenv("CLAIM_CACHE_SIZE", "10000")),
+            ttl=float(os.getenv("CLAIM_CACHE_TTL_HOURS", "168")) * 3600,
+            threshold=float(os.getenv("CLAIM_CACHE_THRESHOLD", "0.85")),
+        ),
+        workers=int(os.getenv("FACT_CHECK_WORKERS", "2")),
+    )
+
+
+def _publish_final(session_id, video_name, chunk, phrases):
+    transcript_broadcaster.publish_final(session_id, chunk, phrases)
+    if video_name is not None:
+        transcript_store.add_chunk(video_name, chunk, phrases)
+    if fact_checker is not None:
+        fact_checker.submit(
+            chunk, phrases,
+            lambda chunk, results: transcript_broadcaster.publish(session_id, fact_check_event(chunk, results)),
+        )
     try:
-        files = os.listdir(VIDEO_DIR)
-        video_files = [
-            {"name": file, "url": f"http://localhost:8000/videos/{quote(file)}"}
-            for file in files
-            if file.endswith((".mp4", ".webm"))  # Filter by video file types
-        ]
-        return video_files
+        phrase_index.add_phrases(video_name, chunk, phrases)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        print(f"Error indexing phrases for session {session_id}: {e}")
+
+
+def _create_audio_queue(session, media_key=None):
+    session_id = session.session_id
+    video_name = session.video_name
+    if video_name is not None and media_key is not None and video_name not in transcript_store:
+        # Start from whatever earlier plays of the same file transcribed
+        transcript_store.load(video_name, transcript_cache.phrases(media_key, 0.0, float("inf")))
+    speaker_tracker = session.state.get("speaker_tracker")
+    if speaker_tracker is None:
+        speaker_tracker = session.state["speaker_tracker"] = SpeakerTracker(threshold=SPEAKER_TRACK_THRESHOLD)
+    return ProcessAudioQueue(
+        session_id=session_id, device=device, scheduler=inference_scheduler, transcriber=batch_transcriber,
+        cache=transcript_cache, media_key=media_key, speaker_tracker=speaker_tracker,
+        skip_diarization_threshold=float(SKIP_DIARIZATION_THRESHOLD) if SKIP_DIARIZATION_THRESHOLD else None,
+        quality=quality_controller,
+        on_result=lambda chunk, phrases: _publish_final(session_id, video_name, chunk, phrases),
+        on_partial=lambda chunk, segments, provisional=False: transcript_broadcaster.publish_partial(
+            session_id, chunk, segments, provisional),
+        provisional_pool=provisional_pool,
+    )
+
+
+# A player and transcription queue per viewer, capped and reaped when idle
+session_manager = SessionManager(
+    _create_player,
+    _create_audio_queue,
+    max_active=int(os.getenv("MAX_ACTIVE_SESSIONS", "8")),
+    idle_timeout=float(os.getenv("SESSION_IDLE_TIMEOUT", "300")) or None,
+    release_on_pause=MEMORY_BOUNDED,
+    on_close=(lambda session: transcript_broadcaster.forget(session.session_id)) if MEMORY_BOUNDED else None,
+)
+session_manager.start_reaper()
+
+# Read at scrape time from the objects that already track them
+metrics.gauge(
+    "inference_queue_depth", "Chunks waiting per session", ["session"],
+    collect=lambda: {(session_id, ): state["depth"] for session_id, state in inference_scheduler.stats()["sessions"].items()},
+)
+metrics.gauge(
+    "inference_busy_workers", "Inference workers running a chunk",
+    collect=lambda: {(): inference_scheduler.stats()["busy_workers"]},
+)
+metrics.gauge(
+    "inference_chunks_dropped", "Chunks dropped by backpressure per active session", ["session"],
+    collect=lambda: {(session_id, ): state["dropped"] for session_id, state in inference_scheduler.stats()["sessions"].items()},
+)
+metrics.gauge(
+    "models_loaded", "Whether each registered model is loaded", ["model"],
+    collect=lambda: {(name, ): int(model["loaded"]) for name, model in model_registry.stats()["models"].items()},
+)
+metrics.gauge(
+    "process_resident_memory_bytes", "Resident set size",
+    collect=lambda: {(): model_registry.stats()["resident_memory_bytes"] or 0},
+)
+metrics.gauge(
+    "transcript_cache_lookups", "Transcript cache lookups since startup", ["outcome"],
+    collect=lambda: {
+        (outcome, ): count for outcome, count in transcript_cache.stats().items() if outcome != "media_in_memory"
+    },
+)
+metrics.gauge("media_catalog_files", "Files in the media catalog", collect=lambda: {(): len(media_catalog)})
+metrics.gauge("active_sessions", "Sessions holding a pipeline", collect=lambda: {(): len(session_manager)})
+metrics.gauge(
+    "quality_tier", "Quality tier every session is transcribed at", ["tier"],
+    collect=lambda: {(quality_controller.current.name, ): 1},
+)
+metrics.gauge("phrase_index_vectors", "Phrases in the search index", collect=lambda: {(): len(phrase_index.index)})
+if pcm_cache is not None:
+    metrics.gauge("pcm_cache_bytes", "Decoded audio cached on disk", collect=lambda: {(): pcm_cache.stats()["bytes"]})
+
+
+@router.get("/videos")
+async def get_videos(
+    response: Response,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    q: Optional[str] = None,
+    ext: Optional[str] = None,
+    min_duration: Optional[float] = None,
+    max_duration: Optional[float] = None,
+):
+    if offset < 0 or (limit is not None and limit < 0):
+        raise HTTPException(status_code=400, detail="offset and limit must be non-negative")
+    total, entries = media_catalog.list(offset, limit, q, ext, min_duration, max_duration)
+    response.headers["X-Total-Count"] = str(total)
+    return [
+        {**entry, "url": f"http://localhost:8000/videos/{quote(entry['name'])}"}
+        for entry in entries
+    ]
 
 
 @router.get("/videos/{video_name}")
 async def get_video(video_name: str, request: Request):
-    video_path = os.path.join(VIDEO_DIR, video_name)
-    
-    if not os.path.exists(video_path):
+    if video_name not in media_catalog:
         raise HTTPException(status_code=404, detail="Video not found")
 
-    file_size = os.path.getsize(video_path)
-    range_header = request.headers.get('range')
+    try:
+        return stream_video(os.path.join(VIDEO_DIR, video_name), request.headers)
+    except FileNotFoundError:
+        # Deleted before the watch caught up
+        raise HTTPException(status_code=404, detail="Video not found")
 
-    if range_header:
-        return handle_range_request(video_path, file_size, range_header)
+@router.get("/videos/{video_name}/transcript")
+async def get_video_transcript(
+    video_name: str,
+    t: Optional[float] = None,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    words: bool = True,
+):
+    # ?t= gives what is spoken at one position; ?start=&end= a range
+    transcript = transcript_store.get(video_name)
+    if transcript is None:
+        if video_name not in media_catalog:
+            raise HTTPException(status_code=404, detail="Video not found")
+        return {"video": video_name, "phrases": []}
+    if t is not None:
+        phrases = transcript.phrases_at(t, words=words)
     else:
-        return handle_full_request(video_path, file_size)
-    
-class FileCreationHandler(FileSystemEventHandler):
-    def __init__(self, session_id, device=None, model=None):
-        super().__init__()
-        self.device = device
-        self.model = model
-        self.audio_queue = ProcessAudioQueue(session_id=session_id, device=self.device, model=self.model)
-
-    def on_created(self, event):
-        if event.is_directory:
-            return
-        if event.src_path.endswith('.wav'):
-            file_name = os.path.basename(event.src_path)
-            self.audio_queue.enqueue(file_name)
-            self.audio_queue.dequeue()
-            
-# Dictionary to keep track of active event handlers for each session
-active_event_handlers: Dict[str, FileCreationHandler] = {}
+        phrases = transcript.phrases_between(start or 0.0, end if end is not None else float("inf"), words=words)
+    return {"video": video_name, "phrases": phrases}
+
+@router.get("/models")
+async def get_models():
+    return model_registry.stats()
+
+@router.get("/metrics")
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@router.get("/debug/profile")
+async def get_profile(seconds: float = 10.0, interval: float = 0.005):
+    # Off unless explicitly enabled; sampling every thread has a cost
+    if os.getenv("ENABLE_PROFILER") != "1":
+        raise HTTPException(status_code=404, detail="Profiler is disabled")
+    profiler = SamplingProfiler(interval=max(interval, 0.001)).start()
+    try:
+        await asyncio.sleep(min(max(seconds, 0.1), 120.0))
+    finally:
+        profiler.stop()
+    return PlainTextResponse(profiler.folded())
+
+@router.get("/scheduler")
+async def get_scheduler():
+    return {
+        **inference_scheduler.stats(),
+        "batching": batch_transcriber.stats(),
+        "transcript_cache": transcript_cache.stats(),
+        "transcript_stream": transcript_broadcaster.stats(),
+        "transcript_store": transcript_store.stats(),
+        "quality": quality_controller.stats(),
+        "fact_check": fact_checker.stats() if fact_checker is not None else None,
+        "job_transport": job_transport.stats() if job_transport is not None else None,
+    }
 
 @router.post("/audio-control")
 async def control_audio(request: Request, background_tasks: BackgroundTasks, session_id: str = Depends(get_session_id)):
@@ -80,30 +457,168 @@ async def control_audio(request: Request, background_tasks: BackgroundTasks, ses
     time = data.get('time')
     video_name = data.get('videoName')
 
-    audio_path = os.path.join(VIDEO_DIR, video_name)
-    if not os.path.exists(audio_path):
+    if not video_name or video_name not in media_catalog:
         raise HTTPException(status_code=404, detail="Audio not found")
+    audio_path = os.path.join(VIDEO_DIR, video_name)
 
     try:
-        audio_player.set_session(session_id)
-        event_handler = None
-
         if action == 'play':
-            audio_player.play(audio_path, time)
-            with active_threads_lock:
-                if session_id in active_threads:
-                    active_threads[session_id].stop()
-                    active_threads[session_id].join()
-                event_handler = FileCreationHandler(session_id, device, model)
-                observer = Observer()
-                observer.schedule(event_handler, path=TEMP_AUDIO_DIR, recursive=False)
-                observer.start()
-                active_threads[session_id] = observer
-                active_event_handlers[session_id] = event_handler
+            # Hashed once per file version, then remembered
+            media_key = await run_in_threadpool(transcript_cache.media_key, audio_path)
+            # Stopping the previous playback joins its thread, so keep it
+            # off the event loop
+            await run_in_threadpool(
+                session_manager.play, session_id, audio_path, time, video_name=video_name, media_key=media_key,
+            )
         elif action == 'pause':
-            audio_player.pause()
+            await run_in_threadpool(session_manager.pause, session_id)
 
+    except SessionCapacityError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         print(f"Error processing audio control command: {e}")
 
     return {"status": "ok"}
+
+
+@router.get("/transcripts/stream")
+async def stream_transcripts(request: Request, partials: bool = True, session_id: str = Depends(get_session_id)):
+    """
+    Server-Sent Events feed of the session's transcript. `partial` events
+    carry early ASR text, first for the part of a chunk played so far
+    ("provisional": true) and then for the whole chunk; the `final` event
+    for the same chunk replaces them with aligned, speaker-attributed
+    segments.
+    """
+    last_event_id = request.headers.get("last-event-id")
+    subscription = transcript_broadcaster.subscribe(
+        session_id, partials=partials,
+        last_event_id=int(last_event_id) if last_event_id and last_event_id.isdigit() else None,
+    )
+
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscription.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            transcript_broadcaster.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/sessions")
+async def get_sessions():
+    return session_manager.stats()
+
+
+@router.delete("/sessions/current")
+async def close_session(session_id: str = Depends(get_session_id)):
+    closed = await run_in_threadpool(session_manager.close, session_id)
+    return {"status": "closed" if closed else "not_found"}
+
+
+@router.post("/ingest")
+async def start_ingest(request: Request):
+    data = await request.json()
+    video_name = data.get('videoName')
+    if not video_name:
+        raise HTTPException(status_code=400, detail="videoName is required")
+
+    metadata = media_catalog.get(video_name)
+    if metadata is None:
+        raise HTTPException(status_code=404, detail="Video not found")
+
+    running = [job for job in ingest_jobs.values() if job.status in ("pending", "running")]
+    if len(running) >= INGEST_MAX_JOBS:
+        raise HTTPException(
+            status_code=429,
+            detail=f"{len(running)} ingest jobs are already running",
+            headers={"Retry-After": str(_ingest_retry_hint(running))},
+        )
+    try:
+        workers = min(max(int(data.get('workers') or INGEST_MAX_WORKERS), 1), INGEST_MAX_WORKERS)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="workers must be an integer")
+
+    job = IngestJob(
+        os.path.join(VIDEO_DIR, video_name),
+        workers=workers,
+        start_time=data.get('time') or 0,
+        transcriber=batch_transcriber,
+        cache=transcript_cache,
+        duration=metadata["duration"],
+        pcm_cache=pcm_cache,
+        scheduler=inference_scheduler,
+    )
+    ingest_jobs[job.id] = job
+    if INGEST_JOBS_KEEP is not None:
+        finished = [job_id for job_id, other in ingest_jobs.items() if other.status in ("done", "failed")]
+        for job_id in finished[:max(len(finished) - INGEST_JOBS_KEEP, 0)]:
+            del ingest_jobs[job_id]
+    job.start()
+    return job.status_dict()
+
+
+def _ingest_retry_hint(running):
+    """
+    Seconds until the running ingest closest to finishing is likely done,
+    from its progress so far.
+    """
+    estimates = []
+    for job in running:
+        elapsed = time.monotonic() - job.started_at if job.started_at else None
+        if elapsed and job.completed_chunks and job.total_chunks:
+            estimates.append(elapsed * (job.total_chunks - job.completed_chunks) / job.completed_chunks)
+    return max(1, int(min(estimates))) if estimates else INGEST_RETRY_AFTER
+
+
+@router.get("/ingest/{job_id}")
+async def get_ingest(job_id: str):
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingest job not found")
+    return job.status_dict(include_transcript=job.status == "done")
+
+
+@router.get("/search")
+async def search_phrases(
+    q: str,
+    k: int = 10,
+    speaker: Optional[str] = None,
+    video: Optional[str] = None,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+):
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Empty query")
+    hits = await run_in_threadpool(
+        phrase_index.search, [q], k=min(max(k, 1), 100), speaker=speaker, video=video, start=start, end=end
+    )
+    return {"query": q, "results": hits[0]}
+
+
+@router.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+
+@router.get("/readyz")
+async def readyz(response: Response):
+    if model_warmup is None:
+        status = {"ready": True, "models": {}, "warmup_seconds": None}
+    else:
+        status = model_warmup.status_dict()
+    if not status["ready"]:
+        response.status_code = 503
+    status["startup"] = startup_report.as_dict()
+    return status
+
+
+startup_report.mark("routes")
@@ -1,42 +1,313 @@
-from fastapi.responses import StreamingResponse
+import mimetypes
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Iterator, List, Optional, Tuple
+from fastapi.responses import Response, StreamingResponse
 
-def handle_range_request(video_path: str, file_size: int, range_header: str) -> StreamingResponse:
-    # Parse the Range header
-    range_val = range_header.strip().split("=")[-1]
-    range_start, range_end = range_val.split("-")
-    range_start = int(range_start) if range_start else 0
-    range_end = int(range_end) if range_end else file_size - 1
-    content_length = range_end - range_start + 1
+CHUNK_SIZE = 256 * 1024  # Bytes per read; keeps per-request memory flat
+MAX_RANGES = 16  # More ranges than this are answered with the full file
 
-    # Set the response headers
-    headers = {
-        "Content-Range": f"bytes {range_start}-{range_end}/{file_size}",
+ByteRange = Tuple[int, int]  # Inclusive (start, end)
+
+
+class _OpenFile:
+    def __init__(self, path: str, signature: Tuple[int, int]):
+        self.path = path
+        self.signature = signature
+        self.file = open(path, 'rb')
+        self.users = 0
+        self.stale = False
+        # Only needed where os.pread is unavailable (Windows)
+        self.lock = threading.Lock()
+
+    def read_at(self, offset: int, size: int) -> bytes:
+        if hasattr(os, "pread"):
+            return os.pread(self.file.fileno(), size, offset)
+        with self.lock:
+            self.file.seek(offset)
+            return self.file.read(size)
+
+    def close(self):
+        self.file.close()
+
+
+class FileHandleCache:
+    """
+    LRU of open video files shared by concurrent requests.
+
+    Reads are positional, so many streams can use one handle at once. A
+    handle is reopened when the file's size or mtime changes, and evicted
+    handles are only closed once the last stream using them finishes.
+    """
+
+    def __init__(self, max_open: int = 64):
+        self.max_open = max_open
+        self._files: "OrderedDict[str, _OpenFile]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, path: str, signature: Tuple[int, int]) -> _OpenFile:
+        with self._lock:
+            handle = self._files.get(path)
+            if handle is not None and handle.signature != signature:
+                self._retire(self._files.pop(path))
+                handle = None
+            if handle is None:
+                handle = _OpenFile(path, signature)
+                self._files[path] = handle
+                while len(self._files) > self.max_open:
+                    _, oldest = self._files.popitem(last=False)
+                    self._retire(oldest)
+            else:
+                self._files.move_to_end(path)
+            handle.users += 1
+            return handle
+
+    def release(self, handle: _OpenFile):
+        with self._lock:
+            handle.users -= 1
+            if handle.stale and handle.users == 0:
+                handle.close()
+
+    def _retire(self, handle: _OpenFile):
+        handle.stale = True
+        if handle.users == 0:
+            handle.close()
+
+
+file_handles = FileHandleCache()
+
+
+class VideoStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that hands single-part bodies to the server as a
+    zero-copy send when the ASGI server offers the zerocopysend extension.
+    """
+
+    def __init__(self, content, video_path: str, zero_copy_range: Optional[ByteRange] = None, **kwargs):
+        super().__init__(content, **kwargs)
+        self.video_path = video_path
+        self.zero_copy_range = zero_copy_range
+
+    async def __call__(self, scope, receive, send):
+        extensions = scope.get("extensions") or {}
+        if self.zero_copy_range is None or "http.response.zerocopysend" not in extensions:
+            await super().__call__(scope, receive, send)
+            return
+        start, end = self.zero_copy_range
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        with open(self.video_path, 'rb') as video_file:
+            await send({
+                "type": "http.response.zerocopysend",
+                "file": video_file,
+                "offset": start,
+                "count": end - start + 1,
+                "more_body": False,
+            })
+
+
+def _content_type(video_path: str) -> str:
+    content_type, _ = mimetypes.guess_type(video_path)
+    return content_type or "video/mp4"
+
+
+def _etag(signature: Tuple[int, int]) -> str:
+    size, mtime_ns = signature
+    return f'"{size:x}-{mtime_ns:x}"'
+
+
+def _http_date(mtime_ns: int) -> str:
+    return formatdate(mtime_ns / 1e9, usegmt=True)
+
+
+def _not_modified_since(header: str, mtime_ns: int) -> bool:
+    try:
+        since = parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return int(mtime_ns / 1e9) <= since
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def parse_range_header(range_header: str, file_size: int) -> Optional[List[ByteRange]]:
+    """
+    Parse a `bytes=` Range header into sorted, merged inclusive ranges.
+
+    Returns None if the header is malformed (it should then be ignored) and
+    an empty list if no range is satisfiable.
+    """
+    unit, _, spec = range_header.strip().partition("=")
+    if unit.strip().lower() != "bytes" or not spec:
+        return None
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, sep, end = part.partition("-")
+        if not sep:
+            return None
+        start, end = start.strip(), end.strip()
+        try:
+            if not start:
+                # Suffix range: the last N bytes
+                length = int(end)
+                if length <= 0:
+                    continue
+                ranges.append((max(file_size - length, 0), file_size - 1))
+                continue
+            first = int(start)
+            last = int(end) if end else None
+        except ValueError:
+            return None
+        if last is not None and first > last:
+            return None
+        if first >= file_size:
+            continue
+        ranges.append((first, file_size - 1 if last is None else min(last, file_size - 1)))
+
+    ranges.sort()
+    merged: List[ByteRange] = []
+    for first, last in ranges:
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return merged
+
+
+def _iter_ranges(video_path: str, signature: Tuple[int, int], ranges: List[ByteRange],
+                 parts: Optional[List[Tuple[bytes, bytes]]] = None) -> Iterator[bytes]:
+    """
+    Yield the requested byte ranges in CHUNK_SIZE reads. For multipart
+    bodies, `parts` holds the (header, trailer) bytes around each range.
+    """
+    handle = file_handles.acquire(video_path, signature)
+    try:
+        for index, (start, end) in enumerate(ranges):
+            if parts is not None:
+                yield parts[index][0]
+            position = start
+            while position <= end:
+                data = handle.read_at(position, min(CHUNK_SIZE, end - position + 1))
+                if not data:
+                    return
+                position += len(data)
+                yield data
+            if parts is not None:
+                yield parts[index][1]
+    finally:
+        file_handles.release(handle)
+
+
+def stream_video(video_path: str, request_headers) -> Response:
+    """
+    Build the response for a video GET, honouring Range, If-Range,
+    If-None-Match and If-Modified-Since.
+    """
+    stat = os.stat(video_path)
+    file_size = stat.st_size
+    signature = (file_size, stat.st_mtime_ns)
+    etag = _etag(signature)
+    validators = {
+        "ETag": etag,
+        "Last-Modified": _http_date(stat.st_mtime_ns),
         "Accept-Ranges": "bytes",
-        "Content-Length": str(content_length),
-        "Content-Type": "video/mp4",
     }
 
-    # Define an iterator to stream the requested byte range
-    def iter_file():
-        with open(video_path, 'rb') as video_file:
-            video_file.seek(range_start)
-            yield video_file.read(content_length)
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=validators)
+    elif request_headers.get("if-modified-since") and _not_modified_since(
+        request_headers["if-modified-since"], stat.st_mtime_ns
+    ):
+        return Response(status_code=304, headers=validators)
 
-    # Return the streaming response with partial content status code
-    return StreamingResponse(iter_file(), status_code=206, headers=headers)
+    range_header = request_headers.get("range")
+    if_range = request_headers.get("if-range")
+    if range_header and if_range:
+        # Only honour the range if the client's copy is still current
+        if if_range.strip().startswith(('"', 'W/')):
+            if if_range.strip() != etag:
+                range_header = None
+        elif if_range.strip() != validators["Last-Modified"]:
+            range_header = None
+
+    if range_header:
+        return handle_range_request(video_path, file_size, range_header, signature, validators)
+    return handle_full_request(video_path, file_size, signature, validators)
+
+
+def handle_range_request(video_path: str, file_size: int, range_header: str,
+                         signature: Optional[Tuple[int, int]] = None, validators: Optional[dict] = None) -> Response:
+    if signature is None:
+        stat = os.stat(video_path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+    validators = validators or {"Accept-Ranges": "bytes"}
+    content_type = _content_type(video_path)
+
+    ranges = parse_range_header(range_header, file_size)
+    if ranges is None or len(ranges) > MAX_RANGES:
+        return handle_full_request(video_path, file_size, signature, validators)
+    if not ranges:
+        return Response(status_code=416, headers={**validators, "Content-Range": f"bytes */{file_size}"})
+
+    if len(ranges) == 1:
+        range_start, range_end = ranges[0]
+        headers = {
+            **validators,
+            "Content-Range": f"bytes {range_start}-{range_end}/{file_size}",
+            "Content-Length": str(range_end - range_start + 1),
+            "Content-Type": content_type,
+        }
+        return VideoStreamingResponse(
+            _iter_ranges(video_path, signature, ranges), video_path, zero_copy_range=ranges[0],
+            status_code=206, headers=headers,
+        )
+
+    boundary = uuid.uuid4().hex
+    parts = []
+    content_length = 0
+    for index, (range_start, range_end) in enumerate(ranges):
+        separator = b"" if index == 0 else b"\r\n"
+        header = separator + (
+            f"--{boundary}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Range: bytes {range_start}-{range_end}/{file_size}\r\n\r\n"
+        ).encode()
+        trailer = f"\r\n--{boundary}--\r\n".encode() if index == len(ranges) - 1 else b""
+        parts.append((header, trailer))
+        content_length += len(header) + (range_end - range_start + 1) + len(trailer)
 
-def handle_full_request(video_path: str, file_size: int) -> StreamingResponse:
-    # Set the response headers
     headers = {
-        "Content-Length": str(file_size),
-        "Content-Type": "video/mp4",
-        "Accept-Ranges": "bytes",
+        **validators,
+        "Content-Length": str(content_length),
+        "Content-Type": f"multipart/byteranges; boundary={boundary}",
     }
+    return VideoStreamingResponse(
+        _iter_ranges(video_path, signature, ranges, parts), video_path, status_code=206, headers=headers,
+    )
 
-    # Define an iterator to stream the entire file
-    def iter_file():
-        with open(video_path, 'rb') as video_file:
-            yield from video_file
 
-    # Return the streaming response
-    return StreamingResponse(iter_file(), headers=headers)
\ No newline at end of file
+def handle_full_request(video_path: str, file_size: int,
+                        signature: Optional[Tuple[int, int]] = None, validators: Optional[dict] = None) -> Response:
+    if signature is None:
+        stat = os.stat(video_path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+    headers = {
+        **(validators or {"Accept-Ranges": "bytes"}),
+        "Content-Length": str(file_size),
+        "Content-Type": _content_type(video_path),
+    }
+    ranges = [(0, file_size - 1)] if file_size else []
+    return VideoStreamingResponse(
+        _iter_ranges(video_path, signature, ranges), video_path,
+        zero_copy_range=ranges[0] if ranges else None, headers=headers,
+    )
@@ -0,0 +1,135 @@
+"""
+How many verifier calls the claim cache saves on repeated speeches.
+
+Feeds a corpus of phrases through FactChecker once without a cache and
+once with a ClaimCache per --thresholds value, using a stub verifier
+that sleeps --verify-ms per call. Reports verifier calls, exact and
+near-duplicate hits and wall time.
+
+Without --corpus the corpus is synthetic: a pool of stump-speech claims
+(each also in a negated form, which must not share a verdict, and many
+differing from another only in a number, a year or a direction) repeated
+across speeches with openers, fillers, dropped or doubled words and
+different punctuation, the way the same line comes out of Whisper on
+different nights. There every cached answer can be traced back to its
+claim, so the report also counts wrong verdicts: hits that returned
+another claim's verdict. Every run also replays NEAR_MISS_PAIRS, which
+must all miss.
+
+--corpus takes one or more ingest outputs (python -m media_player.ingest
+... --out), JSON lists of phrases or plain text files with one phrase per
+line. Run from backend/:
+
+    python -m benchmarks.claim_cache_bench --speeches 40
+    python -m benchmarks.claim_cache_bench --corpus rally1.json rally2.json --thresholds 0.85 0.9
+"""
+import argparse
+import json
+import time
+from benchmarks.pipeline_bench import _git_commit
+from retrieval.claim_cache import ClaimCache, normalize_claim
+from retrieval.fact_check import FactChecker
+from tests.claim_fixtures import NEAR_MISS_PAIRS, StubVerifier, synthetic_corpus
+
+
+def load_corpus(paths):
+    corpus = []
+    for path in paths:
+        with open(path) as f:
+            content = f.read()
+        try:
+            data = json.loads(content)
+        except ValueError:
+            corpus.extend((line.strip(), None) for line in content.splitlines() if line.strip())
+            continue
+        phrases = data.get("transcript", []) if isinstance(data, dict) else data
+        corpus.extend(((phrase["text"] if isinstance(phrase, dict) else phrase).strip(), None) for phrase in phrases)
+    return corpus
+
+
+def run_once(corpus, verify_seconds, cache):
+    verifier = StubVerifier(verify_seconds)
+    checker = FactChecker(verifier, cache=cache, min_words=1)
+    claim_ids = {text: claim_id for text, claim_id in corpus}
+    outcomes = {"exact": 0, "near": 0, "miss": 0}
+    wrong = 0
+    started = time.perf_counter()
+    for text, claim_id in corpus:
+        result = checker.check(text)
+        outcomes[result["cached"]] += 1
+        if claim_id is not None and result["cached"] != "miss" and claim_ids[result["checked"]] != claim_id:
+            wrong += 1
+    elapsed = time.perf_counter() - started
+    checker.shutdown()
+    return {
+        "verifier_calls": verifier.calls,
+        "exact_hits": outcomes["exact"],
+        "near_hits": outcomes["near"],
+        "wrong_verdicts": wrong if corpus and corpus[0][1] is not None else None,
+        "wall_seconds": round(elapsed, 3),
+    }
+
+
+def near_miss_hits(cache):
+    """
+    How many NEAR_MISS_PAIRS `cache` answers with the other claim's entry.
+    """
+    hits = 0
+    for stored, probe in NEAR_MISS_PAIRS:
+        cache.put(stored, {"checked": stored})
+        hits += cache.lookup(probe)[0] != "miss"
+    return hits
+
+
+def run(args):
+    if args.corpus:
+        corpus = load_corpus(args.corpus)
+    else:
+        corpus = synthetic_corpus(args.speeches, args.claims_per_speech, args.pool, seed=args.seed)
+    verify_seconds = args.verify_ms / 1000
+    baseline = run_once(corpus, verify_seconds, None)
+    print(f"no cache: {baseline['verifier_calls']} verifier calls, {baseline['wall_seconds']}s")
+    results = []
+    for threshold in args.thresholds:
+        entry = {"threshold": threshold, **run_once(corpus, verify_seconds, ClaimCache(threshold=threshold))}
+        entry["near_miss_hits"] = near_miss_hits(ClaimCache(threshold=threshold))
+        entry["verifier_calls_saved"] = round(1 - entry["verifier_calls"] / max(baseline["verifier_calls"], 1), 4)
+        results.append(entry)
+        print(f"threshold {threshold}: {entry['verifier_calls']} verifier calls "
+              f"({entry['verifier_calls_saved']:.0%} saved), {entry['wrong_verdicts']} wrong verdicts, "
+              f"{entry['near_miss_hits']}/{len(NEAR_MISS_PAIRS)} near misses answered")
+    return {
+        "commit": _git_commit(),
+        "corpus": args.corpus or "synthetic",
+        "phrases": len(corpus),
+        "distinct_normalized": len({normalize_claim(text) for text, _ in corpus}),
+        "verify_ms": args.verify_ms,
+        "no_cache": baseline,
+        "cached": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", nargs="*", help="Transcripts to replay instead of the synthetic speeches")
+    parser.add_argument("--speeches", type=int, default=30, help="Synthetic speeches")
+    parser.add_argument("--claims-per-speech", type=int, default=40, help="Claims per synthetic speech")
+    parser.add_argument("--pool", type=int, default=60, help="Distinct synthetic claims (each also negated)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verify-ms", type=float, default=2.0, help="Stub verifier latency per call")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.7, 0.8, 0.85, 0.9, 0.95],
+                        help="Near-duplicate similarity thresholds to compare")
+    parser.add_argument("--out", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = run(args)
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,437 @@
+"""
+Real-time-factor benchmark for the speech pipeline.
+
+Drives synthetic speech/silence PCM for one or more concurrent sessions
+through the player's VAD segmentation, the chunk handoff and
+ProcessAudioQueue's transcription, alignment, diarization, embedding and
+speaker-identification stages. The models are lightweight stubs registered
+on a private ModelRegistry, so the run is offline, CPU-only and needs none
+of whisperx, torch or pyannote. Each stub costs a configurable number of
+seconds per second of audio, so scenarios can mimic a slower or faster
+backend. Run from backend/:
+
+    python -m benchmarks.pipeline_bench --seconds 120 --sessions 4 --out bench.json
+
+The report is JSON with the real-time factor, per-stage p50/p95/p99
+latencies, chunks per second and peak RSS, for diffing across commits.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+import numpy as np
+from benchmarks.vad_segmenter_bench import synthetic_pcm, energy_vad, SAMPLE_RATE
+from media_player.chunk_queue import AudioChunk, ChunkQueue
+from media_player.vad_segmenter import VadSegmenter
+from media_player.speech_to_text.model_registry import (
+    ModelRegistry,
+    WHISPERX_ASR,
+    WHISPERX_ALIGN_EN,
+    WHISPERX_DIARIZE,
+    PYANNOTE_EMBEDDING,
+)
+from media_player.speech_to_text.pipeline_stages import WhisperxStages, speaker_clips
+from media_player.speech_to_text.process_audio_queue import ProcessAudioQueue
+from media_player.speech_to_text.speaker_index import SpeakerIndex, EMBEDDING_SUFFIX
+from media_player.speech_to_text.inference_scheduler import InferenceScheduler, BLOCK
+
+EMBEDDING_DIM = 512
+WORD_SECONDS = 0.35
+
+# Simulated model cost in seconds per second of audio
+DEFAULT_COSTS = {
+    "transcribe": 0.05,
+    "align": 0.01,
+    "diarize": 0.02,
+    "embed": 0.005,
+}
+
+BLOCK_SAMPLES = 1024  # PyAudio frames per callback in AudioPlayer
+
+
+class StageTimings:
+    """
+    Thread-safe collection of per-stage latencies in seconds.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(list)
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self._samples[stage].append(seconds)
+
+    @contextlib.contextmanager
+    def time(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - started)
+
+    def summary(self):
+        with self._lock:
+            samples = {stage: np.array(values) for stage, values in self._samples.items()}
+        return {
+            stage: {
+                "count": int(len(values)),
+                "mean_ms": round(float(values.mean()) * 1000, 3),
+                "p50_ms": round(float(np.percentile(values, 50)) * 1000, 3),
+                "p95_ms": round(float(np.percentile(values, 95)) * 1000, 3),
+                "p99_ms": round(float(np.percentile(values, 99)) * 1000, 3),
+                "max_ms": round(float(values.max()) * 1000, 3),
+            }
+            for stage, values in sorted(samples.items())
+        }
+
+
+def _simulate(cost, audio_seconds):
+    if cost > 0:
+        time.sleep(cost * audio_seconds)
+
+
+class StubAsr:
+    """
+    Emits one segment per voiced stretch, with a word every WORD_SECONDS.
+    """
+
+    def __init__(self, cost, threshold=0.02):
+        self.cost = cost
+        self.threshold = threshold
+
+    def transcribe(self, audio, batch_size=16):
+        _simulate(self.cost, len(audio) / SAMPLE_RATE)
+        frame = SAMPLE_RATE // 50
+        frames = audio[: len(audio) // frame * frame].reshape(-1, frame)
+        voiced = np.sqrt(np.mean(frames * frames, axis=1)) > self.threshold
+        segments = []
+        start = None
+        for index, is_voiced in enumerate(np.append(voiced, False)):
+            if is_voiced and start is None:
+                start = index
+            elif not is_voiced and start is not None:
+                if index - start >= 10:
+                    segment_start, segment_end = start / 50, index / 50
+                    words = max(int((segment_end - segment_start) / WORD_SECONDS), 1)
+                    segments.append({
+                        "start": segment_start,
+                        "end": segment_end,
+                        "text": " ".join(f"word{n}" for n in range(words)),
+                    })
+                start = None
+        return {"segments": segments, "language": "en"}
+
+
+class StubAligner:
+    def __init__(self, cost):
+        self.cost = cost
+
+    def align(self, segments, audio):
+        _simulate(self.cost, len(audio) / SAMPLE_RATE)
+        aligned = []
+        for segment in segments:
+            words = segment["text"].split()
+            step = (segment["end"] - segment["start"]) / len(words)
+            aligned.append({
+                "start": segment["start"],
+                "end": segment["end"],
+                "text": segment["text"],
+                "words": [
+                    {"word": word, "start": segment["start"] + n * step, "end": segment["start"] + (n + 1) * step}
+                    for n, word in enumerate(words)
+                ],
+            })
+        return {"segments": aligned}
+
+
+class StubDiarizer:
+    """
+    Alternates between two speakers every few seconds.
+    """
+
+    def __init__(self, cost, turn_seconds=4.0):
+        self.cost = cost
+        self.turn_seconds = turn_seconds
+
+    def __call__(self, audio):
+        duration = len(audio) / SAMPLE_RATE
+        _simulate(self.cost, duration)
+        turns = []
+        start = 0.0
+        while start < duration:
+            end = min(start + self.turn_seconds, duration)
+            turns.append((start, end, f"SPEAKER_{len(turns) % 2:02d}"))
+            start = end
+        return turns
+
+
+class StubEmbedder:
+    """
+    Projects each clip's spectrum onto a fixed random basis. Called like
+    the pyannote model, on a (batch, 1, samples) array.
+    """
+
+    def __init__(self, cost, seed=0):
+        self.cost = cost
+        self.basis = np.random.default_rng(seed).standard_normal((64, EMBEDDING_DIM)).astype(np.float32)
+
+    def __call__(self, batch):
+        _simulate(self.cost, batch.shape[0] * batch.shape[2] / SAMPLE_RATE)
+        spectrum = np.abs(np.fft.rfft(batch[:, 0], n=126, axis=1))[:, :64].astype(np.float32)
+        return spectrum @ self.basis
+
+
+class StubStages(WhisperxStages):
+    """
+    Stages for the stub models, each timed into `timings`.
+    """
+
+    def __init__(self, timings):
+        self.timings = timings
+
+    def transcribe(self, model, audio):
+        with self.timings.time("transcribe"):
+            return super().transcribe(model, audio)
+
+    def align(self, align_model, metadata, segments, audio, device):
+        with self.timings.time("align"):
+            return align_model.align(segments, audio)
+
+    def diarize(self, diarize_model, audio):
+        with self.timings.time("diarize"):
+            return super().diarize(diarize_model, audio)
+
+    def assign_speakers(self, diarize_segments, aligned_result):
+        with self.timings.time("assign_speakers"):
+            for segment in aligned_result["segments"]:
+                for word in segment["words"]:
+                    middle = (word["start"] + word["end"]) / 2
+                    word["speaker"] = next(
+                        (speaker for start, end, speaker in diarize_segments if start <= middle < end),
+                        diarize_segments[-1][2] if diarize_segments else None,
+                    )
+            return aligned_result
+
+    def single_speaker_segments(self, label, duration):
+        return [(0.0, duration, label)]
+
+    def speaker_turns(self, diarize_segments):
+        turns = {}
+        for start, end, speaker in diarize_segments:
+            turns.setdefault(speaker, []).append((start, end))
+        return turns
+
+    def embed_speakers(self, embedding_model, audio, turns):
+        with self.timings.time("embed"):
+            labels, batch = speaker_clips(audio, turns)
+            return labels, embedding_model(batch)
+
+    def identify(self, index, embeddings, threshold):
+        with self.timings.time("identify"):
+            return super().identify(index, embeddings, threshold)
+
+
+class BenchAudioQueue(ProcessAudioQueue):
+    """
+    ProcessAudioQueue that records how long each chunk waited after the
+    player emitted it and how long it took end to end.
+    """
+
+    def __init__(self, timings, **kwargs):
+        super().__init__(**kwargs)
+        self.timings = timings
+        self.processed = 0
+        self.phrases = 0
+
+    def process_chunk(self, chunk):
+        self.timings.add("handoff", time.perf_counter() - chunk.emitted_at)
+        with self.timings.time("process_chunk"):
+            phrases = super().process_chunk(chunk)
+        self.timings.add("chunk_latency", time.perf_counter() - chunk.emitted_at)
+        self.processed += 1
+        self.phrases += len(phrases)
+        return phrases
+
+
+def stub_registry(costs):
+    registry = ModelRegistry()
+    registry.register(WHISPERX_ASR, lambda: StubAsr(costs["transcribe"]))
+    registry.register(WHISPERX_ALIGN_EN, lambda: (StubAligner(costs["align"]), {"language": "en"}))
+    registry.register(WHISPERX_DIARIZE, lambda: StubDiarizer(costs["diarize"]))
+    registry.register(PYANNOTE_EMBEDDING, lambda: StubEmbedder(costs["embed"]))
+    return registry
+
+
+def stub_speaker_bank(directory, speakers, samples_per_speaker=8, seed=0):
+    rng = np.random.default_rng(seed)
+    for speaker in range(speakers):
+        center = rng.standard_normal(EMBEDDING_DIM).astype(np.float32)
+        bank = center + 0.3 * rng.standard_normal((samples_per_speaker, EMBEDDING_DIM)).astype(np.float32)
+        np.save(os.path.join(directory, f"speaker_{speaker}{EMBEDDING_SUFFIX}"), bank)
+    return SpeakerIndex(directory)
+
+
+def run_session(session_id, pcm, audio_queue, chunk_queue, scheduler, timings, realtime):
+    """
+    Play `pcm` the way AudioPlayer's callback does: fixed-size blocks into
+    the segmenter, each finished chunk copied out and handed off.
+    """
+    segmenter = VadSegmenter(sample_rate=SAMPLE_RATE, is_speech=energy_vad())
+    block_bytes = BLOCK_SAMPLES * 2
+    view = memoryview(pcm)
+    started = time.perf_counter()
+    emitted = 0
+
+    def hand_off(descriptor):
+        chunk = AudioChunk(session_id, descriptor.index, descriptor.start_time,
+                           segmenter.samples(descriptor).copy(), SAMPLE_RATE)
+        chunk.emitted_at = time.perf_counter()
+        if scheduler is not None:
+            audio_queue.enqueue(chunk)
+        else:
+            chunk_queue.put(chunk)
+
+    for position in range(0, len(pcm), block_bytes):
+        if realtime:
+            delay = started + position / 2 / SAMPLE_RATE - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        with timings.time("vad"):
+            descriptors = segmenter.feed(view[position:position + block_bytes])
+        for descriptor in descriptors:
+            hand_off(descriptor)
+            emitted += 1
+    remaining = segmenter.flush()
+    if remaining is not None:
+        hand_off(remaining)
+        emitted += 1
+    return emitted, segmenter.frames_processed
+
+
+def run(args):
+    costs = dict(DEFAULT_COSTS)
+    for override in args.cost:
+        stage, _, value = override.partition("=")
+        if stage not in costs:
+            raise SystemExit(f"Unknown stage in --cost: {stage}")
+        costs[stage] = float(value)
+
+    timings = StageTimings()
+    registry = stub_registry(costs)
+    scheduler = None
+    if args.workers:
+        scheduler = InferenceScheduler(workers=args.workers, max_session_depth=args.queue_depth, policy=BLOCK)
+
+    with tempfile.TemporaryDirectory() as bank_dir:
+        index = stub_speaker_bank(bank_dir, args.speakers)
+        sessions = []
+        for number in range(args.sessions):
+            session_id = f"bench-{number}"
+            audio_queue = BenchAudioQueue(timings, session_id=session_id, registry=registry, index=index,
+                                          scheduler=scheduler, stages=StubStages(timings))
+            chunk_queue = ChunkQueue(maxsize=args.queue_depth)
+            if scheduler is None:
+                audio_queue.start(chunk_queue)
+            sessions.append((session_id, synthetic_pcm(args.seconds, seed=number), audio_queue, chunk_queue))
+
+        results = [None] * len(sessions)
+
+        def play(slot, session):
+            session_id, pcm, audio_queue, chunk_queue = session
+            results[slot] = run_session(session_id, pcm, audio_queue, chunk_queue, scheduler, timings, args.realtime)
+            if scheduler is None:
+                chunk_queue.close()
+
+        # Peak RSS is a process-lifetime high-water mark, so record the
+        # baseline to separate the pipeline from interpreter and numpy
+        baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started = time.perf_counter()
+        players = [threading.Thread(target=play, args=(slot, session)) for slot, session in enumerate(sessions)]
+        for player in players:
+            player.start()
+        for player in players:
+            player.join()
+        for slot, (_, _, audio_queue, _) in enumerate(sessions):
+            if scheduler is None:
+                audio_queue.thread.join()
+            else:
+                while audio_queue.processed < results[slot][0]:
+                    time.sleep(0.01)
+                audio_queue.stop()
+        elapsed = time.perf_counter() - started
+        if scheduler is not None:
+            scheduler.shutdown()
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    scale = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is in KiB on Linux
+    audio_seconds = args.seconds * args.sessions
+    chunks = sum(audio_queue.processed for _, _, audio_queue, _ in sessions)
+    return {
+        "commit": _git_commit(),
+        "config": {
+            "seconds": args.seconds,
+            "sessions": args.sessions,
+            "workers": args.workers,
+            "realtime": args.realtime,
+            "speakers": args.speakers,
+            "costs": costs,
+        },
+        "audio_seconds": audio_seconds,
+        "wall_seconds": round(elapsed, 4),
+        "realtime_factor": round(elapsed / audio_seconds, 5),
+        "chunks": chunks,
+        "chunks_emitted": sum(result[0] for result in results),
+        "chunks_dropped": sum(chunk_queue.dropped for _, _, _, chunk_queue in sessions),
+        "chunks_per_second": round(chunks / elapsed, 3),
+        "phrases": sum(audio_queue.phrases for _, _, audio_queue, _ in sessions),
+        "vad_frames": sum(result[1] for result in results),
+        "peak_rss_bytes": peak_rss * scale,
+        "baseline_rss_bytes": baseline_rss * scale,
+        "stages": timings.summary(),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=120, help="Audio length per session")
+    parser.add_argument("--sessions", type=int, default=1, help="Concurrent sessions")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Run chunks on an InferenceScheduler with this many workers "
+                             "(default: one consumer thread per session)")
+    parser.add_argument("--queue-depth", type=int, default=32, help="Per-session queue bound")
+    parser.add_argument("--speakers", type=int, default=8, help="Speakers in the stub enrollment bank")
+    parser.add_argument("--realtime", action="store_true", help="Pace playback at real time instead of max speed")
+    parser.add_argument("--cost", action="append", default=[], metavar="STAGE=SECONDS",
+                        help=f"Stub cost per audio second, stages: {', '.join(DEFAULT_COSTS)}")
+    parser.add_argument("--out", help="Write the JSON report here as well as to stdout")
+    args = parser.parse_args()
+
+    # The pipeline prints every phrase; keep stdout for the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        report = run(args)
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Throughput and accuracy of each quality tier.
+
+Runs the same audio through ProcessAudioQueue once per tier in
+media_player.speech_to_text.quality_tiers, with the tier pinned, and
+reports wall time, real-time factor, chunk latency and how far the output
+drifts from the best tier's.
+
+Without --audio the models are the stubs from pipeline_bench, so the run
+is offline and needs none of whisperx, torch or pyannote. Each tier's stub
+ASR is scaled by the relative cost of its Whisper size and compute type
+(ASR_COST_SCALE, COMPUTE_COST_SCALE: rough CPU ratios, adjust them to your
+hardware). Accuracy is then speaker agreement: the share of words given
+the same speaker as in the first tier's run, which shows what skipped
+alignment and sparser diarization cost.
+
+With --audio (and optionally --reference, a plain-text transcript) the
+real models run, and each tier also reports its word error rate. Run from
+backend/:
+
+    python -m benchmarks.quality_tiers_bench --seconds 60 --sessions 4
+    python -m benchmarks.quality_tiers_bench --audio clip.wav --reference clip.txt --out tiers.json
+"""
+import argparse
+import json
+import re
+import tempfile
+import threading
+import time
+import numpy as np
+from benchmarks.pipeline_bench import (
+    DEFAULT_COSTS,
+    StageTimings,
+    StubAsr,
+    StubStages,
+    stub_registry,
+    stub_speaker_bank,
+    _git_commit,
+)
+from benchmarks.vad_segmenter_bench import synthetic_pcm, energy_vad, SAMPLE_RATE
+from media_player.ingest import segment_audio
+from media_player.speech_to_text.process_audio_queue import ProcessAudioQueue
+from media_player.speech_to_text.quality_tiers import TIERS, QualityController
+
+# Relative CPU cost of an ASR pass against base/float32
+ASR_COST_SCALE = {"tiny": 0.45, "base": 1.0, "small": 2.4}
+COMPUTE_COST_SCALE = {"float32": 1.0, "int8": 0.6}
+
+
+def word_error_rate(reference, hypothesis):
+    """
+    Word-level Levenshtein distance over the reference length, ignoring
+    case and punctuation.
+    """
+    reference = re.findall(r"[\w']+", reference.lower())
+    hypothesis = re.findall(r"[\w']+", hypothesis.lower())
+    if not reference:
+        return float(bool(hypothesis))
+    previous = np.arange(len(hypothesis) + 1)
+    for row, word in enumerate(reference, start=1):
+        current = np.empty_like(previous)
+        current[0] = row
+        for column, candidate in enumerate(hypothesis, start=1):
+            current[column] = min(
+                previous[column] + 1,
+                current[column - 1] + 1,
+                previous[column - 1] + (word != candidate),
+            )
+        previous = current
+    return float(previous[-1]) / len(reference)
+
+
+def _words(outputs):
+    """
+    [(session, chunk index, word, speaker), ...] in media order.
+    """
+    words = []
+    for session_id in sorted(outputs):
+        for chunk, phrases in outputs[session_id]:
+            for phrase in sorted(phrases, key=lambda phrase: phrase["start"]):
+                for word in phrase.get("words", []):
+                    words.append((session_id, chunk.index, word["word"], phrase["speaker"]))
+    return words
+
+
+def speaker_agreement(baseline, outputs):
+    """
+    Share of words attributed to the same speaker as in `baseline`, over
+    the words both runs produced at the same position.
+    """
+    expected = {(session, index, position): speaker
+                for position, (session, index, _, speaker) in enumerate(_words(baseline))}
+    matched = total = 0
+    for position, (session, index, _, speaker) in enumerate(_words(outputs)):
+        reference = expected.get((session, index, position))
+        if reference is None:
+            continue
+        total += 1
+        matched += reference == speaker
+    return round(matched / total, 4) if total else None
+
+
+def transcript_text(outputs):
+    phrases = [
+        (chunk.start_time + phrase["start"], phrase["text"])
+        for results in outputs.values()
+        for chunk, chunk_phrases in results
+        for phrase in chunk_phrases
+    ]
+    return " ".join(text.strip() for _, text in sorted(phrases))
+
+
+def run_tier(tier, sessions, registry, make_stages, index):
+    """
+    Process every session's chunks in order, one thread per session, with
+    `tier` pinned. Returns (wall seconds, chunk latencies, outputs).
+    """
+    controller = QualityController(initial=tier.name, best=tier.name, worst=tier.name)
+    outputs = {}
+    latencies = []
+    lock = threading.Lock()
+
+    def work(session_id, chunks):
+        audio_queue = ProcessAudioQueue(session_id=session_id, registry=registry, index=index,
+                                        stages=make_stages(), quality=controller)
+        results = []
+        for chunk in chunks:
+            started = time.perf_counter()
+            results.append((chunk, audio_queue.process_chunk(chunk)))
+            with lock:
+                latencies.append(time.perf_counter() - started)
+        audio_queue.close()
+        outputs[session_id] = results
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=work, args=session) for session in sessions.items()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, latencies, outputs
+
+
+def run(args):
+    tiers = [tier for tier in TIERS if not args.tiers or tier.name in args.tiers]
+    if args.audio:
+        from media_player.ingest import decode_audio
+        from media_player.speech_to_text.model_registry import model_registry
+        from media_player.speech_to_text.pipeline_stages import WhisperxStages
+        from media_player.speech_to_text.process_audio_queue import speaker_index
+        from media_player.speech_to_text.quality_tiers import register_tier_models
+
+        pcm = decode_audio(args.audio)
+        sessions = {f"bench-{n}": segment_audio(pcm, session_id=f"bench-{n}") for n in range(args.sessions)}
+        audio_seconds = len(pcm) / SAMPLE_RATE * args.sessions
+        register_tier_models(model_registry, tiers)
+        registry, index = model_registry, speaker_index
+        reference = None
+        if args.reference:
+            with open(args.reference) as f:
+                reference = f.read()
+        report = _run_tiers(tiers, sessions, registry, WhisperxStages, index, audio_seconds, reference, None)
+        mode = "models"
+    else:
+        timings_by_tier = {}
+        sessions = {}
+        for n in range(args.sessions):
+            pcm = np.frombuffer(synthetic_pcm(args.seconds, seed=n), dtype=np.int16)
+            sessions[f"bench-{n}"] = segment_audio(pcm, session_id=f"bench-{n}", is_speech=energy_vad())
+        audio_seconds = args.seconds * args.sessions
+        registry = stub_registry(DEFAULT_COSTS)
+        for tier in tiers:
+            cost = DEFAULT_COSTS["transcribe"] * ASR_COST_SCALE[tier.asr_size] * COMPUTE_COST_SCALE[tier.compute_type]
+            registry.register(tier.asr_model, lambda cost=cost: StubAsr(cost), replace=True)
+            timings_by_tier[tier.name] = StageTimings()
+        with tempfile.TemporaryDirectory() as bank_dir:
+            index = stub_speaker_bank(bank_dir, args.speakers)
+            report = _run_tiers(tiers, sessions, registry, StubStages, index, audio_seconds, None, timings_by_tier)
+        mode = "stub"
+
+    return {
+        "commit": _git_commit(),
+        "mode": mode,
+        "config": {"seconds": args.seconds, "sessions": args.sessions, "audio": args.audio},
+        "audio_seconds": audio_seconds,
+        "tiers": report,
+    }
+
+
+def _run_tiers(tiers, sessions, registry, stages_class, index, audio_seconds, reference, timings_by_tier):
+    report = []
+    baseline = None
+    for tier in tiers:
+        if timings_by_tier is not None:
+            timings = timings_by_tier[tier.name]
+            make_stages = lambda timings=timings: stages_class(timings)
+        else:
+            timings = None
+            make_stages = stages_class
+        wall, latencies, outputs = run_tier(tier, sessions, registry, make_stages, index)
+        if baseline is None:
+            baseline = outputs
+        latencies = np.array(latencies) if latencies else np.zeros(1)
+        entry = {
+            **tier.as_dict(),
+            "wall_seconds": round(wall, 3),
+            "realtime_factor": round(wall / audio_seconds, 5),
+            "audio_seconds_per_second": round(audio_seconds / wall, 2),
+            "chunk_p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 2),
+            "chunk_p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 2),
+            "speaker_agreement": speaker_agreement(baseline, outputs),
+            "word_error_rate": (
+                round(word_error_rate(reference, transcript_text(outputs)), 4) if reference is not None else None
+            ),
+        }
+        if timings is not None:
+            entry["stages"] = timings.summary()
+        report.append(entry)
+        print(f"{tier.name}: RTF {entry['realtime_factor']}, speaker agreement {entry['speaker_agreement']}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=60, help="Synthetic audio length per session")
+    parser.add_argument("--sessions", type=int, default=2, help="Concurrent sessions")
+    parser.add_argument("--speakers", type=int, default=8, help="Speakers in the stub enrollment bank")
+    parser.add_argument("--tiers", nargs="*", help="Only these tiers (default: all, best first)")
+    parser.add_argument("--audio", help="Run the real models on this file instead of the stubs")
+    parser.add_argument("--reference", help="Reference transcript of --audio, for word error rate")
+    parser.add_argument("--out", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = run(args)
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
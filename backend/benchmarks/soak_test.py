@@ -0,0 +1,309 @@
+"""
+Soak test for long-running streaming in bounded-memory mode.
+
+Streams synthetic speech into several concurrent sessions for --hours of
+audio per session, through the same SessionManager, InferenceScheduler,
+ProcessAudioQueue, TranscriptBroadcaster and TranscriptStore wiring that
+App/routes.py uses with MEMORY_BOUNDED=1. The models are the stubs from
+pipeline_bench, with no simulated cost unless --cost is given, so hours
+of audio run in minutes. Each session keeps cycling like a viewer: it plays
+for a while, then pauses, seeks or closes, and a closed session comes back
+under a new id.
+
+The harness samples resident memory, open file descriptors and thread
+count as the audio accumulates. Once the --warmup share of the run is
+over, it fits RSS against audio hours, and it fails (exit status 1) if the
+fitted growth projected over --hours exceeds --max-rss-growth-mb or the
+descriptor count drifts by more than --max-fd-growth. --unbounded runs the
+default mode for comparison. Linux only (reads /proc). Run from backend/:
+
+    python -m benchmarks.soak_test --hours 24 --sessions 4 --out soak.json
+    python -m benchmarks.soak_test --hours 2 --unbounded
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+from benchmarks.pipeline_bench import DEFAULT_COSTS, StubStages, stub_registry, stub_speaker_bank, _git_commit
+from benchmarks.vad_segmenter_bench import synthetic_pcm, energy_vad, SAMPLE_RATE
+from media_player.chunk_queue import AudioChunk
+from media_player.session_manager import SessionManager
+from media_player.transcript_broadcaster import TranscriptBroadcaster
+from media_player.vad_segmenter import VadSegmenter
+from media_player.speech_to_text.inference_scheduler import InferenceScheduler, BLOCK
+from media_player.speech_to_text.process_audio_queue import ProcessAudioQueue
+from media_player.speech_to_text.speaker_tracker import SpeakerTracker
+from media_player.speech_to_text.transcript_store import TranscriptStore
+
+BLOCK_SAMPLES = 1024
+PIECE_SECONDS = 120
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+class NullTimings:
+    """
+    StageTimings that keeps nothing, so the harness itself stays flat.
+    """
+
+    def add(self, stage, seconds):
+        pass
+
+    def time(self, stage):
+        return contextlib.nullcontext()
+
+
+class SyntheticPlayer:
+    """
+    Stands in for AudioPlayer: cuts endless synthetic speech into VAD chunks
+    on a thread, at up to `speed` times real time (0: as fast as the
+    pipeline takes them).
+    """
+
+    def __init__(self, pieces, speed=0.0):
+        self.pieces = pieces
+        self.speed = speed
+        self.session = None
+        self.thread = None
+        self.terminate = False
+        self.file_count = 0
+        self.streamed = 0.0
+
+    def set_session(self, session):
+        self.session = session
+
+    def play(self, audio_path, start_time=0, on_chunk=None, on_provisional=None):
+        self.terminate = False
+        self.streamed = 0.0
+        self.thread = threading.Thread(target=self._play_in_thread, args=(start_time, on_chunk), daemon=True)
+        self.thread.start()
+
+    def _play_in_thread(self, start_time, on_chunk):
+        segmenter = VadSegmenter(sample_rate=SAMPLE_RATE, start_time=float(start_time), is_speech=energy_vad())
+        block_bytes = BLOCK_SAMPLES * 2
+        started = time.perf_counter()
+        piece = int(start_time // PIECE_SECONDS)
+
+        def emit(descriptor):
+            on_chunk(AudioChunk(self.session, self.file_count, descriptor.start_time,
+                                segmenter.samples(descriptor).copy(), SAMPLE_RATE, time.monotonic()))
+            self.file_count += 1
+
+        while not self.terminate:
+            view = memoryview(self.pieces[piece % len(self.pieces)])
+            piece += 1
+            for position in range(0, len(view), block_bytes):
+                if self.terminate:
+                    break
+                for descriptor in segmenter.feed(view[position:position + block_bytes]):
+                    emit(descriptor)
+                self.streamed += BLOCK_SAMPLES / SAMPLE_RATE
+                if self.speed:
+                    delay = started + self.streamed / self.speed - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+        remaining = segmenter.flush()
+        if remaining is not None:
+            emit(remaining)
+
+    def stop(self):
+        self.terminate = True
+
+    def pause(self):
+        self.stop()
+
+
+def process_sample():
+    with open("/proc/self/statm") as f:
+        resident_pages = int(f.read().split()[1])
+    return {
+        "rss_bytes": resident_pages * PAGE_SIZE,
+        "open_fds": len(os.listdir("/proc/self/fd")),
+        "threads": threading.active_count(),
+    }
+
+
+def growth(samples, key, warmup):
+    """
+    Least-squares slope of `key` per audio hour after the warmup, and the
+    range of values it took.
+    """
+    settled = [sample for sample in samples if sample["audio_hours"] >= warmup]
+    if len(settled) < 3:
+        return None, None
+    hours = np.array([sample["audio_hours"] for sample in settled])
+    values = np.array([sample[key] for sample in settled], dtype=np.float64)
+    slope = float(np.polyfit(hours, values, 1)[0]) if np.ptp(hours) > 0 else 0.0
+    return slope, float(np.ptp(values))
+
+
+def run(args):
+    costs = {stage: 0.0 for stage in DEFAULT_COSTS}
+    for override in args.cost:
+        stage, _, value = override.partition("=")
+        costs[stage] = float(value)
+    bounded = not args.unbounded
+    registry = stub_registry(costs)
+    scheduler = InferenceScheduler(workers=args.workers, max_session_depth=8, policy=BLOCK, block_timeout=5.0)
+    broadcaster = TranscriptBroadcaster()
+    store = TranscriptStore(max_videos=8, retention=args.retention_hours * 3600 if bounded else None)
+    pieces = [synthetic_pcm(PIECE_SECONDS, seed=seed) for seed in range(4)]
+    processed = [0]
+    lock = threading.Lock()
+
+    def create_player(session_id):
+        player = SyntheticPlayer(pieces, speed=args.speed)
+        player.set_session(session_id)
+        return player
+
+    bank_dir = tempfile.TemporaryDirectory()
+    index = stub_speaker_bank(bank_dir.name, args.speakers)
+
+    def create_audio_queue(session, media_key=None):
+        session_id, video_name = session.session_id, session.video_name
+        tracker = session.state.get("speaker_tracker")
+        if tracker is None:
+            tracker = session.state["speaker_tracker"] = SpeakerTracker()
+
+        def on_result(chunk, phrases):
+            broadcaster.publish_final(session_id, chunk, phrases)
+            store.add_chunk(video_name, chunk, phrases)
+            with lock:
+                processed[0] += 1
+
+        return ProcessAudioQueue(session_id=session_id, registry=registry, index=index, scheduler=scheduler,
+                                 stages=StubStages(NullTimings()), speaker_tracker=tracker, on_result=on_result)
+
+    manager = SessionManager(
+        create_player, create_audio_queue, max_active=args.sessions, idle_timeout=None,
+        release_on_pause=bounded,
+        on_close=(lambda session: broadcaster.forget(session.session_id)) if bounded else None,
+    )
+    target = args.hours * 3600
+    streamed = [0.0] * args.sessions
+    playing = [None] * args.sessions
+    done = threading.Event()
+
+    def viewer(slot):
+        rng = random.Random(slot)
+        generation = 0
+        position = 0.0
+        while streamed[slot] < target and not done.is_set():
+            session_id = f"soak-{slot}-{generation}"
+            video = f"video-{(slot + generation) % 4}"
+            session = manager.play(session_id, video, position, video_name=video)
+            player = playing[slot] = session.player
+            watch = rng.uniform(args.min_play_minutes, args.max_play_minutes) * 60
+            while player.streamed < watch and player.thread.is_alive() and not done.is_set():
+                time.sleep(0.05)
+            playing[slot] = None
+            streamed[slot] += player.streamed
+            position += player.streamed
+            action = rng.random()
+            if action < 0.3:
+                manager.pause(session_id)
+            elif action < 0.6:
+                position = rng.uniform(0, 4 * 3600)
+            else:
+                manager.close(session_id)
+                generation += 1
+
+    samples = []
+    started = time.perf_counter()
+    threads = [threading.Thread(target=viewer, args=(slot,), daemon=True) for slot in range(args.sessions)]
+    for thread in threads:
+        thread.start()
+    next_report = 0.0
+    try:
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(args.sample_seconds)
+            live = sum(player.streamed for player in list(playing) if player is not None)
+            sample = {
+                "wall_seconds": round(time.perf_counter() - started, 1),
+                "audio_hours": round((sum(streamed) + live) / args.sessions / 3600, 4),
+                "chunks": processed[0],
+                **process_sample(),
+                "scheduler_depth": scheduler.stats()["total_depth"],
+                "transcript_store_bytes": store.stats()["bytes"],
+                "broadcaster_sessions": broadcaster.stats()["sessions_with_history"],
+            }
+            samples.append(sample)
+            if sample["audio_hours"] >= next_report:
+                print(f"{sample['audio_hours']:.2f} h: RSS {sample['rss_bytes'] / 2 ** 20:.1f} MiB, "
+                      f"{sample['open_fds']} fds, {sample['threads']} threads", file=sys.stderr)
+                next_report += max(args.hours / 24, 0.05)
+    except KeyboardInterrupt:
+        done.set()
+    manager.close_all()
+    scheduler.shutdown()
+    bank_dir.cleanup()
+
+    warmup = args.hours * args.warmup
+    rss_slope, rss_range = growth(samples, "rss_bytes", warmup)
+    fd_slope, fd_range = growth(samples, "open_fds", warmup)
+    projected = rss_slope * args.hours if rss_slope is not None else None
+    passed = (
+        projected is not None
+        and projected <= args.max_rss_growth_mb * 2 ** 20
+        and fd_range <= args.max_fd_growth
+    )
+    return {
+        "commit": _git_commit(),
+        "config": {
+            "hours": args.hours,
+            "sessions": args.sessions,
+            "workers": args.workers,
+            "bounded": bounded,
+            "retention_hours": args.retention_hours if bounded else None,
+            "speed": args.speed,
+            "costs": costs,
+        },
+        "wall_seconds": round(time.perf_counter() - started, 1),
+        "chunks": processed[0],
+        "rss_growth_bytes_per_audio_hour": round(rss_slope) if rss_slope is not None else None,
+        "rss_growth_projected_bytes": round(projected) if projected is not None else None,
+        "rss_range_after_warmup_bytes": round(rss_range) if rss_range is not None else None,
+        "open_fds_range_after_warmup": fd_range,
+        "open_fds_per_audio_hour": round(fd_slope, 4) if fd_slope is not None else None,
+        "passed": passed,
+        "samples": samples,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=float, default=24, help="Audio streamed per session")
+    parser.add_argument("--sessions", type=int, default=4, help="Concurrent viewers")
+    parser.add_argument("--workers", type=int, default=2, help="Inference workers")
+    parser.add_argument("--speakers", type=int, default=8, help="Speakers in the stub enrollment bank")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="Cap each session at this multiple of real time (0: as fast as it runs)")
+    parser.add_argument("--cost", action="append", default=[], metavar="STAGE=SECONDS",
+                        help="Simulated model cost per audio second (default 0 for every stage)")
+    parser.add_argument("--min-play-minutes", type=float, default=5)
+    parser.add_argument("--max-play-minutes", type=float, default=90)
+    parser.add_argument("--retention-hours", type=float, default=1, help="Transcript store window when bounded")
+    parser.add_argument("--unbounded", action="store_true", help="Run the default mode instead")
+    parser.add_argument("--sample-seconds", type=float, default=2.0, help="Wall time between samples")
+    parser.add_argument("--warmup", type=float, default=0.2, help="Share of the run excluded from the fit")
+    parser.add_argument("--max-rss-growth-mb", type=float, default=64)
+    parser.add_argument("--max-fd-growth", type=int, default=4)
+    parser.add_argument("--out", help="Write the JSON report, with every sample, here")
+    args = parser.parse_args()
+
+    report = run(args)
+    summary = {key: value for key, value in report.items() if key != "samples"}
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(summary, indent=2))
+    sys.exit(0 if report["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
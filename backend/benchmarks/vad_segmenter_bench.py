@@ -0,0 +1,169 @@
+"""
+Microbenchmark for VadSegmenter.
+
+Feeds synthetic speech/silence PCM through the segmenter in randomly sized
+blocks and reports VAD frames processed per second, next to the legacy
+bytes-concatenation loop the player used before. Run from backend/:
+
+    python -m benchmarks.vad_segmenter_bench --seconds 600 --vad webrtc
+"""
+import argparse
+import json
+import time
+import numpy as np
+from media_player.vad_segmenter import VadSegmenter, webrtc_vad
+
+SAMPLE_RATE = 16000
+
+
+def synthetic_pcm(seconds, seed=0):
+    """
+    Alternating bursts of noisy tones ("speech") and low noise ("silence").
+    """
+    rng = np.random.default_rng(seed)
+    total = int(seconds * SAMPLE_RATE)
+    audio = np.empty(total, dtype=np.int16)
+    position = 0
+    speaking = True
+    while position < total:
+        low, high = (1.0, 6.0) if speaking else (0.15, 0.6)
+        length = int(rng.uniform(low, high) * SAMPLE_RATE)
+        length = min(length, total - position)
+        t = np.arange(length) / SAMPLE_RATE
+        if speaking:
+            signal = 6000 * np.sin(2 * np.pi * rng.uniform(120, 300) * t) + rng.normal(0, 1500, length)
+        else:
+            signal = rng.normal(0, 50, length)
+        audio[position:position + length] = np.clip(signal, -32768, 32767)
+        position += length
+        speaking = not speaking
+    return audio.tobytes()
+
+
+def energy_vad(threshold=500.0):
+    """
+    Stand-in for webrtcvad: an RMS threshold on each frame.
+    """
+    def is_speech(frame, sample_rate):
+        samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+        return float(np.sqrt(np.mean(samples * samples))) > threshold
+    return is_speech
+
+
+def precomputed_vad(pcm, threshold=500.0):
+    """
+    Classify every frame up front so the timed run measures segmentation
+    cost alone. Returns a factory producing a fresh replaying callable.
+    """
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    frames = samples[: len(samples) // 320 * 320].reshape(-1, 320).astype(np.float32)
+    labels = (np.sqrt(np.mean(frames * frames, axis=1)) > threshold).tolist()
+
+    def factory():
+        replay = iter(labels)
+        return lambda frame, sample_rate: next(replay)
+    return factory
+
+
+def blocks(pcm, seed=1):
+    rng = np.random.default_rng(seed)
+    view = memoryview(pcm)
+    position = 0
+    while position < len(pcm):
+        size = int(rng.integers(256, 8192))
+        yield view[position:position + size]
+        position += size
+
+
+def run_segmenter(pcm, is_speech):
+    segmenter = VadSegmenter(is_speech=is_speech)
+    chunks = 0
+    started = time.perf_counter()
+    for block in blocks(pcm):
+        chunks += len(segmenter.feed(block))
+    if segmenter.flush() is not None:
+        chunks += 1
+    elapsed = time.perf_counter() - started
+    return segmenter.frames_processed, chunks, elapsed
+
+
+def run_legacy(pcm, is_speech):
+    """
+    The loop AudioPlayer's PyAudio callback used to run, with immutable
+    bytes slicing and concatenation.
+    """
+    frame_size = 640
+    frame_duration = 0.02
+    vad_buffer = b''
+    current_chunk_buffer = b''
+    is_start = False
+    silence_duration = 0
+    current_chunk_duration = 0
+    frames = 0
+    chunks = 0
+    started = time.perf_counter()
+    for block in blocks(pcm):
+        vad_buffer += bytes(block)
+        while len(vad_buffer) >= frame_size:
+            vad_frame = vad_buffer[:frame_size]
+            vad_buffer = vad_buffer[frame_size:]
+            frames += 1
+            speech = is_speech(vad_frame, SAMPLE_RATE)
+            if not is_start:
+                is_start = True
+                silence_duration = 0
+                current_chunk_duration = frame_duration
+                current_chunk_buffer = vad_frame
+            else:
+                current_chunk_duration += frame_duration
+                if not speech:
+                    silence_duration += frame_duration
+                    if silence_duration >= 0.1 and current_chunk_duration >= 3:
+                        chunks += 1
+                        current_chunk_buffer = b''
+                        is_start = False
+                        current_chunk_duration = 0
+                        silence_duration = 0
+                else:
+                    silence_duration = 0
+                current_chunk_buffer += vad_frame
+    elapsed = time.perf_counter() - started
+    return frames, chunks, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=600, help="Length of synthetic audio")
+    parser.add_argument(
+        "--vad", choices=("precomputed", "energy", "webrtc"), default="precomputed",
+        help="Frame classifier: precomputed labels (segmentation cost only), an energy stub, or webrtcvad",
+    )
+    parser.add_argument("--no-legacy", action="store_true", help="Skip the legacy loop")
+    args = parser.parse_args()
+
+    pcm = synthetic_pcm(args.seconds)
+    if args.vad == "precomputed":
+        make_vad = precomputed_vad(pcm)
+    elif args.vad == "energy":
+        make_vad = energy_vad
+    else:
+        make_vad = lambda: webrtc_vad(3)
+    report = {"audio_seconds": args.seconds, "vad": args.vad}
+
+    runs = [("segmenter", run_segmenter)]
+    if not args.no_legacy:
+        runs.append(("legacy", run_legacy))
+    for name, run in runs:
+        frames, chunks, elapsed = run(pcm, make_vad())
+        report[name] = {
+            "frames": frames,
+            "chunks": chunks,
+            "seconds": round(elapsed, 4),
+            "frames_per_second": round(frames / elapsed),
+            "realtime_factor": round(elapsed / args.seconds, 5),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,24 @@
+from media_player.startup import startup_report
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import router
+from app.routes import router, model_warmup, start_job_transport, stop_job_transport
 from app.session_middleware import SessionMiddleware
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    # Models load after the server is listening, not while it imports
+    if model_warmup is not None:
+        model_warmup.start()
+    start_job_transport()
+    yield
+    stop_job_transport()
+    if model_warmup is not None:
+        model_warmup.release()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 app.add_middleware(SessionMiddleware)
@@ -15,6 +29,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count"],
 )
 
 app.include_router(router)
+startup_report.mark("app")
+print(f"Startup: {startup_report.summary()}")
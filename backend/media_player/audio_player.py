@@ -1,44 +1,60 @@
 import numpy as np
 import threading
 import subprocess
-import pyaudio
 import time
 import wave
 import os
-import webrtcvad
+from collections import deque
+from media_player.chunk_queue import AudioChunk
+from media_player.vad_segmenter import VadSegmenter
+from media_player.metrics import STAGE_SECONDS
 
 class AudioPlayer:
-    def __init__(self, temp_dir='temp_audio_files'):
+    def __init__(self, temp_dir='temp_audio_files', debug_sink=False, pcm_cache=None, debug_keep=None,
+                 provisional_interval=1.0):
         self.session = None
+        # Seconds of new speech between provisional snapshots of the chunk
+        # still being cut
+        self.provisional_interval = provisional_interval
+        self.debug_sink = debug_sink
+        # With `debug_keep`, only that many of the newest debug WAVs are kept
+        self._debug_files = deque(maxlen=debug_keep) if debug_keep else None
+        # Optional PcmCache: cached files play from memory-mapped PCM, others
+        # are decoded by ffmpeg while being cached in the background
+        self.pcm_cache = pcm_cache
         self.process = None
         self.stream = None
         self.lock = threading.Lock()
         self.terminate = False
         self.thread = None
         self.file_count = 0
-        self.time_file_dict = {}
 
         script_dir = os.path.dirname(os.path.abspath(__file__))
         self.temp_dir = os.path.join(script_dir, temp_dir)
         if not os.path.exists(self.temp_dir):
             os.makedirs(self.temp_dir)
 
-    def play(self, audio_path, start_time=0):
-        self.thread = threading.Thread(target=self._play_in_thread, args=(audio_path, start_time), daemon=True)
+    def play(self, audio_path, start_time=0, on_chunk=None, on_provisional=None):
+        """
+        Play `audio_path` from `start_time`, passing each VAD chunk to
+        `on_chunk` (e.g. ChunkQueue.put) as it is cut. If given,
+        `on_provisional` gets a copy of the chunk still being cut every
+        `provisional_interval` seconds, under the index it will be emitted
+        with.
+        """
+        self.thread = threading.Thread(
+            target=self._play_in_thread, args=(audio_path, start_time, on_chunk, on_provisional), daemon=True
+        )
         self.thread.start()
 
-    def _play_in_thread(self, audio_path, start_time):
+    def _play_in_thread(self, audio_path, start_time, on_chunk=None, on_provisional=None):
+        # Imported here so the server starts without touching the audio stack
+        import pyaudio
 
         sample_rate = 16000  # Hz
         channels = 1  # Mono
         sample_width = 2  # Bytes for 16-bit PCM
 
-        frame_duration_ms = 20  # VAD frame duration in milliseconds
-        frame_samples = int(sample_rate * frame_duration_ms / 1000)
-        frame_size = frame_samples * sample_width * channels  # VAD frame size in bytes
-
-        vad_buffer = b''  # Buffer to accumulate data for VAD
-
         command = [
             "ffmpeg",
             "-ss", str(start_time),
@@ -50,75 +66,68 @@ class AudioPlayer:
             "-",
         ]
 
-        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        pcm = self.pcm_cache.get(audio_path) if self.pcm_cache is not None else None
+        if pcm is not None:
+            process = None
+            read_stage = "pcm_cache_read"
+            position = min(int(float(start_time or 0) * sample_rate), len(pcm))
+
+            def read(requested_bytes):
+                # A view into the mapped file; nothing is decoded or copied
+                nonlocal position
+                start = position
+                position = min(start + requested_bytes // sample_width, len(pcm))
+                return pcm[start:position]
+        else:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            read_stage = "ffmpeg_decode"
+            read = process.stdout.read
+            if self.pcm_cache is not None:
+                self.pcm_cache.warm(audio_path)
+
         p = pyaudio.PyAudio()
-        vad = webrtcvad.Vad()
-        vad.set_mode(3)
-
-        silence_duration = 0
-        max_silence_duration = 0.1  # Seconds
-        max_chunk_duration = 5  # Seconds
-        min_chunk_duration = 3  # Seconds
-        current_chunk_duration = 0
-        isStart = False
-        current_chunk_buffer = b'' 
-        elapsed_time = 0.0  # Initialize elapsed_time
-        clip_start_time = None
+        segmenter = VadSegmenter(
+            sample_rate=sample_rate,
+            frame_duration_ms=20,  # VAD frame duration in milliseconds
+            min_chunk_duration=3,  # Seconds
+            max_chunk_duration=5,  # Seconds
+            max_silence_duration=0.1,  # Seconds
+            start_time=float(start_time or 0),
+            vad_mode=3,
+        )
+        provisional_bytes = int(self.provisional_interval * sample_rate) * sample_width
+        provisional_next = [provisional_bytes]
+
         def callback(in_data, frame_count, time_info, status):
-            nonlocal silence_duration, current_chunk_duration, vad_buffer, isStart, current_chunk_buffer, clip_start_time, elapsed_time
-            
             requested_bytes = frame_count * sample_width * channels
-            audio_data = process.stdout.read(requested_bytes)
+            with STAGE_SECONDS.time(stage=read_stage):
+                audio_data = read(requested_bytes)
             
-            if not audio_data or self.terminate:
+            if not len(audio_data) or self.terminate:
                 return (None, pyaudio.paComplete)
-            
-            vad_buffer += audio_data
 
-            while len(vad_buffer) >= frame_size:
-                vad_frame = vad_buffer[:frame_size]
-                vad_buffer = vad_buffer[frame_size:]
-                elapsed_time += frame_duration_ms / 1000
-                try:
-                    is_speech = vad.is_speech(vad_frame, sample_rate)
-
-                    if not isStart:
-                        isStart = True
-                        silence_duration = 0
-                        current_chunk_duration = frame_duration_ms / 1000
-                        current_chunk_buffer = vad_frame
-                        clip_start_time = start_time + elapsed_time - (frame_duration_ms / 1000.0)
-
-                    elif isStart:
-                        current_chunk_duration += frame_duration_ms / 1000
-                        if not is_speech:
-                            silence_duration += frame_duration_ms / 1000
-                            if silence_duration >= max_silence_duration and (
-                                min_chunk_duration <= current_chunk_duration <= max_chunk_duration
-                                or current_chunk_duration >= max_chunk_duration
-                            ):
-                                session_prefix = f"{self.session}_" if self.session else ""
-                                file_name = os.path.join(
-                                    self.temp_dir, f"{session_prefix}temp_audio_{self.file_count}.wav"
-                                )
-                                chunk_audio_data_np = np.frombuffer(current_chunk_buffer, dtype=np.int16)
-                                self._save_clip(file_name, chunk_audio_data_np, sample_rate, channels, sample_width)
-                                # print(f"Saving clip to {file_name} starting at {clip_start_time} seconds")
-                                self.time_file_dict[file_name] = clip_start_time
-                                current_chunk_buffer = b''
-                                isStart = False
-                                current_chunk_duration = 0
-                                silence_duration = 0
-                                self.file_count += 1
-                        else:
-                            silence_duration = 0
-                        current_chunk_buffer += vad_frame
-
-                except Exception as e:
-                    print(f"Error in vad.is_speech: {e}")
-                    return (None, pyaudio.paAbort)
+            try:
+                with STAGE_SECONDS.time(stage="vad"):
+                    chunks = segmenter.feed(audio_data)
+                for chunk in chunks:
+                    self._emit_chunk(
+                        on_chunk, segmenter.view(chunk), chunk.start_time, sample_rate, channels, sample_width
+                    )
+                if chunks:
+                    provisional_next[0] = provisional_bytes
+                if on_provisional is not None and provisional_bytes:
+                    growing = segmenter.open_chunk()
+                    if growing is not None and growing.length >= provisional_next[0]:
+                        provisional_next[0] = growing.length + provisional_bytes
+                        on_provisional(AudioChunk(
+                            self.session, self.file_count, growing.start_time,
+                            segmenter.samples(growing).copy(), sample_rate, time.monotonic() - growing.duration,
+                        ))
+            except Exception as e:
+                print(f"Error in vad.is_speech: {e}")
+                return (None, pyaudio.paAbort)
                 
-            return (audio_data, pyaudio.paContinue)
+            return (bytes(audio_data), pyaudio.paContinue)
 
         stream = p.open(format=pyaudio.paInt16,  # 16-bit PCM
                         channels=channels,       
@@ -138,17 +147,40 @@ class AudioPlayer:
                 time.sleep(0.1)
         finally:
             self.stop()
-            self._save_remaining_chunk(current_chunk_buffer, sample_rate, channels, sample_width)
-
-    def _save_remaining_chunk(self, current_chunk_buffer, sample_rate, channels, sample_width):
-        """ Save the last chunk if it's non-empty """
-        if current_chunk_buffer:
+            p.terminate()
+            remaining_chunk = segmenter.flush()
+            if remaining_chunk is not None:
+                self._emit_chunk(
+                    on_chunk, segmenter.view(remaining_chunk), remaining_chunk.start_time, sample_rate, channels, sample_width
+                )
+
+    def _emit_chunk(self, on_chunk, chunk_buffer, clip_start_time, sample_rate, channels, sample_width):
+        """
+        Hand a finished chunk to the transcriber. The WAV file is only
+        written when the debug sink is enabled.
+        """
+        emitted_at = time.monotonic()
+        # Copied out of the segmenter's ring buffer, which is reused
+        chunk_audio_data_np = np.frombuffer(chunk_buffer, dtype=np.int16).copy()
+        if on_chunk is not None:
+            played_at = emitted_at - len(chunk_audio_data_np) / sample_rate
+            on_chunk(AudioChunk(self.session, self.file_count, clip_start_time, chunk_audio_data_np, sample_rate,
+                                played_at))
+        if self.debug_sink:
             session_prefix = f"{self.session}_" if self.session else ""
-            file_name = os.path.join(self.temp_dir, f"{session_prefix}temp_audio_{self.file_count}.wav")
-            chunk_audio_data_np = np.frombuffer(current_chunk_buffer, dtype=np.int16)
+            file_name = os.path.join(
+                self.temp_dir, f"{session_prefix}temp_audio_{self.file_count}.wav"
+            )
+            if self._debug_files is not None and len(self._debug_files) == self._debug_files.maxlen:
+                try:
+                    os.remove(self._debug_files[0])
+                except OSError:
+                    pass
             self._save_clip(file_name, chunk_audio_data_np, sample_rate, channels, sample_width)
-            self.time_file_dict[file_name] = time.time()  # Approximate time if needed
-            self.file_count += 1
+            if self._debug_files is not None:
+                self._debug_files.append(file_name)
+        self.file_count += 1
+        STAGE_SECONDS.observe(time.monotonic() - emitted_at, stage="chunk_emit")
 
     def _save_clip(self, file_name, audio_data, sample_rate, channels, sample_width):
         with wave.open(file_name, 'wb') as wf:
@@ -192,12 +224,6 @@ class AudioPlayer:
     def set_session(self, session):
         self.session = session
 
-    def get_clip_start_time(self, file_name):
-        if file_name in self.time_file_dict:
-            return self.time_file_dict[file_name]
-        else:
-            return None
-
 
             
 
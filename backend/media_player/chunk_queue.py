@@ -0,0 +1,100 @@
+import queue
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+class AudioChunk:
+    """
+    One VAD-segmented clip of 16 kHz mono audio, handed from the player to
+    the transcriber in memory. `played_at` is the monotonic clock time its
+    first sample was played, for chunks cut from live playback.
+    """
+
+    def __init__(self, session_id, index, start_time, samples, sample_rate=SAMPLE_RATE, played_at=None):
+        self.session_id = session_id
+        self.index = index
+        self.start_time = start_time
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self.played_at = played_at
+
+    @property
+    def duration(self):
+        return len(self.samples) / self.sample_rate
+
+    @property
+    def end_time(self):
+        return self.start_time + self.duration
+
+    def slice(self, start_time, end_time):
+        """
+        Return the part of this chunk between two media times as a new
+        chunk sharing the same sample buffer.
+        """
+        first = max(int(round((start_time - self.start_time) * self.sample_rate)), 0)
+        last = min(int(round((end_time - self.start_time) * self.sample_rate)), len(self.samples))
+        return AudioChunk(self.session_id, self.index, self.start_time + first / self.sample_rate,
+                          self.samples[first:last], self.sample_rate, self.played_at)
+
+    def as_float32(self):
+        """
+        Return the clip as float32 in [-1, 1], the format whisperx.load_audio
+        produces.
+        """
+        if self.samples.dtype == np.float32:
+            return self.samples
+        return self.samples.astype(np.float32) / 32768.0
+
+    def __repr__(self):
+        return f"AudioChunk(session={self.session_id}, index={self.index}, start={self.start_time:.2f}, duration={self.duration:.2f})"
+
+
+class ChunkQueue:
+    """
+    Bounded queue of AudioChunks for a single session.
+
+    `put` never blocks the real-time audio thread: when the queue is full
+    the oldest pending chunk is dropped to make room.
+    """
+
+    _CLOSED = object()
+
+    def __init__(self, maxsize=32):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, chunk):
+        while True:
+            try:
+                self._queue.put_nowait(chunk)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        """
+        Return the next chunk, or None once the queue is closed or the
+        timeout expires.
+        """
+        try:
+            chunk = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if chunk is self._CLOSED:
+            # Leave the marker in place for any other consumer
+            self.put(self._CLOSED)
+            return None
+        return chunk
+
+    def close(self):
+        self.closed = True
+        self.put(self._CLOSED)
+
+    def qsize(self):
+        return self._queue.qsize()
@@ -0,0 +1,52 @@
+import numpy as np
+
+
+def normalize_rows(matrix):
+    """
+    Scale each row to unit length; all-zero rows are left as they are.
+    """
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def spherical_kmeans(embeddings, k, iterations=25, seed=0):
+    """
+    Cluster normalized embeddings by cosine similarity with k-means++
+    seeding. Returns (k, dim) unit-length centroids, largest cluster first;
+    fewer than `k` rows are returned as they are.
+    """
+    embeddings = normalize_rows(np.asarray(embeddings, dtype=np.float32))
+    if len(embeddings) <= k:
+        return embeddings
+    rng = np.random.default_rng(seed)
+    centroids = np.empty((k, embeddings.shape[1]), dtype=np.float32)
+    centroids[0] = embeddings[rng.integers(len(embeddings))]
+    # Similarity of every embedding to its nearest centroid so far, updated
+    # one centroid at a time
+    max_sim = embeddings @ centroids[0]
+    for cluster in range(1, k):
+        distance = np.clip(1.0 - max_sim.astype(np.float64), 0.0, None)
+        total = distance.sum()
+        choice = rng.choice(len(embeddings), p=distance / total) if total > 0 else rng.integers(len(embeddings))
+        centroids[cluster] = embeddings[choice]
+        np.maximum(max_sim, embeddings @ centroids[cluster], out=max_sim)
+
+    assignment = None
+    for _ in range(iterations):
+        similarities = embeddings @ centroids.T
+        new_assignment = similarities.argmax(axis=1)
+        if assignment is not None and np.array_equal(new_assignment, assignment):
+            break
+        assignment = new_assignment
+        for cluster in range(k):
+            members = embeddings[assignment == cluster]
+            if len(members):
+                centroids[cluster] = members.sum(axis=0)
+            else:
+                # Reseed an empty cluster with the worst-served embedding
+                centroids[cluster] = embeddings[similarities.max(axis=1).argmin()]
+        centroids = normalize_rows(centroids)
+
+    sizes = np.bincount(assignment, minlength=k)
+    return centroids[np.argsort(-sizes, kind="stable")]
@@ -0,0 +1,367 @@
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+import numpy as np
+from media_player.chunk_queue import AudioChunk, SAMPLE_RATE
+from media_player.vad_segmenter import VadSegmenter, SAMPLE_WIDTH
+from media_player.metrics import STAGE_SECONDS
+from media_player.speech_to_text.transcript_cache import shift_phrase
+
+BASE_DIR = os.path.dirname(__file__)
+VIDEO_DIR = os.path.join(BASE_DIR, 'video_clips')
+
+
+def resolve_video_path(video_name):
+    """
+    Accept either a path or a file name inside VIDEO_DIR.
+    """
+    if os.path.exists(video_name):
+        return video_name
+    return os.path.join(VIDEO_DIR, video_name)
+
+
+def decode_audio(video_path, start_time=0, sample_rate=SAMPLE_RATE, duration=None):
+    """
+    Decode a media file to 16 kHz mono int16 PCM in one ffmpeg pass.
+
+    With a known `duration` (e.g. from the media catalog) the PCM is read
+    straight into a preallocated buffer instead of collecting ffmpeg's
+    output and copying it.
+    """
+    command = [
+        "ffmpeg",
+        "-nostdin",
+        "-ss", str(start_time),
+        "-i", video_path,
+        "-f", "s16le",  # Raw PCM data
+        "-acodec", "pcm_s16le",
+        "-ac", "1",  # Mono
+        "-ar", str(sample_rate),
+        "-",
+    ]
+    with STAGE_SECONDS.time(stage="ffmpeg_decode"):
+        return _run_ffmpeg(command, video_path, start_time, sample_rate, duration)
+
+
+def _run_ffmpeg(command, video_path, start_time, sample_rate, duration):
+    if not duration:
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed for {video_path}: {result.stderr.decode(errors='replace')[-500:]}")
+        return np.frombuffer(result.stdout, dtype=np.int16)
+
+    # Probed durations can be slightly short, so leave a second of headroom
+    capacity = int((max(duration - start_time, 0) + 1) * sample_rate)
+    pcm = np.empty(capacity, dtype=np.int16)
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr)
+        buffer = memoryview(pcm).cast("B")
+        filled = 0
+        while True:
+            if filled == len(buffer):
+                # Grow if the duration was underestimated
+                pcm = np.concatenate([pcm, np.empty(capacity // 4 + sample_rate, dtype=np.int16)])
+                buffer = memoryview(pcm).cast("B")
+            read = process.stdout.readinto(buffer[filled:])
+            if not read:
+                break
+            filled += read
+        process.stdout.close()
+        if process.wait() != 0:
+            stderr.seek(0)
+            raise RuntimeError(f"ffmpeg failed for {video_path}: {stderr.read().decode(errors='replace')[-500:]}")
+    return pcm[:filled // SAMPLE_WIDTH]
+
+
+def segment_audio(pcm, start_time=0.0, session_id=None, is_speech=None, sample_rate=SAMPLE_RATE):
+    """
+    Cut decoded PCM into AudioChunks with the player's VAD rules. Chunk
+    samples are views into `pcm`, not copies.
+    """
+    segmenter = VadSegmenter(sample_rate=sample_rate, start_time=start_time, is_speech=is_speech)
+    with STAGE_SECONDS.time(stage="vad"):
+        descriptors = segmenter.feed(pcm)
+        remaining = segmenter.flush()
+    if remaining is not None:
+        descriptors.append(remaining)
+
+    chunks = []
+    for descriptor in descriptors:
+        offset = int(round((descriptor.start_time - start_time) * sample_rate))
+        length = descriptor.length // SAMPLE_WIDTH
+        chunks.append(AudioChunk(session_id, descriptor.index, descriptor.start_time, pcm[offset:offset + length], sample_rate))
+    return chunks
+
+
+def assemble_transcript(results):
+    """
+    Turn per-chunk phrase lists into one transcript ordered by media time.
+    `results` is an iterable of (chunk, phrases) pairs.
+    """
+    transcript = []
+    for chunk, phrases in results:
+        for phrase in phrases or []:
+            absolute = shift_phrase(phrase, chunk.start_time)
+            transcript.append({
+                "speaker": phrase.get("speaker"),
+                "similarity": phrase.get("similarity"),
+                "text": phrase["text"].strip(),
+                "start": round(absolute["start"], 3),
+                "end": round(absolute["end"], 3),
+                "words": [
+                    {"word": word["word"], "start": round(word["start"], 3), "end": round(word["end"], 3)}
+                    for word in absolute.get("words", [])
+                ],
+            })
+    transcript.sort(key=lambda phrase: (phrase["start"], phrase["end"]))
+    return transcript
+
+
+class _InOrder:
+    """
+    Finishes chunk results in chunk order however they arrive, since
+    naming speakers in `finish(chunk, result)` depends on every chunk
+    before it. A failed chunk is passed as None and skipped.
+    """
+
+    def __init__(self, chunks, finish):
+        self.chunks = chunks
+        self.finish = finish
+        self.results = []
+        self._positions = {chunk.index: position for position, chunk in enumerate(chunks)}
+        self._arrived = {}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def done(self, chunk, result):
+        with self._lock:
+            self._arrived[self._positions[chunk.index]] = result
+            while self._next in self._arrived:
+                result = self._arrived.pop(self._next)
+                chunk = self.chunks[self._next]
+                self._next += 1
+                if result is None:
+                    continue
+                try:
+                    self.results.append((chunk, self.finish(chunk, result)))
+                except Exception as e:
+                    print(f"Error finishing chunk {chunk}: {e}")
+
+
+class IngestJob:
+    """
+    Faster-than-real-time transcription of a whole media file.
+
+    The file is decoded once, segmented with the player's VAD rules and its
+    chunks are fanned out to a pool of workers. No audio device is used.
+    With a `scheduler` (the server's InferenceScheduler) the chunks run as
+    a background session there instead, at most `workers` at a time, so an
+    ingest only uses capacity live sessions leave free. Either way the
+    workers only run the models; speakers are named one chunk at a time,
+    in media order.
+    """
+
+    def __init__(self, video_path, workers=None, executor="thread", start_time=0, is_speech=None, transcriber=None,
+                 cache=None, duration=None, pcm_cache=None, scheduler=None):
+        self.id = uuid.uuid4().hex
+        self.video_path = video_path
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = executor
+        self.start_time = start_time
+        self.is_speech = is_speech
+        self.transcriber = transcriber
+        self.cache = cache
+        self.media_key = None
+        self.duration = duration
+        self.pcm_cache = pcm_cache
+        self.scheduler = scheduler
+        self.status = "pending"
+        self.error = None
+        self.total_chunks = 0
+        self.completed_chunks = 0
+        self.audio_seconds = 0.0
+        self.started_at = None
+        self.elapsed_seconds = None
+        self.transcript = []
+        self._thread = None
+
+    def start(self):
+        """
+        Run the job on a background thread.
+        """
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run(self):
+        started = time.perf_counter()
+        self.started_at = time.monotonic()
+        self.status = "running"
+        try:
+            if self.cache is not None:
+                self.media_key = self.cache.media_key(self.video_path)
+            if self.pcm_cache is not None:
+                # Chunks become views into the mapped file
+                pcm = self.pcm_cache.view(self.video_path, self.start_time)
+            else:
+                pcm = decode_audio(self.video_path, self.start_time, duration=self.duration)
+            self.audio_seconds = len(pcm) / SAMPLE_RATE
+            chunks = segment_audio(pcm, float(self.start_time), session_id=self.id, is_speech=self.is_speech)
+            self.total_chunks = len(chunks)
+            self.transcript = assemble_transcript(self._process(chunks))
+            self.status = "done"
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+            print(f"Ingest of {self.video_path} failed: {e}")
+        finally:
+            self.elapsed_seconds = round(time.perf_counter() - started, 3)
+        return self.transcript
+
+    def _process(self, chunks):
+        # Imported here so decoding and segmentation work without the models
+        from media_player.speech_to_text.process_audio_queue import ProcessAudioQueue, process_chunk_in_worker
+
+        results = []
+        if self.cache is not None:
+            # Fully cached chunks never reach the workers
+            uncached = []
+            for chunk in chunks:
+                phrases = self.cache.lookup(self.media_key, chunk.start_time, chunk.end_time)
+                if phrases is None:
+                    uncached.append(chunk)
+                    continue
+                self.cache.record("hit")
+                results.append((chunk, [shift_phrase(phrase, -chunk.start_time) for phrase in phrases]))
+                self.completed_chunks += 1
+            chunks = uncached
+
+        if self.scheduler is not None:
+            results.extend(self._process_scheduled(chunks))
+            return results
+
+        audio_queue = ProcessAudioQueue(session_id=self.id, transcriber=self.transcriber,
+                                        cache=self.cache, media_key=self.media_key)
+        if self.executor == "process":
+            pool = ProcessPoolExecutor(max_workers=self.workers)
+            handler = process_chunk_in_worker
+        else:
+            pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ingest")
+            handler = audio_queue.run_job
+        in_order = _InOrder(chunks, audio_queue.complete_remote)
+        try:
+            futures = {pool.submit(handler, audio_queue.remote_job(chunk)): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Error processing chunk {chunk}: {e}")
+                    result = None
+                in_order.done(chunk, result)
+                self.completed_chunks += 1
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            audio_queue.close()
+        results.extend(in_order.results)
+        return results
+
+    def _process_scheduled(self, chunks):
+        from media_player.speech_to_text.process_audio_queue import ProcessAudioQueue
+        from media_player.speech_to_text.inference_scheduler import BLOCK
+
+        done = threading.Condition()
+        audio_queue = ProcessAudioQueue(session_id=self.id, transcriber=self.transcriber,
+                                        cache=self.cache, media_key=self.media_key)
+        in_order = _InOrder(chunks, audio_queue.complete_remote)
+
+        def on_result(chunk, result):
+            in_order.done(chunk, result)
+            with done:
+                self.completed_chunks += 1
+                done.notify_all()
+
+        def on_error(chunk, error):
+            on_result(chunk, None)
+
+        # Chunks run in parallel and are finished in order as they come
+        # back; a full queue makes this thread wait instead of dropping
+        audio_queue.register(self.scheduler, on_result, raw=True, on_error=on_error, background=True,
+                             max_in_flight=self.workers, policy=BLOCK)
+        try:
+            for chunk in chunks:
+                if not self.scheduler.submit(self.id, chunk):
+                    raise RuntimeError("Inference scheduler is shutting down")
+            with done:
+                done.wait_for(lambda: self.completed_chunks >= self.total_chunks)
+        finally:
+            self.scheduler.unregister_session(self.id, on_idle=audio_queue.close)
+        return in_order.results
+
+    def status_dict(self, include_transcript=False):
+        status = {
+            "id": self.id,
+            "video": os.path.basename(self.video_path),
+            "status": self.status,
+            "error": self.error,
+            "total_chunks": self.total_chunks,
+            "completed_chunks": self.completed_chunks,
+            "audio_seconds": round(self.audio_seconds, 3),
+            "elapsed_seconds": self.elapsed_seconds,
+        }
+        if include_transcript:
+            status["transcript"] = self.transcript
+        return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe a media file without playing it.")
+    parser.add_argument("video", help=f"Media file path or name inside {VIDEO_DIR}")
+    parser.add_argument("--out", help="Write the transcript JSON here instead of stdout")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel workers (default: CPU count)")
+    parser.add_argument("--executor", choices=("thread", "process"), default="thread")
+    parser.add_argument("--start", type=float, default=0, help="Start offset in seconds")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore and do not update the transcript cache")
+    parser.add_argument("--pcm-cache", action="store_true", help="Read and keep the decoded audio in the PCM cache")
+    args = parser.parse_args()
+
+    transcriber = None
+    if args.executor == "thread":
+        from media_player.speech_to_text.batch_transcriber import BatchTranscriber
+        transcriber = BatchTranscriber()
+
+    cache = None
+    if not args.no_cache:
+        from media_player.speech_to_text.transcript_cache import TranscriptCache
+        cache = TranscriptCache()
+
+    pcm_cache = None
+    if args.pcm_cache:
+        from media_player.pcm_cache import PcmCache
+        pcm_cache = PcmCache()
+
+    job = IngestJob(resolve_video_path(args.video), workers=args.workers, executor=args.executor,
+                    start_time=args.start, transcriber=transcriber, cache=cache, pcm_cache=pcm_cache)
+    job.run()
+    output = job.status_dict(include_transcript=True)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(output, f, indent=2)
+    else:
+        print(json.dumps(output, indent=2))
+    if job.status != "done":
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+import json
+import os
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+VIDEO_EXTENSIONS = (".mp4", ".webm")
+
+# Probe results that survive restarts, keyed by file name
+CATALOG_PATH = os.path.join(os.path.dirname(__file__), 'media_catalog.json')
+
+
+def probe_media(path):
+    """
+    Read duration, codecs and audio format of a media file with ffprobe.
+    """
+    command = [
+        "ffprobe",
+        "-v", "error",
+        "-print_format", "json",
+        "-show_format",
+        "-show_streams",
+        path,
+    ]
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed for {path}: {result.stderr.decode(errors='replace')[-300:]}")
+    info = json.loads(result.stdout or b"{}")
+    streams = info.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), {})
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), {})
+    duration = info.get("format", {}).get("duration")
+    return {
+        "duration": round(float(duration), 3) if duration else None,
+        "format": info.get("format", {}).get("format_name"),
+        "video_codec": video.get("codec_name"),
+        "width": video.get("width"),
+        "height": video.get("height"),
+        "audio_codec": audio.get("codec_name"),
+        "audio_sample_rate": int(audio["sample_rate"]) if audio.get("sample_rate") else None,
+        "audio_channels": audio.get("channels"),
+    }
+
+
+class _CatalogEventHandler(FileSystemEventHandler):
+    def __init__(self, catalog):
+        super().__init__()
+        self.catalog = catalog
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.catalog.refresh(event.src_path, settled=False)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.catalog.refresh(event.src_path, settled=False)
+
+    def on_closed(self, event):
+        if not event.is_directory:
+            self.catalog.refresh(event.src_path)
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self.catalog.remove(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.catalog.remove(event.src_path)
+            self.catalog.refresh(event.dest_path)
+
+
+class MediaCatalog:
+    """
+    In-memory index of the videos in `video_dir`.
+
+    The directory is scanned once at startup and then kept current by a
+    filesystem watch. Every file is probed with ffprobe once per
+    (size, mtime); results are persisted to `catalog_path` so restarts
+    only probe new or changed files. Probing runs in the background, so
+    a freshly added file is listed immediately and gains its metadata
+    shortly after. A file that is still being written is probed once the
+    writer closes it, or once its size and mtime have held still for
+    `settle_seconds` where close events are not reported, rather than on
+    every write.
+    """
+
+    def __init__(self, video_dir, catalog_path=CATALOG_PATH, probe_workers=2, settle_seconds=2.0):
+        self.video_dir = video_dir
+        self.catalog_path = catalog_path
+        self.settle_seconds = settle_seconds
+        self._entries = {}
+        self._settle_timers = {}
+        self._sorted_names = None
+        self._lock = threading.RLock()
+        self._probe_pool = ThreadPoolExecutor(max_workers=probe_workers, thread_name_prefix="ffprobe")
+        self._observer = None
+        self._save_timer = None
+
+    def load(self):
+        """
+        Scan `video_dir`, reusing persisted probe results where the file is
+        unchanged and queueing probes for the rest.
+        """
+        persisted = {}
+        try:
+            with open(self.catalog_path) as f:
+                persisted = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+        os.makedirs(self.video_dir, exist_ok=True)
+        with self._lock:
+            self._entries = {}
+            with os.scandir(self.video_dir) as scan:
+                for dir_entry in scan:
+                    if not dir_entry.is_file() or not dir_entry.name.endswith(VIDEO_EXTENSIONS):
+                        continue
+                    stat = dir_entry.stat()
+                    entry = self._new_entry(dir_entry.name, stat)
+                    previous = persisted.get(dir_entry.name)
+                    if previous and (previous.get("size"), previous.get("mtime_ns")) == (stat.st_size, stat.st_mtime_ns):
+                        entry.update(previous)
+                    self._entries[dir_entry.name] = entry
+            self._sorted_names = None
+            unprobed = [name for name, entry in self._entries.items() if not entry["probed"]]
+        for name in unprobed:
+            self._probe_pool.submit(self._probe, name)
+        self._schedule_save()
+        return self
+
+    def start_watching(self):
+        if self._observer is not None:
+            return
+        self._observer = Observer()
+        self._observer.schedule(_CatalogEventHandler(self), path=self.video_dir, recursive=False)
+        self._observer.daemon = True
+        self._observer.start()
+
+    def stop(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        with self._lock:
+            timers, self._settle_timers = list(self._settle_timers.values()), {}
+        for timer in timers:
+            timer.cancel()
+        self._probe_pool.shutdown(wait=False)
+        self._save()
+
+    def _new_entry(self, name, stat):
+        return {
+            "name": name,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "probed": False,
+            "duration": None,
+            "format": None,
+            "video_codec": None,
+            "width": None,
+            "height": None,
+            "audio_codec": None,
+            "audio_sample_rate": None,
+            "audio_channels": None,
+        }
+
+    def refresh(self, path, settled=True):
+        """
+        Pick up a created or modified file. Without `settled` the file may
+        still be being written: it is listed right away but only probed
+        once it has stopped changing for `settle_seconds`.
+        """
+        name = os.path.basename(path)
+        if os.path.dirname(os.path.abspath(path)) != os.path.abspath(self.video_dir):
+            return
+        if not name.endswith(VIDEO_EXTENSIONS):
+            return
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self.remove(path)
+            return
+        signature = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            entry = self._entries.get(name)
+            changed = entry is None or (entry["size"], entry["mtime_ns"]) != signature
+            if changed:
+                self._entries[name] = self._new_entry(name, stat)
+                self._sorted_names = None
+            if not settled:
+                if changed and name not in self._settle_timers:
+                    self._start_settle_timer_locked(name, signature)
+                return
+            timer = self._settle_timers.pop(name, None)
+            if timer is not None:
+                timer.cancel()
+            # Unchanged and not waiting to settle: probed or queued already
+            if not changed and timer is None:
+                return
+        self._probe_pool.submit(self._probe, name)
+
+    def _start_settle_timer_locked(self, name, signature):
+        timer = threading.Timer(self.settle_seconds, self._settle, args=(name, signature))
+        timer.daemon = True
+        self._settle_timers[name] = timer
+        timer.start()
+
+    def _settle(self, name, signature):
+        # Probe if the file still looks as it did `settle_seconds` ago,
+        # otherwise wait another round
+        try:
+            stat = os.stat(os.path.join(self.video_dir, name))
+        except FileNotFoundError:
+            stat = None
+        with self._lock:
+            if self._settle_timers.get(name) is not threading.current_thread():
+                return
+            del self._settle_timers[name]
+            if stat is None or name not in self._entries:
+                return
+            current = (stat.st_size, stat.st_mtime_ns)
+            if current != signature:
+                self._entries[name] = self._new_entry(name, stat)
+                self._start_settle_timer_locked(name, current)
+                return
+        self._probe_pool.submit(self._probe, name)
+
+    def remove(self, path):
+        name = os.path.basename(path)
+        with self._lock:
+            timer = self._settle_timers.pop(name, None)
+            if timer is not None:
+                timer.cancel()
+            if self._entries.pop(name, None) is not None:
+                self._sorted_names = None
+                self._schedule_save()
+
+    def _probe(self, name):
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                return
+            signature = (entry["size"], entry["mtime_ns"])
+        try:
+            metadata = probe_media(os.path.join(self.video_dir, name))
+        except Exception as e:
+            print(f"Error probing {name}: {e}")
+            return
+        with self._lock:
+            entry = self._entries.get(name)
+            # Skip results for a file that changed while it was probed
+            if entry is None or (entry["size"], entry["mtime_ns"]) != signature:
+                return
+            entry.update(metadata)
+            entry["probed"] = True
+        self._schedule_save()
+
+    def _schedule_save(self, delay=2.0):
+        # Debounced so a burst of probes writes the catalog once
+        with self._lock:
+            if self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(delay, self._save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _save(self):
+        with self._lock:
+            self._save_timer = None
+            snapshot = {name: dict(entry) for name, entry in self._entries.items() if entry["probed"]}
+        temp_path = f"{self.catalog_path}.tmp"
+        try:
+            with open(temp_path, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(temp_path, self.catalog_path)
+        except OSError as e:
+            print(f"Error saving media catalog: {e}")
+
+    def get(self, name):
+        """
+        Metadata for one file, or None if it is not in the catalog.
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            return dict(entry) if entry is not None else None
+
+    def __contains__(self, name):
+        with self._lock:
+            return name in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def list(self, offset=0, limit=None, query=None, extension=None, min_duration=None, max_duration=None):
+        """
+        Return (total, page) of entries sorted by name, filtered by a
+        case-insensitive name substring, extension and duration bounds.
+        """
+        with self._lock:
+            if self._sorted_names is None:
+                self._sorted_names = sorted(self._entries)
+            names = self._sorted_names
+            entries = self._entries
+            if query:
+                query = query.lower()
+                names = [name for name in names if query in name.lower()]
+            if extension:
+                extension = extension if extension.startswith(".") else f".{extension}"
+                names = [name for name in names if name.lower().endswith(extension.lower())]
+            if min_duration is not None:
+                names = [name for name in names if (entries[name]["duration"] or 0) >= min_duration]
+            if max_duration is not None:
+                names = [name for name in names
+                         if entries[name]["duration"] is not None and entries[name]["duration"] <= max_duration]
+            total = len(names)
+            page = names[offset:offset + limit] if limit is not None else names[offset:]
+            return total, [dict(entries[name]) for name in page]
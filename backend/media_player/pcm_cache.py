@@ -0,0 +1,174 @@
+import glob
+import hashlib
+import os
+import subprocess
+import threading
+import numpy as np
+from media_player.chunk_queue import SAMPLE_RATE
+from media_player.metrics import metrics, STAGE_SECONDS
+
+BASE_DIR = os.path.dirname(__file__)
+PCM_CACHE_DIR = os.path.join(BASE_DIR, 'pcm_cache')
+PCM_SUFFIX = ".s16le"
+
+PCM_CACHE_LOOKUPS = metrics.counter("pcm_cache_lookups_total", "Decoded audio cache lookups", ["outcome"])
+
+
+class PcmCache:
+    """
+    Decoded audio per media file, on disk and memory-mapped.
+
+    The first full decode of a file writes its whole soundtrack as 16 kHz
+    mono s16le. Later plays, seeks and ingests map that file and slice any
+    offset straight out of it as a read-only int16 view, with no ffmpeg
+    process. Entries are keyed by path, size and mtime, so an edited file
+    is decoded again. When the cache exceeds `max_bytes`, the least
+    recently used entries are deleted. Processes that still have an
+    entry mapped keep reading it.
+    """
+
+    def __init__(self, cache_dir=PCM_CACHE_DIR, max_bytes=4 * 1024 ** 3, sample_rate=SAMPLE_RATE):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+        self._decode_locks = {}
+        self._warming = set()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_path(self, media_path):
+        stat = os.stat(media_path)
+        key = f"{os.path.abspath(media_path)}:{stat.st_size}:{stat.st_mtime_ns}:{self.sample_rate}"
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + PCM_SUFFIX)
+
+    def _map(self, entry_path):
+        if os.path.getsize(entry_path) == 0:
+            return np.zeros(0, dtype=np.int16)
+        return np.memmap(entry_path, dtype=np.int16, mode="r")
+
+    def get(self, media_path):
+        """
+        The cached PCM of `media_path` as a memory-mapped int16 array, or
+        None if it has not been decoded yet.
+        """
+        try:
+            entry_path = self._entry_path(media_path)
+            pcm = self._map(entry_path)
+        except FileNotFoundError:
+            PCM_CACHE_LOOKUPS.inc(outcome="miss")
+            return None
+        try:
+            # The entry's mtime is its last use, which eviction goes by
+            os.utime(entry_path)
+        except OSError:
+            pass
+        PCM_CACHE_LOOKUPS.inc(outcome="hit")
+        return pcm
+
+    def load(self, media_path):
+        """
+        The cached PCM of `media_path`, decoding it first on a miss.
+        Concurrent loads of the same file decode it once.
+        """
+        pcm = self.get(media_path)
+        if pcm is not None:
+            return pcm
+        entry_path = self._entry_path(media_path)
+        with self._lock:
+            decode_lock = self._decode_locks.setdefault(entry_path, threading.Lock())
+        with decode_lock:
+            if not os.path.exists(entry_path):
+                self._decode(media_path, entry_path)
+                self._evict(keep=entry_path)
+        with self._lock:
+            self._decode_locks.pop(entry_path, None)
+        return self._map(entry_path)
+
+    def view(self, media_path, start_time=0.0, end_time=None):
+        """
+        Samples from `start_time` to `end_time` (seconds) as a view into the
+        mapped file, decoding the file first on a miss.
+        """
+        pcm = self.load(media_path)
+        start = min(int(float(start_time or 0) * self.sample_rate), len(pcm))
+        end = len(pcm) if end_time is None else min(int(end_time * self.sample_rate), len(pcm))
+        return pcm[start:max(start, end)]
+
+    def warm(self, media_path):
+        """
+        Decode `media_path` into the cache on a background thread, unless
+        it is cached or already being decoded.
+        """
+        with self._lock:
+            if media_path in self._warming:
+                return
+            self._warming.add(media_path)
+
+        def run():
+            try:
+                self.load(media_path)
+            except Exception as e:
+                print(f"Error caching decoded audio for {media_path}: {e}")
+            finally:
+                with self._lock:
+                    self._warming.discard(media_path)
+
+        threading.Thread(target=run, name="pcm-cache-warm", daemon=True).start()
+
+    def _decode(self, media_path, entry_path):
+        # ffmpeg writes the file itself; it only becomes visible when complete
+        partial_path = f"{entry_path}.partial"
+        command = [
+            "ffmpeg",
+            "-nostdin",
+            "-y",
+            "-i", media_path,
+            "-vn",
+            "-f", "s16le",
+            "-acodec", "pcm_s16le",
+            "-ac", "1",
+            "-ar", str(self.sample_rate),
+            partial_path,
+        ]
+        with STAGE_SECONDS.time(stage="pcm_cache_decode"):
+            result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            try:
+                os.remove(partial_path)
+            except FileNotFoundError:
+                pass
+            raise RuntimeError(f"ffmpeg failed for {media_path}: {result.stderr.decode(errors='replace')[-500:]}")
+        os.replace(partial_path, entry_path)
+
+    def _entries(self):
+        entries = []
+        for path in glob.glob(os.path.join(self.cache_dir, f"*{PCM_SUFFIX}")):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self, keep=None):
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        entries = self._entries()
+        return {
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "warming": len(self._warming),
+        }
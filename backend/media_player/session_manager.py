@@ -0,0 +1,247 @@
+import threading
+import time
+
+
+class SessionCapacityError(Exception):
+    """
+    Raised when every pipeline slot is taken. `retry_after` is a hint in
+    seconds for when a slot is likely to free up.
+    """
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class PipelineSession:
+    """
+    Everything one viewer's playback holds: an AudioPlayer (which cuts
+    chunks with its own VadSegmenter), the ProcessAudioQueue that owns the
+    session's slot on the inference scheduler, and when it was last used.
+    """
+
+    def __init__(self, session_id, player):
+        self.session_id = session_id
+        self.player = player
+        self.audio_queue = None
+        self.video_name = None
+        # Per-viewer objects that outlive a single playback, such as the
+        # speaker tracker, kept across seeks and restarts
+        self.state = {}
+        self.created_at = time.monotonic()
+        self.last_active = self.created_at
+        self.lock = threading.Lock()
+
+    @property
+    def playing(self):
+        thread = self.player.thread
+        return thread is not None and thread.is_alive()
+
+    def touch(self):
+        self.last_active = time.monotonic()
+
+    def idle_seconds(self):
+        # Time spent playing does not count as idle; the clock restarts
+        # from the last time playback was seen running
+        if self.playing:
+            self.touch()
+            return 0.0
+        return time.monotonic() - self.last_active
+
+    def play(self, audio_path, start_time, make_queue, video_name=None):
+        """
+        Stop whatever this session was playing and start `audio_path`,
+        feeding a fresh queue from `make_queue()`. The old queue gives up
+        its scheduler slot before the new one claims it.
+        """
+        with self.lock:
+            self._stop_playback()
+            self.video_name = video_name
+            audio_queue = make_queue()
+            self.audio_queue = audio_queue
+            self.player.play(audio_path, start_time, on_chunk=audio_queue.enqueue,
+                             on_provisional=audio_queue.enqueue_provisional)
+            self.touch()
+
+    def pause(self, release=False):
+        """
+        Pause playback. With `release`, the transcription queue is stopped
+        too, giving back its scheduler slot and model references; the next
+        play builds a fresh one either way.
+        """
+        with self.lock:
+            if release:
+                self._stop_playback()
+            else:
+                self.player.pause()
+            self.touch()
+
+    def close(self):
+        with self.lock:
+            self._stop_playback()
+            self.state.clear()
+
+    def _stop_playback(self, join_timeout=2.0):
+        self.player.stop()
+        thread = self.player.thread
+        if thread is not None and thread is not threading.current_thread():
+            # The player flushes its last chunk into the old queue on exit
+            thread.join(join_timeout)
+        if self.audio_queue is not None:
+            self.audio_queue.stop(wait=False)
+            self.audio_queue = None
+
+    def status_dict(self):
+        return {
+            "session_id": self.session_id,
+            "video": self.video_name,
+            "playing": self.playing,
+            "idle_seconds": round(self.idle_seconds(), 3),
+            "age_seconds": round(time.monotonic() - self.created_at, 3),
+        }
+
+
+class SessionManager:
+    """
+    Owns a pipeline per viewer session and bounds how many exist.
+
+    At most `max_active` sessions hold a pipeline at once; asking for
+    another raises SessionCapacityError. A session that has not played
+    for `idle_timeout` seconds is torn down by the reaper, which stops
+    its player and releases its scheduler slot and model references.
+    `player_factory(session_id)` and `queue_factory(session, **kwargs)`
+    build the per-session parts. With `release_on_pause`, a paused session
+    also gives up its transcription queue; `on_close(session)` runs after a
+    session is torn down, to drop anything else kept for it.
+    """
+
+    def __init__(self, player_factory, queue_factory, max_active=8, idle_timeout=300.0, retry_after=30.0,
+                 release_on_pause=False, on_close=None):
+        self.player_factory = player_factory
+        self.queue_factory = queue_factory
+        self.release_on_pause = release_on_pause
+        self.on_close = on_close
+        self.max_active = max_active
+        self.idle_timeout = idle_timeout
+        self.retry_after = retry_after
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._reaper = None
+        self._reaper_stop = threading.Event()
+        self.rejected = 0
+        self.reaped = 0
+
+    def _admit(self, session_id):
+        """
+        Return the session's pipeline, creating it if there is room.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                return session
+            expired = self._expired_locked()
+            if len(self._sessions) - len(expired) >= self.max_active:
+                self.rejected += 1
+                raise SessionCapacityError(
+                    f"All {self.max_active} transcription pipelines are in use", self._retry_hint_locked()
+                )
+            for stale in expired:
+                del self._sessions[stale.session_id]
+            session = PipelineSession(session_id, self.player_factory(session_id))
+            self._sessions[session_id] = session
+        for stale in expired:
+            self._teardown(stale)
+        return session
+
+    def play(self, session_id, audio_path, start_time=0, video_name=None, **queue_kwargs):
+        session = self._admit(session_id)
+        session.play(audio_path, start_time, lambda: self.queue_factory(session, **queue_kwargs), video_name)
+        return session
+
+    def pause(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is not None:
+            session.pause(release=self.release_on_pause)
+        return session
+
+    def close(self, session_id):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self._teardown(session)
+        return session is not None
+
+    def close_all(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            self._teardown(session)
+
+    def reap(self):
+        """
+        Tear down sessions idle for longer than `idle_timeout`.
+        """
+        with self._lock:
+            expired = self._expired_locked()
+            for session in expired:
+                del self._sessions[session.session_id]
+        for session in expired:
+            self._teardown(session)
+        self.reaped += len(expired)
+        return len(expired)
+
+    def start_reaper(self, interval=15.0):
+        if self._reaper is not None or not self.idle_timeout:
+            return
+        self._reaper_stop.clear()
+        self._reaper = threading.Thread(target=self._reap_loop, args=(interval,), daemon=True)
+        self._reaper.start()
+
+    def stop_reaper(self):
+        self._reaper_stop.set()
+
+    def _reap_loop(self, interval):
+        while not self._reaper_stop.wait(interval):
+            try:
+                self.reap()
+            except Exception as e:
+                print(f"Error reaping sessions: {e}")
+
+    def _expired_locked(self):
+        if not self.idle_timeout:
+            return []
+        return [session for session in self._sessions.values() if session.idle_seconds() >= self.idle_timeout]
+
+    def _retry_hint_locked(self):
+        # The soonest an idle session will be reaped, if any is idle
+        idle = [session.idle_seconds() for session in self._sessions.values() if not session.playing]
+        if idle and self.idle_timeout:
+            return max(1, int(self.idle_timeout - max(idle)) + 1)
+        return int(self.retry_after)
+
+    def _teardown(self, session):
+        try:
+            session.close()
+            if self.on_close is not None:
+                self.on_close(session)
+        except Exception as e:
+            print(f"Error closing session {session.session_id}: {e}")
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def stats(self):
+        with self._lock:
+            sessions = [session.status_dict() for session in self._sessions.values()]
+        return {
+            "max_active": self.max_active,
+            "idle_timeout_seconds": self.idle_timeout,
+            "active": len(sessions),
+            "playing": sum(session["playing"] for session in sessions),
+            "rejected": self.rejected,
+            "reaped": self.reaped,
+            "sessions": sessions,
+        }
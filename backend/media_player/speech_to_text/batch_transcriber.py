@@ -0,0 +1,217 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from media_player.chunk_queue import SAMPLE_RATE
+from media_player.speech_to_text.model_registry import model_registry, WHISPERX_ASR
+from media_player.metrics import metrics
+
+# Whisper decodes fixed 30 s windows; longer clips are split across items
+WINDOW_SECONDS = 30
+WINDOW_SAMPLES = WINDOW_SECONDS * SAMPLE_RATE
+
+BATCH_SIZE = metrics.histogram(
+    "asr_batch_size", "Clips per batched Whisper pass", buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+BATCH_SECONDS = metrics.histogram("asr_batch_seconds", "Time per batched Whisper pass")
+
+
+class _Request:
+    __slots__ = ("audio", "model_name", "future", "enqueued_at")
+
+    def __init__(self, audio, model_name):
+        self.audio = audio
+        self.model_name = model_name
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class BatchTranscriber:
+    """
+    Micro-batching front end for the shared WhisperX model.
+
+    Callers on any worker thread block in `transcribe` while a single
+    batching thread collects pending clips from every session for up to
+    `max_wait` seconds (or until `max_batch_size` windows are queued) and
+    decodes them in one batched forward pass. Each caller gets back one
+    segment per speech segment the model's VAD found in its clip, timed
+    relative to the start of the clip it submitted. Clips
+    for different ASR models (see quality_tiers) are never batched together.
+    """
+
+    def __init__(self, registry=None, model_name=WHISPERX_ASR, max_wait=0.15, max_batch_size=16):
+        self.registry = registry or model_registry
+        self.model_name = model_name
+        self.max_wait = max_wait
+        self.max_batch_size = max_batch_size
+        self._pending = deque()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._shutdown = False
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self.batch_seconds = 0.0
+
+    def start(self):
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def shutdown(self):
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+
+    def transcribe(self, audio, model_name=None):
+        """
+        Transcribe a 16 kHz float32 clip, with `model_name` or the default
+        model. Returns a whisperx-style result:
+        {"segments": [{"text", "start", "end"}], "language": "en"}.
+        """
+        self.start()
+        request = _Request(audio, model_name or self.model_name)
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("BatchTranscriber is shut down")
+            self._pending.append(request)
+            self._condition.notify_all()
+        return request.future.result()
+
+    def stats(self):
+        with self._condition:
+            return {
+                "max_wait_seconds": self.max_wait,
+                "max_batch_size": self.max_batch_size,
+                "pending": len(self._pending),
+                "batches": self.batches,
+                "items": self.items,
+                "mean_batch_size": round(self.items / self.batches, 2) if self.batches else None,
+                "largest_batch": self.largest_batch,
+                "mean_batch_seconds": round(self.batch_seconds / self.batches, 3) if self.batches else None,
+            }
+
+    def _collect(self):
+        # Wait for a first request, then keep the window open until its
+        # deadline passes or the batch is full.
+        with self._condition:
+            while not self._pending and not self._shutdown:
+                self._condition.wait()
+            if self._shutdown and not self._pending:
+                return None
+            deadline = self._pending[0].enqueued_at + self.max_wait
+            while not self._shutdown and self._window_count() < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            # The oldest request picks the model; requests for other models
+            # keep their place for the next batch
+            model_name = self._pending[0].model_name
+            batch = []
+            skipped = []
+            windows = 0
+            while self._pending:
+                request = self._pending[0]
+                if request.model_name != model_name:
+                    skipped.append(self._pending.popleft())
+                    continue
+                request_windows = self._windows(request.audio)
+                if batch and windows + request_windows > self.max_batch_size:
+                    break
+                batch.append(self._pending.popleft())
+                windows += request_windows
+            self._pending.extendleft(reversed(skipped))
+            return model_name, batch
+
+    def _window_count(self):
+        return sum(self._windows(request.audio) for request in self._pending)
+
+    def _windows(self, audio):
+        return max(1, -(-len(audio) // WINDOW_SAMPLES))
+
+    def _run(self):
+        while True:
+            collected = self._collect()
+            if collected is None:
+                return
+            model_name, batch = collected
+            started = time.perf_counter()
+            try:
+                results = self._transcribe_batch([request.audio for request in batch], model_name)
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            for request, result in zip(batch, results):
+                request.future.set_result(result)
+            BATCH_SIZE.observe(len(batch))
+            BATCH_SECONDS.observe(time.perf_counter() - started)
+            with self._condition:
+                self.batches += 1
+                self.items += len(batch)
+                self.largest_batch = max(self.largest_batch, len(batch))
+                self.batch_seconds += time.perf_counter() - started
+
+    def _transcribe_batch(self, audios, model_name=None):
+        with self.registry.borrow(model_name or self.model_name) as model:
+            # The batched path needs a fixed tokenizer, which whisperx only
+            # keeps when the model was loaded with a language
+            if getattr(model, "tokenizer", None) is None:
+                return [model.transcribe(audio, batch_size=16) for audio in audios]
+
+            # One item per speech segment, as model.transcribe would decode
+            # the clip alone, so callers keep the segment boundaries
+            items = []
+            for index, audio in enumerate(audios):
+                for start, end in _speech_segments(model, audio):
+                    items.append((index, start, end))
+            outputs = model(
+                ({"inputs": audios[index][start:end]} for index, start, end in items),
+                batch_size=len(items),
+                num_workers=0,
+            ) if items else []
+
+            results = [{"segments": [], "language": "en"} for _ in audios]
+            for (index, start, end), output in zip(items, outputs):
+                text = output["text"]
+                if isinstance(text, list):
+                    text = text[0]
+                if not text.strip():
+                    continue
+                results[index]["segments"].append({
+                    "text": text,
+                    "start": round(start / SAMPLE_RATE, 3),
+                    "end": round(end / SAMPLE_RATE, 3),
+                })
+            return results
+
+
+def _speech_segments(model, audio):
+    """
+    [(start, end)] sample ranges of `audio` to decode: the model's VAD
+    turns merged into segments of at most 30 s, as whisperx's own
+    transcribe() cuts them. Models without a VAD get plain 30 s windows.
+    """
+    vad_model = getattr(model, "vad_model", None)
+    vad_params = getattr(model, "_vad_params", None)
+    if vad_model is None or vad_params is None:
+        return [(offset, min(offset + WINDOW_SAMPLES, len(audio)))
+                for offset in range(0, len(audio), WINDOW_SAMPLES)]
+    import torch
+    try:
+        # whisperx >= 3.3.2 has pluggable VADs
+        from whisperx.vads import Pyannote, Vad
+    except ImportError:
+        from whisperx.vad import merge_chunks
+        waveform = torch.from_numpy(audio).unsqueeze(0)
+    else:
+        vad_class = type(vad_model) if isinstance(vad_model, Vad) else Pyannote
+        waveform = vad_class.preprocess_audio(audio)
+        merge_chunks = vad_class.merge_chunks
+    turns = vad_model({"waveform": waveform, "sample_rate": SAMPLE_RATE})
+    merged = merge_chunks(turns, WINDOW_SECONDS, onset=vad_params["vad_onset"], offset=vad_params["vad_offset"])
+    return [(int(segment["start"] * SAMPLE_RATE), int(segment["end"] * SAMPLE_RATE)) for segment in merged]
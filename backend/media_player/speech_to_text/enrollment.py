@@ -0,0 +1,236 @@
+"""
+Batch speaker enrollment.
+
+Reads a JSON manifest mapping each speaker to their recordings, e.g.
+
+    {"Trump": ["rally.mp4", "debate.wav"], "Kamala": ["interview.mp4"]}
+
+Every recording is decoded with ffmpeg, diarized, and the speech of its
+dominant speaker is cut into fixed windows that are embedded in batches.
+Recordings are processed in parallel, one per worker process. A speaker's
+windows from all recordings are pooled, outliers (crosstalk, music,
+misattributed turns) are dropped, and what is left is compressed to a few
+prototype vectors by spherical k-means. The result is one speaker bank
+file that SpeakerIndex picks up. Speakers already in the bank and not in
+the manifest are kept, so enrolling a new candidate only processes their
+footage. Run from backend/:
+
+    python -m media_player.speech_to_text.enrollment manifest.json --out media_player/speech_to_text/embedding_data/speakers.bank
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+import numpy as np
+from media_player.chunk_queue import SAMPLE_RATE
+from media_player.ingest import decode_audio
+from media_player.speech_to_text.speaker_bank import read_bank, write_bank
+from media_player.speech_to_text.pipeline_stages import MIN_SPEAKER_SECONDS
+from media_player.clustering import normalize_rows, spherical_kmeans
+
+WINDOW_SECONDS = 3.0
+EMBED_BATCH_SIZE = 32
+
+
+def load_manifest(path):
+    """
+    {speaker name: [recording paths]}, relative paths resolved against the
+    manifest's directory.
+    """
+    with open(path) as f:
+        manifest = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    return {
+        name: [recording if os.path.isabs(recording) else os.path.join(base, recording) for recording in recordings]
+        for name, recordings in manifest.items()
+    }
+
+
+def drop_outliers(embeddings, min_similarity=0.3, mad_factor=3.0):
+    """
+    Keep the embeddings close to the speaker's mean direction: a row is
+    dropped below `min_similarity` to the mean, or more than `mad_factor`
+    median absolute deviations under the median similarity. Returns the
+    kept rows, normalized.
+    """
+    embeddings = normalize_rows(np.asarray(embeddings, dtype=np.float32))
+    if len(embeddings) < 3:
+        return embeddings
+    center = embeddings.mean(axis=0)
+    center /= np.linalg.norm(center) or 1.0
+    similarities = embeddings @ center
+    median = np.median(similarities)
+    deviation = np.median(np.abs(similarities - median))
+    keep = similarities >= max(min_similarity, median - mad_factor * deviation)
+    return embeddings[keep] if keep.any() else embeddings
+
+
+def speaker_windows(audio, turns, window=WINDOW_SECONDS, min_seconds=MIN_SPEAKER_SECONDS):
+    """
+    Cut a speaker's turns into (n, 1, window) clips. A turn's leftover
+    shorter than a window is tiled to length if it lasts `min_seconds`.
+    """
+    length = int(window * SAMPLE_RATE)
+    clips = []
+    for start, end in turns:
+        turn = audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)]
+        for offset in range(0, len(turn), length):
+            piece = turn[offset:offset + length]
+            if len(piece) >= min_seconds * SAMPLE_RATE:
+                clips.append(np.resize(piece, length))
+    if not clips:
+        return np.zeros((0, 1, length), dtype=np.float32)
+    return np.stack(clips)[:, None, :].astype(np.float32, copy=False)
+
+
+_worker_models = None
+
+
+def _load_models(device):
+    import torch
+    from media_player.speech_to_text.model_registry import _load_pyannote_diarization, _load_pyannote_embedding
+
+    diarization = _load_pyannote_diarization().to(torch.device(device))
+    embedding = _load_pyannote_embedding().to(torch.device(device)).eval()
+    return diarization, embedding
+
+
+def embed_recording(path, device="cpu", window=WINDOW_SECONDS):
+    """
+    Embed the dominant speaker of one recording. Runs in a worker process,
+    which loads the diarization and embedding models once and keeps them.
+    Returns (path, (n, dim) embeddings, seconds of speech used).
+    """
+    import torch
+
+    global _worker_models
+    if _worker_models is None:
+        _worker_models = _load_models(device)
+    diarization_model, embedding_model = _worker_models
+
+    audio = decode_audio(path).astype(np.float32) / 32768.0
+    waveform = torch.from_numpy(audio)[None]
+    diarization = diarization_model({"waveform": waveform, "sample_rate": SAMPLE_RATE})
+    turns = {}
+    for turn, _, label in diarization.itertracks(yield_label=True):
+        turns.setdefault(label, []).append((turn.start, turn.end))
+    if not turns:
+        return path, None, 0.0
+    dominant = max(turns.values(), key=lambda spans: sum(end - start for start, end in spans))
+
+    clips = speaker_windows(audio, dominant, window)
+    embeddings = []
+    with torch.inference_mode():
+        for offset in range(0, len(clips), EMBED_BATCH_SIZE):
+            batch = torch.from_numpy(clips[offset:offset + EMBED_BATCH_SIZE]).to(torch.device(device))
+            embeddings.append(embedding_model(batch).cpu().numpy())
+    speech_seconds = sum(end - start for start, end in dominant)
+    return path, np.concatenate(embeddings) if embeddings else None, speech_seconds
+
+
+def enroll(manifest, out_path, prototypes=8, dtype="float16", workers=None, device="cpu",
+           window=WINDOW_SECONDS, min_similarity=0.3, replace=False):
+    """
+    Enroll every speaker in `manifest` ({name: [paths]}) into the bank at
+    `out_path`. Unless `replace`, speakers already in that bank are carried
+    over if they are not in the manifest or none of their recordings gave
+    usable speech. If no speaker was enrolled, the bank is left untouched.
+    Returns a summary per speaker.
+    """
+    embeddings = {name: [] for name in manifest}
+    speech = {name: 0.0 for name in manifest}
+    failed = []
+    jobs = [(name, path) for name, paths in manifest.items() for path in paths]
+    started = time.perf_counter()
+    # Spawned workers: forked ones would inherit torch's threads and locks
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+        futures = {pool.submit(embed_recording, path, device, window): name for name, path in jobs}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                path, recording_embeddings, seconds = future.result()
+            except Exception as e:
+                print(f"Error enrolling a recording for {name}: {e}")
+                failed.append(name)
+                continue
+            if recording_embeddings is None:
+                print(f"No speech found in {path}")
+                continue
+            embeddings[name].append(recording_embeddings)
+            speech[name] += seconds
+            print(f"{name}: {len(recording_embeddings)} windows from {os.path.basename(path)}")
+
+    speakers = {}
+    if not replace and os.path.exists(out_path):
+        header, existing = read_bank(out_path, mmap=False)
+        metadata = {speaker["name"]: speaker for speaker in header["speakers"]}
+        for name, rows in existing.items():
+            # A speaker whose new recordings all failed keeps their old entry
+            if not embeddings.get(name):
+                extra = {key: value for key, value in metadata[name].items() if key not in ("name", "offset", "count")}
+                speakers[name] = dict(extra, embeddings=np.asarray(rows, dtype=np.float32))
+
+    summary = {}
+    for name, blocks in embeddings.items():
+        if not blocks:
+            summary[name] = {"status": "kept previous" if name in speakers else "no speech"}
+            continue
+        pooled = np.concatenate(blocks)
+        kept = drop_outliers(pooled, min_similarity=min_similarity)
+        centroids = spherical_kmeans(kept, prototypes)
+        speakers[name] = {
+            "embeddings": centroids,
+            "recordings": len(blocks),
+            "windows": int(len(kept)),
+            "speech_seconds": round(speech[name], 1),
+        }
+        summary[name] = {
+            "status": "enrolled",
+            "recordings": len(blocks),
+            "windows": int(len(pooled)),
+            "outliers": int(len(pooled) - len(kept)),
+            "prototypes": int(len(centroids)),
+            "speech_seconds": round(speech[name], 1),
+        }
+
+    written = any(entry["status"] == "enrolled" for entry in summary.values())
+    if written:
+        os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+        write_bank(out_path, speakers, dtype=dtype)
+    else:
+        print(f"No speaker was enrolled; {out_path} was not written")
+    return {
+        "bank": out_path,
+        "written": written,
+        "speakers": summary,
+        "failed_recordings": len(failed),
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("manifest", help="JSON file mapping speaker names to recordings")
+    parser.add_argument("--out", required=True, help="Speaker bank file to write (.bank)")
+    parser.add_argument("--prototypes", type=int, default=8, help="Prototype vectors kept per speaker")
+    parser.add_argument("--dtype", choices=("float16", "float32"), default="float16")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--window", type=float, default=WINDOW_SECONDS, help="Seconds of speech per embedding")
+    parser.add_argument("--min-similarity", type=float, default=0.3,
+                        help="Drop windows less similar than this to the speaker's mean")
+    parser.add_argument("--replace", action="store_true", help="Drop speakers not in the manifest from the bank")
+    args = parser.parse_args()
+
+    summary = enroll(load_manifest(args.manifest), args.out, prototypes=args.prototypes, dtype=args.dtype,
+                     workers=args.workers, device=args.device, window=args.window,
+                     min_similarity=args.min_similarity, replace=args.replace)
+    print(json.dumps(summary, indent=2))
+    if summary["failed_recordings"] or not summary["written"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+import numpy as np
+from media_player.chunk_queue import AudioChunk
+from media_player.speech_to_text.job_transport import TransportExecutor
+
+# Backpressure policies applied when a session's queue is full
+DROP_OLDEST = "drop_oldest"
+COALESCE = "coalesce"
+BLOCK = "block"
+POLICIES = (DROP_OLDEST, COALESCE, BLOCK)
+
+# Whisper's input window; coalesced chunks never grow past it
+MAX_COALESCED_DURATION = 30.0
+# Gaps between adjacent chunks up to this long are filled with silence
+MAX_COALESCE_GAP = 1.0
+
+
+def coalesce_chunks(first, second):
+    """
+    Merge two adjacent chunks of the same session into one, padding the
+    gap between them with silence. Returns None if they are not adjacent
+    or the result would not fit in a single Whisper window.
+    """
+    gap = second.start_time - first.end_time
+    if gap < -1e-3 or gap > MAX_COALESCE_GAP:
+        return None
+    if second.end_time - first.start_time > MAX_COALESCED_DURATION:
+        return None
+    padding = np.zeros(max(int(round(gap * first.sample_rate)), 0), dtype=first.samples.dtype)
+    samples = np.concatenate((first.samples, padding, second.samples.astype(first.samples.dtype)))
+    return AudioChunk(first.session_id, first.index, first.start_time, samples, first.sample_rate, first.played_at)
+
+
+class _Job:
+    __slots__ = ("chunk", "enqueued_at")
+
+    def __init__(self, chunk):
+        self.chunk = chunk
+        self.enqueued_at = time.monotonic()
+
+
+class _SessionState:
+    def __init__(self, session_id, handler, on_result, on_error=None, background=False, max_in_flight=1,
+                 policy=None, prepare=None, finish=None):
+        self.session_id = session_id
+        self.handler = handler
+        self.prepare = prepare
+        self.finish = finish
+        self.on_result = on_result
+        self.on_error = on_error
+        self.background = background
+        self.max_in_flight = max_in_flight
+        self.policy = policy
+        self.pending = deque()
+        self.in_flight = 0
+        self.closing = False
+        self.on_idle = None
+        self.submitted = 0
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.waits = deque(maxlen=256)
+
+
+class InferenceScheduler:
+    """
+    Runs chunk jobs from every session on a shared worker pool.
+
+    Each session has a bounded FIFO of pending chunks and at most one job in
+    flight, so its results stay in order. Sessions are served round-robin,
+    so one session's backlog cannot starve the others. When a session's
+    queue is full the backpressure policy decides what happens:
+
+    - drop_oldest: discard the oldest pending chunk
+    - coalesce: merge the new chunk into the newest pending one if they are
+      adjacent, falling back to drop_oldest
+    - block: make the producer wait for room (up to `block_timeout`)
+
+    Background sessions (headless ingests) only get a worker when no live
+    session has a chunk waiting, and never hold more than
+    `background_workers` of them, so live playback keeps its capacity.
+
+    With a process pool, handlers must be picklable module-level functions.
+    With executor="transport", chunks go to transcription workers through
+    the job transport `transport_factory` connects to, and `workers` is how
+    many jobs may be out with them at once.
+    """
+
+    def __init__(self, workers=None, executor="thread", max_session_depth=8, policy=DROP_OLDEST, block_timeout=None,
+                 transport_factory=None, result_timeout=300.0, background_workers=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        if executor not in ("thread", "process", "transport"):
+            raise ValueError(f"Unknown executor: {executor}")
+        if executor == "transport" and transport_factory is None:
+            raise ValueError("The transport executor needs a transport_factory")
+        self.workers = workers or os.cpu_count() or 1
+        self.background_workers = background_workers or max(1, self.workers // 2)
+        self.executor_kind = executor
+        self.max_session_depth = max_session_depth
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.transport_factory = transport_factory
+        self.result_timeout = result_timeout
+        self._sessions = {}
+        self._order = deque()
+        self._busy = 0
+        self._background_busy = 0
+        self._condition = threading.Condition()
+        self._shutdown = False
+        self._executor = None
+        self._dispatcher = None
+
+    def start(self):
+        with self._condition:
+            if self._dispatcher is not None:
+                return
+            if self.executor_kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            elif self.executor_kind == "transport":
+                self._executor = TransportExecutor(self.transport_factory, result_timeout=self.result_timeout)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+            self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+            self._dispatcher.start()
+
+    def shutdown(self, wait=True):
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+        if self._dispatcher is not None:
+            self._dispatcher.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+
+    def register_session(self, session_id, handler, on_result=None, on_error=None, background=False,
+                         max_in_flight=1, policy=None, prepare=None, finish=None):
+        """
+        Route `session_id`'s chunks to `handler(chunk)`. `on_result(chunk,
+        result)` is called with each handler result on a worker thread, and
+        `on_error(chunk, error)` with each failure.
+
+        For handlers that run in another process, `prepare(chunk)` builds
+        the handler's argument just before the chunk is submitted and
+        `finish(chunk, result)` turns what comes back into the result
+        on_result sees. Both run in this process, so the session can keep
+        its own state; an exception in either counts as a failure.
+
+        A session whose results may arrive out of order can set
+        `max_in_flight` above 1; `policy` overrides the scheduler's
+        backpressure policy for it.
+        """
+        if policy is not None and policy not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        self.start()
+        with self._condition:
+            if session_id in self._sessions and not self._sessions[session_id].closing:
+                raise ValueError(f"Session already registered: {session_id}")
+            self._sessions[session_id] = _SessionState(session_id, handler, on_result, on_error, background,
+                                                       max_in_flight, policy, prepare, finish)
+            if session_id not in self._order:
+                self._order.append(session_id)
+
+    def unregister_session(self, session_id, on_idle=None):
+        """
+        Drop the session's pending chunks. `on_idle` is called once its
+        in-flight job, if any, has finished.
+        """
+        with self._condition:
+            state = self._sessions.get(session_id)
+            if state is None:
+                idle = True
+            else:
+                state.closing = True
+                state.dropped += len(state.pending)
+                state.pending.clear()
+                idle = not state.in_flight
+                if idle:
+                    self._remove(state)
+                else:
+                    state.on_idle = on_idle
+            self._condition.notify_all()
+        if idle and on_idle is not None:
+            on_idle()
+
+    def submit(self, session_id, chunk):
+        """
+        Queue a chunk for its session. Returns False if it was rejected
+        because the session is unknown or blocking timed out.
+        """
+        with self._condition:
+            state = self._sessions.get(session_id)
+            if state is None or state.closing or self._shutdown:
+                return False
+            policy = state.policy or self.policy
+            if len(state.pending) >= self.max_session_depth:
+                if policy == BLOCK:
+                    has_room = self._condition.wait_for(
+                        lambda: len(state.pending) < self.max_session_depth or state.closing or self._shutdown,
+                        timeout=self.block_timeout,
+                    )
+                    if not has_room or state.closing or self._shutdown:
+                        state.dropped += 1
+                        return False
+                elif policy == COALESCE and self._coalesce(state, chunk):
+                    self._condition.notify_all()
+                    return True
+                else:
+                    state.pending.popleft()
+                    state.dropped += 1
+            state.pending.append(_Job(chunk))
+            state.submitted += 1
+            self._condition.notify_all()
+            return True
+
+    def _coalesce(self, state, chunk):
+        merged = coalesce_chunks(state.pending[-1].chunk, chunk)
+        if merged is None:
+            return False
+        state.pending[-1].chunk = merged
+        state.submitted += 1
+        state.coalesced += 1
+        return True
+
+    def depth(self, session_id=None):
+        with self._condition:
+            if session_id is not None:
+                state = self._sessions.get(session_id)
+                return len(state.pending) if state else 0
+            return sum(len(state.pending) for state in self._sessions.values())
+
+    def stats(self):
+        """
+        Queue depth, throughput counters and queue wait times per session.
+        """
+        with self._condition:
+            sessions = {}
+            for session_id, state in self._sessions.items():
+                waits = np.array(state.waits) if state.waits else None
+                sessions[session_id] = {
+                    "depth": len(state.pending),
+                    "in_flight": state.in_flight,
+                    "background": state.background,
+                    "submitted": state.submitted,
+                    "processed": state.processed,
+                    "failed": state.failed,
+                    "dropped": state.dropped,
+                    "coalesced": state.coalesced,
+                    "oldest_wait_seconds": (
+                        round(time.monotonic() - state.pending[0].enqueued_at, 3) if state.pending else 0.0
+                    ),
+                    "wait_p50_seconds": round(float(np.percentile(waits, 50)), 3) if waits is not None else None,
+                    "wait_p95_seconds": round(float(np.percentile(waits, 95)), 3) if waits is not None else None,
+                }
+            return {
+                "workers": self.workers,
+                "executor": self.executor_kind,
+                "policy": self.policy,
+                "max_session_depth": self.max_session_depth,
+                "busy_workers": self._busy,
+                "background_busy_workers": self._background_busy,
+                "total_depth": sum(s["depth"] for s in sessions.values()),
+                "sessions": sessions,
+            }
+
+    def _remove(self, state):
+        if self._sessions.get(state.session_id) is state:
+            del self._sessions[state.session_id]
+            try:
+                self._order.remove(state.session_id)
+            except ValueError:
+                pass
+
+    def _next_job(self):
+        # Rotate through sessions, skipping those with nothing runnable;
+        # live sessions go first
+        background = None
+        for _ in range(len(self._order)):
+            session_id = self._order[0]
+            state = self._sessions[session_id]
+            if not state.pending or state.in_flight >= state.max_in_flight:
+                self._order.rotate(-1)
+                continue
+            if not state.background:
+                self._order.rotate(-1)
+                return state, state.pending.popleft()
+            if background is None and self._background_busy < self.background_workers:
+                background = state
+            self._order.rotate(-1)
+        if background is not None:
+            return background, background.pending.popleft()
+        return None
+
+    def _dispatch(self):
+        while True:
+            with self._condition:
+                picked = None
+                while not self._shutdown:
+                    if self._busy < self.workers:
+                        picked = self._next_job()
+                        if picked is not None:
+                            break
+                    self._condition.wait()
+                if picked is None:
+                    return
+                state, job = picked
+                state.in_flight += 1
+                state.waits.append(time.monotonic() - job.enqueued_at)
+                self._busy += 1
+                if state.background:
+                    self._background_busy += 1
+                self._condition.notify_all()
+            try:
+                payload = job.chunk if state.prepare is None else state.prepare(job.chunk)
+            except Exception as e:
+                future = Future()
+                future.set_exception(e)
+            else:
+                future = self._executor.submit(state.handler, payload)
+            future.add_done_callback(lambda f, state=state, job=job: self._finish(state, job, f))
+
+    def _finish(self, state, job, future):
+        error = future.exception()
+        if error is None:
+            result = future.result()
+            if state.finish is not None:
+                try:
+                    result = state.finish(job.chunk, result)
+                except Exception as e:
+                    error = e
+        if error is not None:
+            print(f"Error processing chunk {job.chunk}: {error}")
+            if state.on_error is not None:
+                try:
+                    state.on_error(job.chunk, error)
+                except Exception as e:
+                    print(f"Error reporting failure for {job.chunk}: {e}")
+        elif state.on_result is not None and not state.closing:
+            try:
+                state.on_result(job.chunk, result)
+            except Exception as e:
+                print(f"Error delivering result for {job.chunk}: {e}")
+        on_idle = None
+        with self._condition:
+            self._busy -= 1
+            state.in_flight -= 1
+            if state.background:
+                self._background_busy -= 1
+            if error is not None:
+                state.failed += 1
+            else:
+                state.processed += 1
+            if state.closing and not state.in_flight:
+                self._remove(state)
+                on_idle, state.on_idle = state.on_idle, None
+            self._condition.notify_all()
+        if on_idle is not None:
+            on_idle()
@@ -0,0 +1,411 @@
+"""
+Job transport for chunk inference outside the API process.
+
+The API side submits chunk jobs through a TransportExecutor, which plugs
+into InferenceScheduler as executor="transport", so per-session ordering,
+round-robin and backpressure are unchanged. Transcription workers (see
+transcription_worker) reserve jobs, process them and acknowledge each one
+with its result.
+
+Delivery is at least once. A reserved job is leased to one worker for
+`lease_seconds`, and the worker extends the lease while it works. If the
+worker dies, the lease runs out and the job goes to the next worker. A
+failed job is retried up to `max_attempts` times and then reported back
+as failed. A job's first result wins; late duplicates are dropped, and so
+is a result from a worker whose job has since been leased to another.
+
+Backends:
+
+- InProcessTransport: in memory, for worker threads in one process (tests,
+  development)
+- start_local_broker: the same transport in a child process, for worker
+  processes on this host
+- a networked broker: the same transport served over
+  multiprocessing.managers, which workers on other hosts reach at
+  host:port with a shared auth key. Run one with
+
+      JOB_BROKER_AUTHKEY=<secret> python -m media_player.speech_to_text.job_transport --listen 10.0.0.5:5599
+
+  and point the API (JOB_BROKER) and the workers (--broker) at it, with
+  the same JOB_BROKER_AUTHKEY.
+
+Brokers and clients exchange pickles, so whoever has the auth key can
+run code in the broker. There is no default key: a broker served for
+other processes needs JOB_BROKER_AUTHKEY, and one that listens beyond
+loopback is refused without it. A local broker and the worker processes
+started from the API fall back to the API process's own random
+multiprocessing key, which only its children inherit.
+"""
+import argparse
+import ipaddress
+import itertools
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing.managers import BaseManager
+from media_player.metrics import metrics
+
+JOBS_REDELIVERED = metrics.counter(
+    "transport_jobs_redelivered_total", "Jobs handed out again, by why", ["reason"]
+)
+STALE_ACKS = metrics.counter(
+    "transport_stale_acks_total", "Results refused because the job was leased to another worker"
+)
+
+# Shared secret between the API, the broker and the workers; None falls
+# back to this process's multiprocessing key, shared only with its children
+BROKER_AUTHKEY = os.getenv("JOB_BROKER_AUTHKEY", "").encode("utf-8") or None
+
+
+class JobFailed(Exception):
+    """
+    A job that failed on every attempt.
+    """
+
+
+class _Lease:
+    __slots__ = ("job_id", "payload", "reply_to", "attempts", "worker", "expires_at")
+
+    def __init__(self, job_id, payload, reply_to):
+        self.job_id = job_id
+        self.payload = payload
+        self.reply_to = reply_to
+        self.attempts = 0
+        self.worker = None
+        self.expires_at = None
+
+
+class InProcessTransport:
+    """
+    Thread-safe job queue with leases, retries and per-client result
+    queues. Also the object a broker serves to other processes.
+    """
+
+    def __init__(self, lease_seconds=60.0, max_attempts=3):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._ready = deque()
+        self._jobs = {}
+        self._results = {}
+        self._condition = threading.Condition()
+        self.submitted = 0
+        self.completed = 0
+        self.retried = 0
+        self.dead = 0
+        self.stale_acks = 0
+
+    def put(self, job_id, payload, reply_to):
+        """
+        Queue a job; its outcome goes to the `reply_to` result queue.
+        """
+        with self._condition:
+            self._jobs[job_id] = _Lease(job_id, payload, reply_to)
+            self._results.setdefault(reply_to, deque())
+            self._ready.append(job_id)
+            self.submitted += 1
+            self._condition.notify_all()
+
+    def reserve(self, worker, timeout=1.0):
+        """
+        Lease the next job to `worker`. Returns (job_id, payload, attempt)
+        or None if none arrived within `timeout` seconds.
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                self._expire_leases()
+                while self._ready:
+                    job = self._jobs.get(self._ready.popleft())
+                    if job is None or job.worker is not None:
+                        continue
+                    job.attempts += 1
+                    job.worker = worker
+                    job.expires_at = time.monotonic() + self.lease_seconds
+                    return job.job_id, job.payload, job.attempts
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                # Wake up in time to notice a lease running out
+                self._condition.wait(min(remaining, self.lease_seconds / 4))
+
+    def extend(self, job_id, worker):
+        """
+        Renew `worker`'s lease on a job it is still working on. Returns
+        False if the lease was lost.
+        """
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or job.worker != worker:
+                return False
+            job.expires_at = time.monotonic() + self.lease_seconds
+            return True
+
+    def ack(self, job_id, worker, result):
+        """
+        Complete a job with `worker`'s result. Returns False, ignoring the
+        result, if the job is already completed or its lease ran out and it
+        is now leased to another worker. A job whose lease ran out but that
+        no one has picked up again is still completed.
+        """
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return False
+            if job.worker is not None and job.worker != worker:
+                self.stale_acks += 1
+                STALE_ACKS.inc()
+                return False
+            del self._jobs[job_id]
+            self.completed += 1
+            self._publish(job, True, result)
+            return True
+
+    def fail(self, job_id, worker, error):
+        """
+        Give a job back after an error; it is retried until it has been
+        attempted `max_attempts` times.
+        """
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or job.worker != worker:
+                return
+            self._retry(job, error, "error")
+
+    def _retry(self, job, error, reason):
+        if job.attempts >= self.max_attempts:
+            del self._jobs[job.job_id]
+            self.dead += 1
+            self._publish(job, False, f"{error} (after {job.attempts} attempts)")
+            return
+        job.worker = None
+        job.expires_at = None
+        self.retried += 1
+        JOBS_REDELIVERED.inc(reason=reason)
+        self._ready.append(job.job_id)
+        self._condition.notify_all()
+
+    def _expire_leases(self):
+        now = time.monotonic()
+        for job in list(self._jobs.values()):
+            if job.worker is not None and job.expires_at <= now:
+                self._retry(job, f"lease held by {job.worker} expired", "lease_expired")
+
+    def _publish(self, job, ok, value):
+        results = self._results.get(job.reply_to)
+        if results is not None:
+            results.append((job.job_id, ok, value))
+            self._condition.notify_all()
+
+    def get_result(self, reply_to, timeout=1.0):
+        """
+        The next (job_id, ok, result or error) for `reply_to`, or None
+        after `timeout` seconds.
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            results = self._results.setdefault(reply_to, deque())
+            while not results:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+            return results.popleft()
+
+    def drop_client(self, reply_to):
+        """
+        Forget a client's result queue and cancel its queued jobs.
+        """
+        with self._condition:
+            self._results.pop(reply_to, None)
+            for job_id in [job_id for job_id, job in self._jobs.items()
+                           if job.reply_to == reply_to and job.worker is None]:
+                del self._jobs[job_id]
+
+    def stats(self):
+        with self._condition:
+            leased = sum(job.worker is not None for job in self._jobs.values())
+            return {
+                "queued": len(self._jobs) - leased,
+                "leased": leased,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "retried": self.retried,
+                "dead": self.dead,
+                "stale_acks": self.stale_acks,
+                "clients": len(self._results),
+            }
+
+
+_broker_transport = None
+
+
+def _init_broker(transport_kwargs):
+    global _broker_transport
+    _broker_transport = InProcessTransport(**transport_kwargs)
+
+
+def _get_broker_transport():
+    return _broker_transport
+
+
+class _BrokerManager(BaseManager):
+    pass
+
+
+_BrokerManager.register("transport", callable=_get_broker_transport)
+
+
+def parse_address(address):
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def format_address(address):
+    return f"{address[0]}:{address[1]}"
+
+
+def is_loopback(host):
+    """
+    Whether `host` only resolves to loopback addresses.
+    """
+    try:
+        infos = socket.getaddrinfo(host, None)
+    except socket.gaierror:
+        return False
+    return all(ipaddress.ip_address(info[4][0].split("%")[0]).is_loopback for info in infos)
+
+
+def serve_broker(address, authkey=BROKER_AUTHKEY, **transport_kwargs):
+    """
+    Serve one InProcessTransport at `address` until the process exits.
+    Workers and the API must connect with the same `authkey`. Without one
+    only a loopback address is allowed, and nothing but this process's
+    children could connect, so that is refused too.
+    """
+    if authkey is None:
+        host = parse_address(address)[0]
+        where = "beyond loopback" if not is_loopback(host) else "for other processes"
+        raise ValueError(f"Refusing to serve a job broker {where} at {address} without JOB_BROKER_AUTHKEY")
+    _init_broker(transport_kwargs)
+    manager = _BrokerManager(address=parse_address(address), authkey=authkey)
+    server = manager.get_server()
+    print(f"Job broker listening on {address}")
+    server.serve_forever()
+
+
+def start_local_broker(authkey=BROKER_AUTHKEY, **transport_kwargs):
+    """
+    Serve an InProcessTransport from a child process on a free loopback
+    port. Without `authkey` it uses this process's multiprocessing key,
+    which only this process and its children hold. Returns the started
+    manager; its address is manager.address and manager.shutdown() stops
+    it.
+    """
+    manager = _BrokerManager(address=("127.0.0.1", 0), authkey=authkey)
+    manager.start(initializer=_init_broker, initargs=(transport_kwargs,))
+    return manager
+
+
+def connect_broker(address, authkey=BROKER_AUTHKEY):
+    """
+    A proxy for the transport served at `address` ("host:port"). Calls
+    from different threads use separate connections.
+    """
+    manager = _BrokerManager(address=parse_address(address), authkey=authkey)
+    manager.connect()
+    return manager.transport()
+
+
+class TransportExecutor:
+    """
+    Executor for InferenceScheduler that runs each chunk on a
+    transcription worker instead of calling the handler locally.
+    `transport_factory()` returns the transport (or a broker proxy) to use.
+
+    `submit` puts the job on the transport and returns a Future that is
+    resolved when a worker acknowledges the job. A job with no outcome
+    after `result_timeout` seconds fails with TimeoutError so its session
+    can move on.
+    """
+
+    def __init__(self, transport_factory, result_timeout=300.0):
+        self._transport_factory = transport_factory
+        self.result_timeout = result_timeout
+        self.reply_to = f"client-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._submit_transport = transport_factory()
+        self._futures = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._shutdown = threading.Event()
+        self._collector = threading.Thread(target=self._collect, name="transport-results", daemon=True)
+        self._collector.start()
+
+    def submit(self, fn, job):
+        future = Future()
+        job_id = f"{self.reply_to}:{next(self._ids)}"
+        with self._lock:
+            self._futures[job_id] = (future, time.monotonic() + self.result_timeout)
+        try:
+            self._submit_transport.put(job_id, job, self.reply_to)
+        except Exception as e:
+            with self._lock:
+                self._futures.pop(job_id, None)
+            future.set_exception(e)
+        return future
+
+    def _collect(self):
+        transport = self._transport_factory()
+        while not self._shutdown.is_set():
+            try:
+                outcome = transport.get_result(self.reply_to, timeout=1.0)
+            except Exception as e:
+                print(f"Error reading transport results: {e}")
+                time.sleep(1.0)
+                continue
+            if outcome is not None:
+                job_id, ok, value = outcome
+                with self._lock:
+                    entry = self._futures.pop(job_id, None)
+                if entry is not None:
+                    if ok:
+                        entry[0].set_result(value)
+                    else:
+                        entry[0].set_exception(JobFailed(value))
+            self._expire()
+
+    def _expire(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [job_id for job_id, (_, deadline) in self._futures.items() if deadline <= now]
+            futures = [self._futures.pop(job_id)[0] for job_id in expired]
+        for future in futures:
+            future.set_exception(TimeoutError(f"No result within {self.result_timeout}s"))
+
+    def shutdown(self, wait=True):
+        self._shutdown.set()
+        if wait:
+            self._collector.join()
+        try:
+            self._submit_transport.drop_client(self.reply_to)
+        except Exception as e:
+            print(f"Error leaving the job transport: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a job broker for transcription workers.")
+    parser.add_argument("--listen", default="127.0.0.1:5599", help="host:port to serve on")
+    parser.add_argument("--lease-seconds", type=float, default=60.0, help="How long a worker may hold a job silently")
+    parser.add_argument("--max-attempts", type=int, default=3, help="Deliveries before a job is reported failed")
+    args = parser.parse_args()
+    try:
+        serve_broker(args.listen, lease_seconds=args.lease_seconds, max_attempts=args.max_attempts)
+    except ValueError as e:
+        parser.error(str(e))
+
+
+if __name__ == "__main__":
+    main()
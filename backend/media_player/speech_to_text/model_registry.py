@@ -0,0 +1,346 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from media_player.metrics import MODEL_LOADS_TOTAL, MODEL_LOAD_SECONDS, MODEL_UNLOADS_TOTAL
+
+load_dotenv()
+
+speaker_diarization = os.getenv("speaker_diarization")
+pipeline = os.getenv("pipeline")
+inference_model = os.getenv("inference_model")
+
+DEVICE = "cpu"
+
+# Names of the models shared by every session. Loaders for these are
+# registered on the process-wide registry at the bottom of this module.
+WHISPERX_ASR = "whisperx_asr"
+WHISPERX_ALIGN_EN = "whisperx_align_en"
+WHISPERX_DIARIZE = "whisperx_diarize"
+PYANNOTE_DIARIZATION = "pyannote_diarization"
+PYANNOTE_EMBEDDING = "pyannote_embedding"
+
+
+def _resident_memory():
+    """
+    Return the resident set size of this process in bytes, or None if it
+    cannot be determined on this platform.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return None
+
+
+def _parameter_bytes(model):
+    """
+    Best-effort size of a model's weights. Handles torch modules and the
+    (model, metadata) tuples returned by whisperx.load_align_model.
+    """
+    if isinstance(model, tuple):
+        sizes = [_parameter_bytes(part) for part in model]
+        sizes = [size for size in sizes if size is not None]
+        return sum(sizes) if sizes else None
+    parameters = getattr(model, "parameters", None)
+    if not callable(parameters):
+        return None
+    try:
+        return sum(p.numel() * p.element_size() for p in parameters())
+    except Exception:
+        return None
+
+
+class _ModelEntry:
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.model = None
+        self.loaded = False
+        self.ref_count = 0
+        self.load_count = 0
+        self.load_seconds = None
+        self.rss_delta_bytes = None
+        self.param_bytes = None
+        self.last_used = 0.0
+        self.load_lock = threading.Lock()
+
+
+class ModelRegistry:
+    """
+    Thread-safe, process-wide cache of loaded models.
+
+    Models are registered by name with a zero-argument loader and are only
+    loaded the first time they are acquired. Every borrower shares the same
+    instance; a model is only unloaded once nobody holds a reference and it
+    is either the least recently used entry over `max_models` or has been
+    idle for longer than `idle_timeout` seconds.
+    """
+
+    def __init__(self, max_models=None, idle_timeout=None):
+        self.max_models = max_models
+        self.idle_timeout = idle_timeout
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._reaper = None
+        self._reaper_stop = threading.Event()
+
+    def register(self, name, loader, replace=False):
+        """
+        Register a loader for `name`. Re-registering an existing name is an
+        error unless `replace` is set, in which case any loaded instance
+        that is not currently borrowed is dropped.
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                if not replace:
+                    raise ValueError(f"Model already registered: {name}")
+                if entry.ref_count:
+                    raise RuntimeError(f"Cannot replace model in use: {name}")
+            self._entries[name] = _ModelEntry(name, loader)
+
+    def is_registered(self, name):
+        with self._lock:
+            return name in self._entries
+
+    def is_loaded(self, name):
+        with self._lock:
+            entry = self._entries.get(name)
+            return entry is not None and entry.loaded
+
+    def acquire(self, name):
+        """
+        Return the shared instance of `name`, loading it if needed, and
+        increment its reference count. Pair every call with `release`.
+        """
+        entry = self._entry(name)
+        with self._lock:
+            entry.ref_count += 1
+            entry.last_used = time.monotonic()
+            self._entries.move_to_end(name)
+        try:
+            model = self._ensure_loaded(entry)
+        except Exception:
+            with self._lock:
+                entry.ref_count -= 1
+            raise
+        self.evict()
+        return model
+
+    def release(self, name):
+        """
+        Drop one reference to `name` and evict whatever has become
+        eligible for eviction.
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry.ref_count == 0:
+                return
+            entry.ref_count -= 1
+            entry.last_used = time.monotonic()
+        self.evict()
+
+    @contextmanager
+    def borrow(self, name):
+        """
+        Context manager around acquire/release for per-chunk use.
+        """
+        model = self.acquire(name)
+        try:
+            yield model
+        finally:
+            self.release(name)
+
+    def preload(self, *names):
+        """
+        Load models ahead of time without holding a reference to them.
+        """
+        for name in names:
+            self._ensure_loaded(self._entry(name))
+            with self._lock:
+                self._entries[name].last_used = time.monotonic()
+
+    def unload(self, name):
+        """
+        Unload `name` if no one is borrowing it. Returns True on success.
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or not entry.loaded or entry.ref_count:
+                return False
+            self._unload(entry)
+            return True
+
+    def evict(self):
+        """
+        Unload idle models past `idle_timeout` and, if more than
+        `max_models` are loaded, the least recently used unreferenced ones.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self.idle_timeout is not None:
+                for entry in list(self._entries.values()):
+                    if entry.loaded and not entry.ref_count and now - entry.last_used > self.idle_timeout:
+                        self._unload(entry)
+            if self.max_models is not None:
+                loaded = [entry for entry in self._entries.values() if entry.loaded]
+                excess = len(loaded) - self.max_models
+                for entry in sorted(loaded, key=lambda e: e.last_used):
+                    if excess <= 0:
+                        break
+                    if not entry.ref_count:
+                        self._unload(entry)
+                        excess -= 1
+
+    def start_reaper(self, interval=30.0):
+        """
+        Periodically run `evict` in a daemon thread so idle models are
+        released even when no session touches the registry.
+        """
+        with self._lock:
+            if self._reaper is not None and self._reaper.is_alive():
+                return
+            self._reaper_stop.clear()
+            self._reaper = threading.Thread(target=self._reap, args=(interval,), daemon=True)
+            self._reaper.start()
+
+    def stop_reaper(self):
+        self._reaper_stop.set()
+
+    def stats(self):
+        """
+        Report load state, load time and memory footprint for every model.
+        """
+        with self._lock:
+            return {
+                "resident_memory_bytes": _resident_memory(),
+                "models": {
+                    entry.name: {
+                        "loaded": entry.loaded,
+                        "ref_count": entry.ref_count,
+                        "load_count": entry.load_count,
+                        "load_seconds": entry.load_seconds,
+                        "rss_delta_bytes": entry.rss_delta_bytes,
+                        "param_bytes": entry.param_bytes,
+                        "idle_seconds": (
+                            round(time.monotonic() - entry.last_used, 3) if entry.last_used else None
+                        ),
+                    }
+                    for entry in self._entries.values()
+                },
+            }
+
+    def _entry(self, name):
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry is None:
+            raise KeyError(f"Unknown model: {name}")
+        return entry
+
+    def _ensure_loaded(self, entry):
+        if entry.loaded:
+            return entry.model
+        # Loads are serialized per model so concurrent borrowers wait for a
+        # single load, while different models can load in parallel.
+        with entry.load_lock:
+            if entry.loaded:
+                return entry.model
+            rss_before = _resident_memory()
+            started = time.perf_counter()
+            model = entry.loader()
+            elapsed = time.perf_counter() - started
+            rss_after = _resident_memory()
+            with self._lock:
+                entry.model = model
+                entry.loaded = True
+                entry.load_count += 1
+                entry.load_seconds = round(elapsed, 3)
+                entry.param_bytes = _parameter_bytes(model)
+                if rss_before is not None and rss_after is not None:
+                    entry.rss_delta_bytes = rss_after - rss_before
+            MODEL_LOADS_TOTAL.inc(model=entry.name)
+            MODEL_LOAD_SECONDS.observe(elapsed, model=entry.name)
+            print(f"Loaded model {entry.name} in {elapsed:.2f}s")
+            return model
+
+    def _unload(self, entry):
+        entry.model = None
+        entry.loaded = False
+        MODEL_UNLOADS_TOTAL.inc(model=entry.name)
+        print(f"Unloaded model {entry.name}")
+
+    def _reap(self, interval):
+        while not self._reaper_stop.wait(interval):
+            try:
+                self.evict()
+            except Exception as e:
+                print(f"Error evicting models: {e}")
+
+
+def _load_whisperx_asr(size="base", compute_type="float32"):
+    import whisperx
+    # A fixed language keeps the tokenizer loaded, which batched decoding needs
+    return whisperx.load_model(size, DEVICE, compute_type=compute_type, language="en")
+
+
+def asr_model_name(size, compute_type):
+    """
+    Registry name of a WhisperX ASR variant. The default base/float32
+    model keeps the plain WHISPERX_ASR name.
+    """
+    if (size, compute_type) == ("base", "float32"):
+        return WHISPERX_ASR
+    return f"{WHISPERX_ASR}:{size}:{compute_type}"
+
+
+def register_asr_model(registry, size, compute_type, loader=None):
+    """
+    Register an ASR variant unless it already is. Returns its name.
+    """
+    name = asr_model_name(size, compute_type)
+    if not registry.is_registered(name):
+        registry.register(name, loader or (lambda: _load_whisperx_asr(size, compute_type)))
+    return name
+
+
+def _load_whisperx_align_en():
+    import whisperx
+    return whisperx.load_align_model(language_code="en", device=DEVICE)
+
+
+def _load_whisperx_diarize():
+    import whisperx
+    return whisperx.DiarizationPipeline(use_auth_token=speaker_diarization, device=DEVICE)
+
+
+def _load_pyannote_diarization():
+    from pyannote.audio import Pipeline
+    return Pipeline.from_pretrained("pyannote/speaker-diarization-3.1", use_auth_token=pipeline)
+
+
+def _load_pyannote_embedding():
+    from pyannote.audio import Model
+    return Model.from_pretrained("pyannote/embedding", use_auth_token=inference_model)
+
+
+def register_default_models(registry):
+    registry.register(WHISPERX_ASR, _load_whisperx_asr, replace=True)
+    registry.register(WHISPERX_ALIGN_EN, _load_whisperx_align_en, replace=True)
+    registry.register(WHISPERX_DIARIZE, _load_whisperx_diarize, replace=True)
+    registry.register(PYANNOTE_DIARIZATION, _load_pyannote_diarization, replace=True)
+    registry.register(PYANNOTE_EMBEDDING, _load_pyannote_embedding, replace=True)
+
+
+model_registry = ModelRegistry(
+    max_models=int(os.getenv("MODEL_REGISTRY_MAX_MODELS", "0")) or None,
+    idle_timeout=float(os.getenv("MODEL_REGISTRY_IDLE_TIMEOUT", "600")) or None,
+)
+register_default_models(model_registry)
@@ -0,0 +1,106 @@
+import numpy as np
+from collections import defaultdict
+from media_player.chunk_queue import SAMPLE_RATE
+
+# Longest clip per speaker fed to the embedding model
+MAX_SPEAKER_SECONDS = 10.0
+MIN_SPEAKER_SECONDS = 1.0
+
+
+def speaker_clips(audio, turns, max_seconds=MAX_SPEAKER_SECONDS, min_seconds=MIN_SPEAKER_SECONDS):
+    """
+    Stack each speaker's turns from the in-memory waveform into one
+    (n_speakers, 1, samples) batch. Every speaker's audio is concatenated
+    and tiled or trimmed to a common length so the batch is rectangular.
+    Returns (labels, batch).
+    """
+    labels = sorted(turns)
+    voices = []
+    for label in labels:
+        pieces = [audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)] for start, end in turns[label]]
+        voice = np.concatenate(pieces) if pieces else audio[:0]
+        voices.append(voice if len(voice) else audio)
+    longest = max((len(voice) for voice in voices), default=0)
+    length = int(min(max(longest, min_seconds * SAMPLE_RATE), max_seconds * SAMPLE_RATE))
+    batch = np.empty((len(labels), 1, length), dtype=np.float32)
+    for row, voice in enumerate(voices):
+        batch[row, 0] = np.resize(voice, length)
+    return labels, batch
+
+
+def spread_words(segments):
+    """
+    Stand-in for alignment: spread each segment's words evenly over its
+    time span. Returns an aligned-style result with per-word times.
+    """
+    spread = []
+    for segment in segments:
+        words = segment["text"].split()
+        step = (segment["end"] - segment["start"]) / max(len(words), 1)
+        spread.append(dict(segment, words=[
+            {"word": word, "start": segment["start"] + n * step, "end": segment["start"] + (n + 1) * step}
+            for n, word in enumerate(words)
+        ]))
+    return {"segments": spread}
+
+
+class WhisperxStages:
+    """
+    The library calls behind each step of ProcessAudioQueue's pipeline.
+
+    Models themselves come from the registry and are passed in; this class
+    only holds the glue around them, so a benchmark or an alternative
+    backend can swap in its own stages without touching the queue.
+    whisperx, torch and pyannote are imported on first use.
+    """
+
+    def load_audio(self, path):
+        import whisperx
+        return whisperx.load_audio(path)
+
+    def transcribe(self, model, audio):
+        return model.transcribe(audio, batch_size=16)
+
+    def align(self, align_model, metadata, segments, audio, device):
+        import whisperx
+        return whisperx.align(segments, align_model, metadata, audio, device)
+
+    def diarize(self, diarize_model, audio):
+        return diarize_model(audio)
+
+    def single_speaker_segments(self, label, duration):
+        """
+        Diarization output for a clip spoken entirely by `label`.
+        """
+        import pandas as pd
+        return pd.DataFrame({"start": [0.0], "end": [duration], "speaker": [label]})
+
+    def speaker_turns(self, diarize_segments):
+        """
+        {diarization label: [(start, end), ...]} from diarize's output.
+        """
+        turns = defaultdict(list)
+        for segment in diarize_segments.itertuples():
+            turns[segment.speaker].append((segment.start, segment.end))
+        return dict(turns)
+
+    def embed_speakers(self, embedding_model, audio, turns):
+        """
+        One embedding per diarized speaker, computed in a single batched
+        forward pass over the in-memory waveform. Returns (labels, (n, dim)).
+        """
+        import torch
+
+        labels, batch = speaker_clips(audio, turns)
+        if not labels:
+            return labels, np.zeros((0, 0), dtype=np.float32)
+        with torch.inference_mode():
+            embeddings = embedding_model(torch.from_numpy(batch))
+        return labels, embeddings.cpu().numpy()
+
+    def assign_speakers(self, diarize_segments, aligned_result):
+        import whisperx
+        return whisperx.assign_word_speakers(diarize_segments, aligned_result)
+
+    def identify(self, index, embeddings, threshold):
+        return index.identify(embeddings, threshold=threshold)
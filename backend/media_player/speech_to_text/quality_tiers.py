@@ -0,0 +1,191 @@
+import sys
+import threading
+import time
+from collections import deque
+import numpy as np
+from media_player.metrics import metrics
+from media_player.speech_to_text.model_registry import asr_model_name, register_asr_model
+
+QUALITY_TIER_CHANGES = metrics.counter(
+    "quality_tier_changes_total", "Quality tier switches, by direction", ["direction"]
+)
+# torch's intra-op thread count before any controller changed it
+_default_torch_threads = None
+
+
+class QualityTier:
+    """
+    One point on the speed/accuracy curve of the CPU pipeline: which
+    Whisper size and compute type transcribes, whether words are aligned,
+    how often diarization runs (every Nth chunk; the others reuse the last
+    chunk's main speaker) and how many intra-op threads torch may use.
+    Output of tiers without `cache_results` is served once and never
+    stored in the transcript cache, so later viewers get it at full quality.
+    """
+
+    __slots__ = ("name", "asr_size", "compute_type", "align", "diarize_every", "torch_threads", "cache_results")
+
+    def __init__(self, name, asr_size, compute_type, align=True, diarize_every=1, torch_threads=None,
+                 cache_results=True):
+        self.name = name
+        self.asr_size = asr_size
+        self.compute_type = compute_type
+        self.align = align
+        self.diarize_every = diarize_every
+        self.torch_threads = torch_threads
+        self.cache_results = cache_results
+
+    @property
+    def asr_model(self):
+        return asr_model_name(self.asr_size, self.compute_type)
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "asr_model": self.asr_model,
+            "asr_size": self.asr_size,
+            "compute_type": self.compute_type,
+            "align": self.align,
+            "diarize_every": self.diarize_every,
+            "torch_threads": self.torch_threads,
+            "cache_results": self.cache_results,
+        }
+
+
+# Best first. "standard" is the pipeline's original fixed configuration.
+# Fewer intra-op threads per pass trade single-chunk latency for more
+# concurrent passes once sessions outnumber cores.
+TIERS = (
+    QualityTier("high", "small", "float32"),
+    QualityTier("standard", "base", "float32"),
+    QualityTier("fast", "base", "int8", diarize_every=2, torch_threads=2, cache_results=False),
+    QualityTier("faster", "tiny", "int8", diarize_every=3, torch_threads=1, cache_results=False),
+    QualityTier("minimal", "tiny", "int8", align=False, diarize_every=6, torch_threads=1, cache_results=False),
+)
+
+
+def get_tier(name, tiers=TIERS):
+    for tier in tiers:
+        if tier.name == name:
+            return tier
+    raise ValueError(f"Unknown quality tier: {name}")
+
+
+def register_tier_models(registry, tiers=TIERS):
+    """
+    Register the ASR variant every tier needs on `registry`.
+    """
+    for tier in tiers:
+        register_asr_model(registry, tier.asr_size, tier.compute_type)
+
+
+class QualityController:
+    """
+    Picks the quality tier for the whole service from how far behind live
+    the transcripts are.
+
+    Every chunk that went through the models reports its result lag
+    (cache hits are not evidence of capacity and are left out). Once `window` lags have
+    been seen, if their 90th percentile exceeds `max_lag` seconds or the
+    scheduler holds more than `max_depth` chunks per session, the
+    controller steps one tier down; once lag is under `min_lag` with the
+    queues drained, it steps one tier back up. Switches are at least
+    `dwell` seconds apart and the lag window restarts after each one, so
+    only the new tier's lag is judged. Tiers stay between `best` and
+    `worst`; pin a tier by making them equal.
+
+    torch has one intra-op thread count per process, so with
+    `set_threads` the controller sets it for every model in the process,
+    not only for the sessions it steers; keep that to the one controller
+    that owns the process. Worker processes behind a process or transport
+    executor keep their own count.
+    """
+
+    def __init__(self, tiers=TIERS, initial="standard", best=None, worst=None, scheduler=None,
+                 max_lag=6.0, min_lag=2.0, max_depth=3, window=12, dwell=20.0, set_threads=True):
+        self.tiers = tuple(tiers)
+        names = [tier.name for tier in self.tiers]
+        self.index = names.index(initial)
+        self.best = names.index(best) if best is not None else self.index
+        self.worst = names.index(worst) if worst is not None else len(self.tiers) - 1
+        if not self.best <= self.index <= self.worst:
+            raise ValueError(f"Initial tier {initial} is outside {names[self.best]}..{names[self.worst]}")
+        self.scheduler = scheduler
+        self.max_lag = max_lag
+        self.min_lag = min_lag
+        self.max_depth = max_depth
+        self.dwell = dwell
+        self.set_threads = set_threads
+        self.changes = 0
+        self._lags = deque(maxlen=window)
+        self._last_change = time.monotonic()
+        self._lock = threading.Lock()
+        self._apply(self.tiers[self.index])
+
+    @property
+    def current(self):
+        return self.tiers[self.index]
+
+    def fallback_models(self):
+        """
+        ASR models of the tiers below the current one, down to `worst`,
+        which are worth loading before the first downgrade needs them.
+        """
+        names = []
+        for tier in self.tiers[self.index + 1:self.worst + 1]:
+            if tier.asr_model != self.current.asr_model and tier.asr_model not in names:
+                names.append(tier.asr_model)
+        return names
+
+    def observe_lag(self, seconds):
+        """
+        Record one chunk's result lag and adjust the tier if needed.
+        """
+        with self._lock:
+            self._lags.append(seconds)
+            if len(self._lags) < self._lags.maxlen or time.monotonic() - self._last_change < self.dwell:
+                return
+            lag = float(np.percentile(self._lags, 90))
+            depth = self._depth_per_session()
+            if (lag > self.max_lag or depth > self.max_depth) and self.index < self.worst:
+                self._switch(self.index + 1, "down", lag, depth)
+            elif lag < self.min_lag and depth <= 1 and self.index > self.best:
+                self._switch(self.index - 1, "up", lag, depth)
+
+    def _depth_per_session(self):
+        if self.scheduler is None:
+            return 0.0
+        stats = self.scheduler.stats()
+        return stats["total_depth"] / max(len(stats["sessions"]), 1)
+
+    def _switch(self, index, direction, lag, depth):
+        previous = self.tiers[self.index]
+        self.index = index
+        self.changes += 1
+        self._lags.clear()
+        self._last_change = time.monotonic()
+        QUALITY_TIER_CHANGES.inc(direction=direction)
+        print(f"Quality {direction}: {previous.name} -> {self.current.name} (p90 lag {lag:.1f}s, depth {depth:.1f})")
+        self._apply(self.current)
+
+    def _apply(self, tier):
+        global _default_torch_threads
+        # Only touch torch if something already imported it
+        torch = sys.modules.get("torch")
+        if torch is None or not self.set_threads:
+            return
+        if _default_torch_threads is None:
+            _default_torch_threads = torch.get_num_threads()
+        torch.set_num_threads(tier.torch_threads or _default_torch_threads)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "tier": self.current.as_dict(),
+                "best": self.tiers[self.best].name,
+                "worst": self.tiers[self.worst].name,
+                "changes": self.changes,
+                "recent_lag_p90_seconds": (
+                    round(float(np.percentile(self._lags, 90)), 3) if self._lags else None
+                ),
+            }
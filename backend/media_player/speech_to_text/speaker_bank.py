@@ -0,0 +1,105 @@
+import json
+import os
+import struct
+import time
+import numpy as np
+
+BANK_SUFFIX = ".bank"
+BANK_MAGIC = b"SPKBANK\x00"
+BANK_VERSION = 1
+# Rows start on a 64 byte boundary so the matrix can be memory-mapped as is
+_ALIGNMENT = 64
+_DTYPES = ("float16", "float32")
+
+
+def write_bank(path, speakers, dtype="float16", revision=None):
+    """
+    Write enrolled speakers to a single bank file.
+
+    `speakers` maps a display name to an (n, dim) array of prototype
+    embeddings, or to a dict with an "embeddings" array plus any extra
+    metadata to keep in the index. The file is a small JSON header (format
+    version, revision, dtype, dim and a name index of row ranges) followed
+    by every speaker's rows in one contiguous matrix. It is written to a
+    temporary file and renamed, so readers never see a partial bank.
+    """
+    if dtype not in _DTYPES:
+        raise ValueError(f"Unsupported bank dtype: {dtype}")
+    blocks = []
+    index = []
+    dim = None
+    rows = 0
+    for name, entry in speakers.items():
+        if isinstance(entry, dict):
+            metadata = {key: value for key, value in entry.items() if key != "embeddings"}
+            embeddings = entry["embeddings"]
+        else:
+            metadata = {}
+            embeddings = entry
+        embeddings = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+        if not len(embeddings):
+            continue
+        if dim is None:
+            dim = embeddings.shape[1]
+        elif embeddings.shape[1] != dim:
+            raise ValueError(f"{name} has {embeddings.shape[1]}-dim embeddings, expected {dim}")
+        index.append(dict(metadata, name=name, offset=rows, count=len(embeddings)))
+        blocks.append(embeddings)
+        rows += len(embeddings)
+
+    header = json.dumps({
+        "version": BANK_VERSION,
+        "revision": revision if revision is not None else int(time.time()),
+        "dtype": dtype,
+        "dim": dim or 0,
+        "rows": rows,
+        "speakers": index,
+    }).encode("utf-8")
+    prefix = len(BANK_MAGIC) + 4 + len(header)
+    padding = -prefix % _ALIGNMENT
+    matrix = np.concatenate(blocks).astype(dtype) if blocks else np.zeros((0, 0), dtype=dtype)
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(BANK_MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        f.write(b"\x00" * padding)
+        f.write(np.ascontiguousarray(matrix).tobytes())
+    os.replace(temp_path, path)
+
+
+def read_bank_header(path):
+    """
+    Return (header, data offset) of a bank file.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(BANK_MAGIC)) != BANK_MAGIC:
+            raise ValueError(f"Not a speaker bank: {path}")
+        (length,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(length).decode("utf-8"))
+    if header.get("version") != BANK_VERSION:
+        raise ValueError(f"Unsupported speaker bank version {header.get('version')}: {path}")
+    prefix = len(BANK_MAGIC) + 4 + length
+    return header, prefix + (-prefix % _ALIGNMENT)
+
+
+def read_bank(path, mmap=True):
+    """
+    Load a bank file. Returns (header, {name: (n, dim) array}); with `mmap`
+    the arrays are read-only views of the memory-mapped file.
+    """
+    header, offset = read_bank_header(path)
+    shape = (header["rows"], header["dim"])
+    if not header["rows"]:
+        return header, {}
+    if mmap:
+        matrix = np.memmap(path, dtype=header["dtype"], mode="r", offset=offset, shape=shape)
+    else:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            matrix = np.fromfile(f, dtype=header["dtype"], count=shape[0] * shape[1]).reshape(shape)
+    return header, {
+        speaker["name"]: matrix[speaker["offset"]:speaker["offset"] + speaker["count"]]
+        for speaker in header["speakers"]
+    }
@@ -0,0 +1,186 @@
+import glob
+import os
+import threading
+import time
+import numpy as np
+from media_player.speech_to_text.speaker_bank import BANK_SUFFIX, read_bank
+
+EMBEDDING_SUFFIX = "_embedding.npy"
+
+
+def _speaker_name(path):
+    """
+    Derive a display name from a bank file, e.g. trump_embedding.npy -> Trump.
+    """
+    base = os.path.basename(path)[: -len(EMBEDDING_SUFFIX)]
+    return base.replace("_", " ").title()
+
+
+def _l2_normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class SpeakerIndex:
+    """
+    In-memory bank of enrolled speaker embeddings.
+
+    Every `<name>_embedding.npy` file and every speaker in the `*.bank`
+    files (see speaker_bank) in `embedding_dir` is loaded once,
+    L2-normalized and stacked into one contiguous float32 matrix with rows
+    grouped by speaker, so a batch of phrase embeddings is scored against
+    all speakers with a single matrix multiply. The bank is reloaded when
+    a file is added, removed or modified on disk.
+    """
+
+    AGGREGATIONS = ("mean", "max", "topk")
+
+    def __init__(self, embedding_dir, aggregation="mean", top_k=5, mmap=True, reload_interval=1.0):
+        if aggregation not in self.AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation: {aggregation}")
+        self.embedding_dir = embedding_dir
+        self.aggregation = aggregation
+        self.top_k = top_k
+        self.mmap = mmap
+        self.reload_interval = reload_interval
+        self.names = []
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.row_speaker = np.zeros(0, dtype=np.int64)
+        self._signature = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def __len__(self):
+        return len(self.names)
+
+    def _bank_files(self):
+        # Bank files come last so their speakers replace same-named .npy ones
+        return (
+            sorted(glob.glob(os.path.join(self.embedding_dir, f"*{EMBEDDING_SUFFIX}")))
+            + sorted(glob.glob(os.path.join(self.embedding_dir, f"*{BANK_SUFFIX}")))
+        )
+
+    def _bank_signature(self, files):
+        signature = []
+        for path in files:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def reload(self):
+        """
+        Rebuild the normalized matrix from the files currently on disk.
+        """
+        files = self._bank_files()
+        signature = self._bank_signature(files)
+        speakers = {}
+        for path, _, _ in signature:
+            if path.endswith(BANK_SUFFIX):
+                try:
+                    _, bank = read_bank(path, mmap=self.mmap)
+                except (OSError, ValueError) as e:
+                    print(f"Error loading speaker bank {path}: {e}")
+                    continue
+            else:
+                bank = {_speaker_name(path): np.load(path, mmap_mode="r" if self.mmap else None)}
+            for name, embeddings in bank.items():
+                embeddings = np.asarray(embeddings, dtype=np.float32).reshape(-1, embeddings.shape[-1])
+                if len(embeddings):
+                    speakers.pop(name, None)
+                    speakers[name] = embeddings
+        names = list(speakers)
+        blocks = list(speakers.values())
+
+        if blocks:
+            matrix = np.ascontiguousarray(_l2_normalize(np.concatenate(blocks)), dtype=np.float32)
+            counts = np.array([len(block) for block in blocks], dtype=np.int64)
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+            counts = np.zeros(0, dtype=np.int64)
+
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        row_speaker = np.repeat(np.arange(len(counts)), counts)
+        with self._lock:
+            self.names = names
+            self.matrix = matrix
+            self.offsets = offsets
+            self.row_speaker = row_speaker
+            self._signature = signature
+            self._last_check = time.monotonic()
+
+    def maybe_reload(self):
+        """
+        Reload the bank if it changed on disk. Checks are throttled to one
+        every `reload_interval` seconds.
+        """
+        now = time.monotonic()
+        if now - self._last_check < self.reload_interval:
+            return False
+        self._last_check = now
+        if self._bank_signature(self._bank_files()) == self._signature:
+            return False
+        self.reload()
+        return True
+
+    def score(self, embeddings):
+        """
+        Score phrase embeddings against every enrolled speaker.
+
+        Accepts a single (dim,) embedding or a (n, dim) batch and returns
+        an (n, n_speakers) array of aggregated cosine similarities.
+        """
+        self.maybe_reload()
+        with self._lock:
+            matrix, offsets, row_speaker = self.matrix, self.offsets, self.row_speaker
+            n_speakers = len(self.names)
+
+        queries = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+        if not n_speakers:
+            return np.zeros((len(queries), 0), dtype=np.float32)
+        similarities = _l2_normalize(queries) @ matrix.T
+
+        if self.aggregation == "mean":
+            counts = np.diff(offsets)
+            return np.add.reduceat(similarities, offsets[:-1], axis=1) / counts
+        if self.aggregation == "max":
+            return np.maximum.reduceat(similarities, offsets[:-1], axis=1)
+        return self._top_k_mean(similarities, row_speaker, offsets)
+
+    def _top_k_mean(self, similarities, row_speaker, offsets):
+        # Shift each speaker's similarities into its own disjoint band so a
+        # single descending sort orders rows by speaker and, within each
+        # speaker, by similarity. The first k rows of every block are kept.
+        ordered = -np.sort(-(similarities - 4.0 * row_speaker), axis=1) + 4.0 * row_speaker
+        k = np.minimum(np.diff(offsets), self.top_k)
+        rank = np.arange(len(row_speaker)) - offsets[row_speaker]
+        keep = rank < k[row_speaker]
+        return np.add.reduceat(ordered * keep, offsets[:-1], axis=1) / k
+
+    def identify(self, embeddings, threshold=0.1, unknown="Unknown"):
+        """
+        Return a (name, similarity) pair per embedding. Embeddings whose best
+        score is below `threshold` are labelled `unknown`.
+        """
+        scores = self.score(embeddings)
+        if not scores.shape[1]:
+            return [(unknown, 0.0) for _ in range(len(scores))]
+        best = scores.argmax(axis=1)
+        best_scores = scores[np.arange(len(scores)), best]
+        names = self.names
+        return [
+            (names[index] if score >= threshold else unknown, float(score))
+            for index, score in zip(best, best_scores)
+        ]
+
+    def similarities(self, embedding):
+        """
+        Return {speaker name: similarity} for a single embedding.
+        """
+        scores = self.score(embedding)[0]
+        return dict(zip(self.names, scores.tolist()))
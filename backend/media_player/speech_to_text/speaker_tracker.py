@@ -0,0 +1,175 @@
+import threading
+import numpy as np
+
+
+def _normalize(vector):
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class _Track:
+    __slots__ = ("id", "total", "centroid", "count", "name", "similarity")
+
+    def __init__(self, track_id, embedding):
+        self.id = track_id
+        self.total = embedding.copy()
+        self.centroid = embedding.copy()
+        self.count = 1
+        self.name = None
+        self.similarity = None
+
+    def add(self, embedding, weight=1):
+        self.total += embedding * weight
+        self.count += weight
+        self.centroid = _normalize(self.total)
+
+
+class SpeakerTracker:
+    """
+    Online clustering of one session's speaker embeddings across chunks.
+
+    Every diarized speaker embedding is assigned to the track whose
+    centroid it is closest to (cosine) if the similarity reaches
+    `threshold`, otherwise it starts a new track. Centroids are running
+    means of normalized embeddings. Tracks whose centroids drift within
+    `merge_threshold` of each other are merged, and the absorbed track's id
+    keeps resolving to the survivor, so labels handed out earlier stay
+    valid. At most `max_tracks` are kept; past that the least seen track
+    is dropped.
+    """
+
+    def __init__(self, threshold=0.5, merge_threshold=0.7, max_tracks=32):
+        self.threshold = threshold
+        self.merge_threshold = merge_threshold
+        self.max_tracks = max_tracks
+        self._tracks = []
+        self._aliases = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self.merges = 0
+
+    def __len__(self):
+        return len(self._tracks)
+
+    def _centroids(self):
+        if not self._tracks:
+            return None
+        return np.stack([track.centroid for track in self._tracks])
+
+    def _best(self, embedding):
+        centroids = self._centroids()
+        if centroids is None:
+            return None, -1.0
+        scores = centroids @ embedding
+        best = int(scores.argmax())
+        return self._tracks[best], float(scores[best])
+
+    def resolve(self, track_id):
+        """
+        The current id of a track, following merges.
+        """
+        with self._lock:
+            while track_id in self._aliases:
+                track_id = self._aliases[track_id]
+            return track_id
+
+    def assign(self, embeddings):
+        """
+        Assign each row of `embeddings` to a track, updating centroids.
+        Returns one track id per row.
+        """
+        embeddings = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+        track_ids = []
+        with self._lock:
+            for embedding in embeddings:
+                embedding = _normalize(embedding)
+                track, score = self._best(embedding)
+                if track is None or score < self.threshold:
+                    track = _Track(self._next_id, embedding)
+                    self._next_id += 1
+                    self._tracks.append(track)
+                    if len(self._tracks) > self.max_tracks:
+                        self._tracks.remove(min(self._tracks[:-1], key=lambda candidate: candidate.count))
+                else:
+                    track.add(embedding)
+                track_ids.append(track.id)
+            self._merge_locked()
+            resolved = []
+            for track_id in track_ids:
+                while track_id in self._aliases:
+                    track_id = self._aliases[track_id]
+                resolved.append(track_id)
+        return resolved
+
+    def _merge_locked(self):
+        merged = True
+        while merged and len(self._tracks) > 1:
+            merged = False
+            centroids = self._centroids()
+            scores = centroids @ centroids.T
+            np.fill_diagonal(scores, -1.0)
+            first, second = np.unravel_index(int(scores.argmax()), scores.shape)
+            if scores[first, second] >= self.merge_threshold:
+                keep, absorb = self._tracks[first], self._tracks[second]
+                if absorb.count > keep.count:
+                    keep, absorb = absorb, keep
+                keep.add(_normalize(absorb.total), weight=absorb.count)
+                if keep.name is None:
+                    keep.name, keep.similarity = absorb.name, absorb.similarity
+                self._tracks.remove(absorb)
+                self._aliases[absorb.id] = keep.id
+                self.merges += 1
+                merged = True
+
+    def dominant(self, embedding, threshold):
+        """
+        Return the track id whose centroid matches `embedding` by at least
+        `threshold`, or None.
+        """
+        with self._lock:
+            track, score = self._best(_normalize(np.asarray(embedding, dtype=np.float32)))
+        if track is None or score < threshold:
+            return None
+        return track.id
+
+    def known_centroids(self):
+        """
+        Every track's current centroid as an (n, dim) array, or None
+        before the first assignment.
+        """
+        with self._lock:
+            return self._centroids()
+
+    def centroids(self, track_ids):
+        """
+        The current centroid of each given track, as an (n, dim) array.
+        """
+        track_ids = [self.resolve(track_id) for track_id in track_ids]
+        with self._lock:
+            by_id = {track.id: track.centroid for track in self._tracks}
+            dim = len(self._tracks[0].centroid) if self._tracks else 0
+            # A track evicted in the meantime has no centroid left
+            return np.stack([by_id.get(track_id, np.zeros(dim, dtype=np.float32)) for track_id in track_ids])
+
+    def name(self, track_id, name, similarity):
+        """
+        Remember the enrolled speaker a track was identified as.
+        """
+        track_id = self.resolve(track_id)
+        with self._lock:
+            for track in self._tracks:
+                if track.id == track_id:
+                    track.name, track.similarity = name, similarity
+
+    def label(self, track_id):
+        return f"Speaker {self.resolve(track_id)}"
+
+    def stats(self):
+        with self._lock:
+            return {
+                "tracks": [
+                    {"id": track.id, "count": track.count, "name": track.name, "similarity": track.similarity}
+                    for track in self._tracks
+                ],
+                "merges": self.merges,
+            }
@@ -0,0 +1,221 @@
+import bisect
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+CACHE_PATH = os.path.join(BASE_DIR, 'speech_to_text', 'transcript_cache.sqlite3')
+
+# Bump when the pipeline changes in a way that invalidates cached output
+PIPELINE_VERSION = "whisperx-base-en:2"
+
+HASH_BLOCK_SIZE = 1 << 20
+
+# Upper bound on a cached range's length; chunks are force-split at 30 s
+MAX_RANGE_SECONDS = 60.0
+
+
+def hash_file(path):
+    """
+    BLAKE2b digest of a file's contents.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def shift_phrase(phrase, offset, **extra):
+    """
+    Copy of `phrase` with its own and its words' times moved by `offset`
+    seconds, e.g. from chunk-relative to absolute media time.
+    """
+    shifted = dict(phrase, start=phrase["start"] + offset, end=phrase["end"] + offset, **extra)
+    if "words" in phrase:
+        shifted["words"] = [
+            dict(word, start=word["start"] + offset, end=word["end"] + offset) for word in phrase["words"]
+        ]
+    return shifted
+
+
+class _MediaRanges:
+    """
+    Processed time ranges of one media file, sorted by start time.
+    """
+
+    def __init__(self, rows=()):
+        self.starts = []
+        self.ranges = []
+        for start, end, phrases in rows:
+            self.add(start, end, phrases)
+
+    def add(self, start, end, phrases):
+        index = bisect.bisect_left(self.starts, start)
+        self.starts.insert(index, start)
+        self.ranges.insert(index, (start, end, phrases))
+
+    def overlapping(self, start, end):
+        """
+        Ranges intersecting [start, end), ordered by start time.
+        """
+        # Ranges are bounded in length, so only those starting within
+        # MAX_RANGE_SECONDS before `start` can reach into the window
+        first = bisect.bisect_left(self.starts, start - MAX_RANGE_SECONDS)
+        last = bisect.bisect_left(self.starts, end)
+        return [entry for entry in self.ranges[first:last] if entry[1] > start]
+
+
+class TranscriptCache:
+    """
+    Cache of speaker-attributed phrases keyed by media content and time.
+
+    Each processed chunk is stored as a (start, end) range of a media file,
+    identified by a hash of the file's contents plus PIPELINE_VERSION, so
+    renamed copies share entries and pipeline changes start clean. Entries
+    persist in SQLite; the ranges of the `max_media` most recently used
+    files are kept in an in-memory LRU. Phrase times are absolute media
+    seconds.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_media=32, tolerance=0.05):
+        self.path = path
+        self.max_media = max_media
+        self.tolerance = tolerance
+        self._lock = threading.Lock()
+        self._media = OrderedDict()
+        self._hashes = {}
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS ranges ("
+            " media_key TEXT NOT NULL, start_ms INTEGER NOT NULL, end_ms INTEGER NOT NULL,"
+            " phrases TEXT NOT NULL, PRIMARY KEY (media_key, start_ms, end_ms))"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS media_hashes ("
+            " path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, hash TEXT NOT NULL)"
+        )
+        self._db.commit()
+
+    def media_key(self, path):
+        """
+        Content key for a media file. The hash is computed once per
+        (path, size, mtime) and remembered across restarts.
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._hashes.get(path)
+            if cached is None:
+                row = self._db.execute(
+                    "SELECT size, mtime_ns, hash FROM media_hashes WHERE path = ?", (path,)
+                ).fetchone()
+                if row is not None:
+                    cached = ((row[0], row[1]), row[2])
+            if cached is not None and cached[0] == signature:
+                return f"{cached[1]}:{PIPELINE_VERSION}"
+
+        content_hash = hash_file(path)
+        with self._lock:
+            self._hashes[path] = (signature, content_hash)
+            self._db.execute(
+                "INSERT OR REPLACE INTO media_hashes (path, size, mtime_ns, hash) VALUES (?, ?, ?, ?)",
+                (path, signature[0], signature[1], content_hash),
+            )
+            self._db.commit()
+        return f"{content_hash}:{PIPELINE_VERSION}"
+
+    def _ranges(self, media_key):
+        ranges = self._media.get(media_key)
+        if ranges is None:
+            rows = self._db.execute(
+                "SELECT start_ms, end_ms, phrases FROM ranges WHERE media_key = ? ORDER BY start_ms", (media_key,)
+            ).fetchall()
+            ranges = _MediaRanges((start / 1000, end / 1000, json.loads(phrases)) for start, end, phrases in rows)
+            self._media[media_key] = ranges
+            while len(self._media) > self.max_media:
+                self._media.popitem(last=False)
+        else:
+            self._media.move_to_end(media_key)
+        return ranges
+
+    def store(self, media_key, start, end, phrases):
+        """
+        Record the phrases produced for media time [start, end).
+        """
+        phrases = [dict(phrase) for phrase in phrases]
+        with self._lock:
+            self._ranges(media_key).add(start, end, phrases)
+            self._db.execute(
+                "INSERT OR REPLACE INTO ranges (media_key, start_ms, end_ms, phrases) VALUES (?, ?, ?, ?)",
+                (media_key, int(round(start * 1000)), int(round(end * 1000)), json.dumps(phrases)),
+            )
+            self._db.commit()
+
+    def gaps(self, media_key, start, end):
+        """
+        Sub-ranges of [start, end) not covered by any cached range.
+        """
+        with self._lock:
+            covered = self._ranges(media_key).overlapping(start, end)
+        gaps = []
+        cursor = start
+        for range_start, range_end, _ in covered:
+            if range_start > cursor + self.tolerance:
+                gaps.append((cursor, range_start))
+            cursor = max(cursor, range_end)
+        if end > cursor + self.tolerance:
+            gaps.append((cursor, end))
+        return gaps
+
+    def phrases(self, media_key, start, end):
+        """
+        Cached phrases that start inside [start, end), ordered by time.
+        """
+        with self._lock:
+            covered = self._ranges(media_key).overlapping(start, end)
+        found = {}
+        for _, _, phrases in covered:
+            for phrase in phrases:
+                if start - self.tolerance <= phrase["start"] < end:
+                    found[(phrase["start"], phrase["end"], phrase["text"])] = phrase
+        return [found[key] for key in sorted(found)]
+
+    def lookup(self, media_key, start, end):
+        """
+        Return the cached phrases for [start, end) if the whole range has
+        been processed before, otherwise None.
+        """
+        if self.gaps(media_key, start, end):
+            return None
+        return self.phrases(media_key, start, end)
+
+    def record(self, outcome):
+        with self._lock:
+            if outcome == "hit":
+                self.hits += 1
+            elif outcome == "partial":
+                self.partial_hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "partial_hits": self.partial_hits,
+                "misses": self.misses,
+                "media_in_memory": len(self._media),
+            }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,332 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+from media_player.speech_to_text.transcript_cache import shift_phrase
+
+INITIAL_CAPACITY = 256
+
+
+class _Columns:
+    """
+    One generation of a video's transcript arrays.
+
+    Phrases are rows sorted by start time, each owning the contiguous word
+    rows [first_word, first_word + word_count). `max_end[i]` is the latest
+    end of phrases 0..i, which makes it non-decreasing, so the first phrase
+    that can reach time t is a binary search away. Word text lives in one
+    UTF-8 buffer addressed by offset and length, shared by generations
+    until it is compacted.
+    """
+
+    def __init__(self, phrase_capacity, word_capacity, text=None):
+        self.text = bytearray() if text is None else text
+        self.phrase_start = np.zeros(phrase_capacity, dtype=np.float64)
+        self.phrase_end = np.zeros(phrase_capacity, dtype=np.float64)
+        self.max_end = np.zeros(phrase_capacity, dtype=np.float64)
+        self.phrase_speaker = np.zeros(phrase_capacity, dtype=np.int32)
+        self.first_word = np.zeros(phrase_capacity, dtype=np.int64)
+        self.word_count = np.zeros(phrase_capacity, dtype=np.int32)
+        self.word_start = np.zeros(word_capacity, dtype=np.float64)
+        self.word_end = np.zeros(word_capacity, dtype=np.float64)
+        self.word_speaker = np.zeros(word_capacity, dtype=np.int32)
+        self.text_offset = np.zeros(word_capacity, dtype=np.int64)
+        self.text_length = np.zeros(word_capacity, dtype=np.int32)
+        self.phrases = 0
+        self.words = 0
+
+    @property
+    def phrase_capacity(self):
+        return len(self.phrase_start)
+
+    @property
+    def word_capacity(self):
+        return len(self.word_start)
+
+
+class VideoTranscript:
+    """
+    Speaker-attributed transcript of one video, queryable by media time.
+
+    `phrases_between(t0, t1)` and `phrases_at(t)` cost O(log n) plus the
+    phrases returned, so subtitles and seeks stay cheap on multi-hour
+    recordings. Processed chunks are merged in with `add`, which replaces
+    whatever was stored for the same time range. Appending past the end
+    (the live case) writes into spare capacity; anything else builds a new
+    generation of the arrays. Readers never take the lock: they use the
+    generation and row counts current when they start, which a writer only
+    replaces whole.
+
+    With `retention` seconds, phrases ending that long before the newest
+    one are dropped, so a round-the-clock stream keeps a bounded window.
+    """
+
+    def __init__(self, retention=None):
+        self.retention = retention
+        self._columns = _Columns(INITIAL_CAPACITY, INITIAL_CAPACITY * 16)
+        self._garbage = 0
+        self.speakers = []
+        self._speaker_codes = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._columns.phrases
+
+    @property
+    def words(self):
+        return self._columns.words
+
+    def _speaker_code(self, speaker):
+        code = self._speaker_codes.get(speaker)
+        if code is None:
+            code = self._speaker_codes[speaker] = len(self.speakers)
+            self.speakers.append(speaker)
+        return code
+
+    def _flatten(self, phrases, text):
+        """
+        Column values for `phrases` (absolute times, sorted by start). A
+        phrase without word timings becomes a single word spanning it.
+        """
+        rows = []
+        words = []
+        for phrase in phrases:
+            speaker = self._speaker_code(phrase.get("speaker"))
+            phrase_words = phrase.get("words") or [
+                {"word": phrase["text"].strip(), "start": phrase["start"], "end": phrase["end"]}
+            ]
+            rows.append((phrase["start"], phrase["end"], speaker, len(phrase_words)))
+            for word in phrase_words:
+                encoded = word["word"].strip().encode("utf-8")
+                words.append((word["start"], word["end"], speaker, len(text), len(encoded)))
+                text += encoded
+        return rows, words
+
+    def add(self, start, end, phrases):
+        """
+        Merge the phrases (absolute times) produced for media time
+        [start, end), replacing any stored phrases that start in it.
+        """
+        phrases = sorted(phrases, key=lambda phrase: (phrase["start"], phrase["end"]))
+        if phrases:
+            start = min(start, phrases[0]["start"])
+            end = max(end, np.nextafter(phrases[-1]["start"], np.inf))
+        with self._lock:
+            old = self._columns
+            starts = old.phrase_start[:old.phrases]
+            low = int(np.searchsorted(starts, start, side="left"))
+            high = int(np.searchsorted(starts, end, side="left"))
+            # Text is only ever appended, so new words never move old ones
+            rows, words = self._flatten(phrases, old.text)
+            if low == high == old.phrases and self._fits(old, len(rows), len(words)):
+                self._append(old, rows, words)
+            else:
+                self._columns = self._rebuild(old, low, high, rows, words)
+            if self.retention is not None:
+                self._expire()
+            if self._garbage > len(self._columns.text) // 2:
+                self._compact()
+
+    def _fits(self, columns, phrases, words):
+        return columns.phrases + phrases <= columns.phrase_capacity and columns.words + words <= columns.word_capacity
+
+    def _write(self, columns, phrase_at, word_at, rows, words):
+        if rows:
+            phrase_rows = slice(phrase_at, phrase_at + len(rows))
+            phrase_start, phrase_end, speaker, count = (np.array(column) for column in zip(*rows))
+            columns.phrase_start[phrase_rows] = phrase_start
+            columns.phrase_end[phrase_rows] = phrase_end
+            columns.phrase_speaker[phrase_rows] = speaker
+            columns.word_count[phrase_rows] = count
+            columns.first_word[phrase_rows] = word_at + np.concatenate(([0], np.cumsum(count)[:-1]))
+        if words:
+            word_rows = slice(word_at, word_at + len(words))
+            word_start, word_end, speaker, offset, length = (np.array(column) for column in zip(*words))
+            columns.word_start[word_rows] = word_start
+            columns.word_end[word_rows] = word_end
+            columns.word_speaker[word_rows] = speaker
+            columns.text_offset[word_rows] = offset
+            columns.text_length[word_rows] = length
+
+    def _append(self, columns, rows, words):
+        # Rows past the published counts are invisible to readers until the
+        # counts move, so the live case updates in place
+        phrases = columns.phrases
+        self._write(columns, phrases, columns.words, rows, words)
+        if rows:
+            previous = columns.max_end[phrases - 1] if phrases else -np.inf
+            columns.max_end[phrases:phrases + len(rows)] = np.maximum.accumulate(
+                np.maximum(columns.phrase_end[phrases:phrases + len(rows)], previous)
+            )
+        columns.words += len(words)
+        columns.phrases += len(rows)
+
+    def _rebuild(self, old, low, high, rows, words):
+        word_low = int(old.first_word[low]) if low < old.phrases else old.words
+        word_high = int(old.first_word[high]) if high < old.phrases else old.words
+        self._garbage += int(old.text_length[word_low:word_high].sum())
+        phrases = old.phrases - (high - low) + len(rows)
+        word_total = old.words - (word_high - word_low) + len(words)
+        columns = _Columns(
+            max(INITIAL_CAPACITY, 1 << (phrases * 2 - 1).bit_length()),
+            max(INITIAL_CAPACITY * 16, 1 << (word_total * 2 - 1).bit_length()),
+            old.text,
+        )
+        for name in ("phrase_start", "phrase_end", "phrase_speaker", "first_word", "word_count"):
+            new, current = getattr(columns, name), getattr(old, name)
+            new[:low] = current[:low]
+            new[low + len(rows):phrases] = current[high:old.phrases]
+        for name in ("word_start", "word_end", "word_speaker", "text_offset", "text_length"):
+            new, current = getattr(columns, name), getattr(old, name)
+            new[:word_low] = current[:word_low]
+            new[word_low + len(words):word_total] = current[word_high:old.words]
+        # Phrases after the merged range now start their words elsewhere
+        columns.first_word[low + len(rows):phrases] += len(words) - (word_high - word_low)
+        self._write(columns, low, word_low, rows, words)
+        columns.max_end[:phrases] = np.maximum.accumulate(columns.phrase_end[:phrases])
+        columns.phrases = phrases
+        columns.words = word_total
+        return columns
+
+    def _expire(self):
+        columns = self._columns
+        count = columns.phrases
+        if not count:
+            return
+        cutoff = columns.max_end[count - 1] - self.retention
+        # Trim in steps of a quarter of the window rather than per chunk
+        if columns.phrase_start[0] >= cutoff - self.retention / 4:
+            return
+        expired = int(np.searchsorted(columns.max_end[:count], cutoff, side="left"))
+        if expired:
+            self._columns = self._rebuild(columns, 0, expired, [], [])
+
+    def _compact(self):
+        columns = self._columns
+        text = bytearray()
+        offsets = np.zeros(columns.word_capacity, dtype=np.int64)
+        for row in range(columns.words):
+            offset = int(columns.text_offset[row])
+            offsets[row] = len(text)
+            text += columns.text[offset:offset + int(columns.text_length[row])]
+        # A fresh generation, so readers of the old one keep valid offsets
+        compacted = _Columns(columns.phrase_capacity, columns.word_capacity)
+        for name in vars(columns):
+            setattr(compacted, name, getattr(columns, name))
+        compacted.text_offset = offsets
+        compacted.text = text
+        self._garbage = 0
+        self._columns = compacted
+
+    def _candidates(self, columns, start, end):
+        count = columns.phrases
+        first = int(np.searchsorted(columns.max_end[:count], start, side="left"))
+        last = int(np.searchsorted(columns.phrase_start[:count], end, side="right"))
+        rows = np.arange(first, max(first, last))
+        return rows[columns.phrase_end[rows] >= start]
+
+    def phrases_between(self, start, end, words=True):
+        """
+        Phrases overlapping media time [start, end], ordered by start, as
+        {"speaker", "text", "start", "end", "words"} dicts.
+        """
+        columns = self._columns
+        rows = self._candidates(columns, start, end)
+        if not len(rows):
+            return []
+        # Matching words are contiguous, so every column is read in one slice
+        first_word = int(columns.first_word[rows[0]])
+        last_word = int(columns.first_word[rows[-1]] + columns.word_count[rows[-1]])
+        text = columns.text
+        offsets = columns.text_offset[first_word:last_word].tolist()
+        lengths = columns.text_length[first_word:last_word].tolist()
+        tokens = [bytes(text[offset:offset + length]).decode("utf-8") for offset, length in zip(offsets, lengths)]
+        word_starts = np.round(columns.word_start[first_word:last_word], 3).tolist()
+        word_ends = np.round(columns.word_end[first_word:last_word], 3).tolist()
+        phrases = []
+        for row, phrase_start, phrase_end, speaker, first, count in zip(
+            rows.tolist(),
+            np.round(columns.phrase_start[rows], 3).tolist(),
+            np.round(columns.phrase_end[rows], 3).tolist(),
+            columns.phrase_speaker[rows].tolist(),
+            (columns.first_word[rows] - first_word).tolist(),
+            columns.word_count[rows].tolist(),
+        ):
+            phrase = {
+                "speaker": self.speakers[speaker],
+                "text": " ".join(tokens[first:first + count]),
+                "start": phrase_start,
+                "end": phrase_end,
+            }
+            if words:
+                phrase["words"] = [
+                    {"word": tokens[word], "start": word_starts[word], "end": word_ends[word]}
+                    for word in range(first, first + count)
+                ]
+            phrases.append(phrase)
+        return phrases
+
+    def phrases_at(self, time, words=True):
+        """
+        Phrases being spoken at media time `time`.
+        """
+        return self.phrases_between(time, time, words)
+
+    def nbytes(self):
+        columns = self._columns
+        return sum(value.nbytes for value in vars(columns).values() if isinstance(value, np.ndarray)) + len(columns.text)
+
+
+class TranscriptStore:
+    """
+    Time-indexed transcripts of the `max_videos` most recently used videos,
+    each trimmed to the last `retention` seconds if set.
+    """
+
+    def __init__(self, max_videos=64, retention=None):
+        self.max_videos = max_videos
+        self.retention = retention
+        self._videos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, video, create=False):
+        with self._lock:
+            transcript = self._videos.get(video)
+            if transcript is not None:
+                self._videos.move_to_end(video)
+            elif create:
+                transcript = self._videos[video] = VideoTranscript(self.retention)
+                while len(self._videos) > self.max_videos:
+                    self._videos.popitem(last=False)
+            return transcript
+
+    def __contains__(self, video):
+        with self._lock:
+            return video in self._videos
+
+    def add_chunk(self, video, chunk, phrases):
+        """
+        Merge a processed chunk's phrases, which have chunk-relative times.
+        """
+        self.get(video, create=True).add(
+            chunk.start_time, chunk.end_time, [shift_phrase(phrase, chunk.start_time) for phrase in phrases]
+        )
+
+    def load(self, video, phrases):
+        """
+        Seed a video's transcript from phrases with absolute times, such
+        as those in the transcript cache.
+        """
+        transcript = self.get(video, create=True)
+        if phrases:
+            transcript.add(phrases[0]["start"], phrases[-1]["end"], phrases)
+        return transcript
+
+    def stats(self):
+        with self._lock:
+            transcripts = list(self._videos.values())
+        return {
+            "videos": len(transcripts),
+            "phrases": sum(len(transcript) for transcript in transcripts),
+            "words": sum(transcript.words for transcript in transcripts),
+            "bytes": sum(transcript.nbytes() for transcript in transcripts),
+        }
@@ -0,0 +1,143 @@
+"""
+Transcription worker: takes chunk jobs from a job transport, runs them
+through the models and acknowledges each with its diarized segments and
+speaker embeddings, which the API names and caches per session.
+
+Start one or more per CPU node, pointed at the broker the API uses
+(JOB_BROKER), with the broker's JOB_BROKER_AUTHKEY in the environment.
+Run from backend/:
+
+    python -m media_player.speech_to_text.transcription_worker --broker api-host:5599 --processes 4
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import threading
+from media_player.speech_to_text.job_transport import connect_broker, BROKER_AUTHKEY
+from media_player.speech_to_text.process_audio_queue import ProcessAudioQueue
+from media_player.speech_to_text.model_registry import DEVICE
+from media_player.metrics import metrics
+
+JOBS_PROCESSED = metrics.counter("transcription_worker_jobs_total", "Jobs run by this worker", ["outcome"])
+
+
+class TranscriptionWorker:
+    """
+    Runs jobs from `transport` one at a time until stopped.
+
+    While a job runs, a heartbeat renews its lease every `heartbeat`
+    seconds, so a slow chunk is not handed to another worker. A job that
+    raises is given back for a retry. `process(job)` defaults to running
+    the ChunkJob on a ProcessAudioQueue of the worker's own, created on the
+    first job, which only holds the models; speaker tracking and caching
+    stay with each job's session on the API side.
+    """
+
+    def __init__(self, transport, name=None, process=None, heartbeat=10.0):
+        self.transport = transport
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}-{threading.get_ident()}"
+        self.process = process or self._process
+        self.heartbeat = heartbeat
+        self._queue = None
+        self._stop_event = threading.Event()
+        self.processed = 0
+        self.failed = 0
+
+    def _process(self, job):
+        if self._queue is None:
+            self._queue = ProcessAudioQueue(session_id=f"worker-{self.name}", device=DEVICE)
+        return self._queue.run_job(job)
+
+    def run(self):
+        while not self._stop_event.is_set():
+            job = self.transport.reserve(self.name, timeout=1.0)
+            if job is not None:
+                self.run_job(*job)
+        if self._queue is not None:
+            self._queue.close()
+
+    def run_job(self, job_id, job, attempt):
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._keep_lease, args=(job_id, done), daemon=True)
+        heartbeat.start()
+        try:
+            result = self.process(job)
+        except Exception as e:
+            print(f"Error processing job {job_id} (attempt {attempt}): {e}")
+            self.failed += 1
+            JOBS_PROCESSED.inc(outcome="error")
+            self.transport.fail(job_id, self.name, repr(e))
+        else:
+            self.processed += 1
+            JOBS_PROCESSED.inc(outcome="ok")
+            if not self.transport.ack(job_id, self.name, result):
+                print(f"Result of job {job_id} was not accepted; it finished elsewhere or was handed on")
+        finally:
+            done.set()
+            heartbeat.join()
+
+    def _keep_lease(self, job_id, done):
+        while not done.wait(self.heartbeat):
+            if not self.transport.extend(job_id, self.name):
+                print(f"Lost the lease on job {job_id}; another worker may run it too")
+                return
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def start_worker_threads(transport, count, process=None):
+    """
+    Run `count` workers on daemon threads of this process. Returns the
+    workers; stop() each to end them.
+    """
+    workers = [TranscriptionWorker(transport, name=f"{os.getpid()}-thread-{i}", process=process)
+               for i in range(count)]
+    for i, worker in enumerate(workers):
+        threading.Thread(target=worker.run, name=f"transcription-worker-{i}", daemon=True).start()
+    return workers
+
+
+def run_worker_process(address, authkey=BROKER_AUTHKEY):
+    TranscriptionWorker(connect_broker(address, authkey)).run()
+
+
+def start_worker_processes(address, count, authkey=BROKER_AUTHKEY):
+    """
+    Start `count` worker processes on this host against the broker at
+    `address`. Without `authkey` they use the multiprocessing key they
+    inherit from this process, as a local broker does. Returns the
+    processes.
+    """
+    processes = [
+        multiprocessing.Process(target=run_worker_process, args=(address, authkey), daemon=True)
+        for _ in range(count)
+    ]
+    for process in processes:
+        process.start()
+    return processes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run transcription workers against a job broker.")
+    parser.add_argument("--broker", required=True, help="Broker host:port")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes to run on this host")
+    args = parser.parse_args()
+    if BROKER_AUTHKEY is None:
+        parser.error("Set JOB_BROKER_AUTHKEY to the broker's auth key")
+
+    if args.processes == 1:
+        run_worker_process(args.broker)
+        return
+    processes = start_worker_processes(args.broker, args.processes)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import threading
+import time
+import numpy as np
+from media_player.chunk_queue import SAMPLE_RATE
+
+# Counted from the first import of this module, which the app does first
+_process_started = time.perf_counter()
+
+
+class StartupReport:
+    """
+    How long each startup phase took, in the order they finished.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self._lock = threading.Lock()
+
+    def record(self, phase, seconds):
+        with self._lock:
+            self.phases[phase] = round(seconds, 3)
+
+    def mark(self, phase):
+        """
+        Record `phase` as finishing now, timed from process start.
+        """
+        self.record(phase, time.perf_counter() - _process_started)
+
+    def as_dict(self):
+        with self._lock:
+            return dict(self.phases)
+
+    def summary(self):
+        return ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in self.as_dict().items())
+
+
+class ModelWarmup:
+    """
+    Loads models on a background thread so the server answers requests
+    while they come up.
+
+    Each model in `names` is preloaded through the registry, then, if
+    `stages` is given, the ASR model decodes a second of silence so its
+    first real chunk does not pay for lazy kernel and cache setup. Models
+    in `hold` (by default all of them) are kept referenced, so the
+    registry's eviction leaves them loaded until `release`. The app is
+    ready while every model is loaded, as the registry reports it now; a
+    model that failed to load, or was evicted because it was not held,
+    keeps it unready until it is loaded again on first use.
+    """
+
+    def __init__(self, registry, names, stages=None, asr_name=None, report=None, hold=None):
+        self.registry = registry
+        self.names = list(names)
+        self.hold = set(self.names if hold is None else hold)
+        self._held = []
+        self.stages = stages
+        self.asr_name = asr_name
+        self.report = report
+        self.states = {name: "pending" for name in self.names}
+        self.errors = {}
+        self.started_at = None
+        self.finished_at = None
+        self._thread = None
+        self._done = threading.Event()
+
+    def start(self):
+        if self._thread is None:
+            self.started_at = time.perf_counter()
+            self._thread = threading.Thread(target=self._run, name="model-warmup", daemon=True)
+            self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    @property
+    def ready(self):
+        return self._done.is_set() and all(
+            state == "ready" and self.registry.is_loaded(name) for name, state in self.states.items()
+        )
+
+    def _run(self):
+        try:
+            for name in self.names:
+                self.states[name] = "loading"
+                started = time.perf_counter()
+                try:
+                    if name in self.hold:
+                        self.registry.acquire(name)
+                        self._held.append(name)
+                    else:
+                        self.registry.preload(name)
+                    if name == self.asr_name and self.stages is not None:
+                        with self.registry.borrow(name) as model:
+                            self.stages.transcribe(model, np.zeros(SAMPLE_RATE, dtype=np.float32))
+                except Exception as e:
+                    print(f"Error warming up {name}: {e}")
+                    self.states[name] = "failed"
+                    self.errors[name] = str(e)
+                    continue
+                self.states[name] = "ready"
+                if self.report is not None:
+                    self.report.record(f"warmup:{name}", time.perf_counter() - started)
+        finally:
+            self.finished_at = time.perf_counter()
+            if self.report is not None:
+                loaded = all(state == "ready" for state in self.states.values())
+                self.report.mark("ready" if loaded else "warmup_finished")
+                print(f"Startup: {self.report.summary()}")
+            self._done.set()
+
+    def release(self):
+        """
+        Drop the references taken on `hold` models.
+        """
+        while self._held:
+            self.registry.release(self._held.pop())
+
+    def status_dict(self):
+        return {
+            "ready": self.ready,
+            "models": {
+                name: {"state": state, "loaded": self.registry.is_loaded(name), "error": self.errors.get(name)}
+                for name, state in self.states.items()
+            },
+            "warmup_seconds": (
+                round((self.finished_at or time.perf_counter()) - self.started_at, 3) if self.started_at else None
+            ),
+        }
+
+
+# Shared by main and the routes module
+startup_report = StartupReport()
@@ -0,0 +1,177 @@
+import asyncio
+import itertools
+import threading
+from collections import OrderedDict, deque
+
+
+def _round(seconds):
+    return round(float(seconds), 3)
+
+
+def partial_event(chunk, segments, provisional=False):
+    """
+    Early hypothesis for a chunk: unaligned ASR segments with no speaker.
+    Times are absolute media seconds. A provisional partial covers only the
+    part of the chunk played so far, while it is still being cut.
+    """
+    return {
+        "type": "partial",
+        "provisional": provisional,
+        "chunk": chunk.index,
+        "clip_start": _round(chunk.start_time),
+        "clip_end": _round(chunk.end_time),
+        "segments": [
+            {
+                "speaker": None,
+                "text": segment["text"].strip(),
+                "start": _round(chunk.start_time + segment["start"]),
+                "end": _round(chunk.start_time + segment["end"]),
+                "words": [],
+            }
+            for segment in segments
+        ],
+    }
+
+
+def final_event(chunk, phrases):
+    """
+    Aligned, speaker-attributed phrases for a chunk. Replaces every partial
+    sent for the same chunk. `phrases` have chunk-relative times, as
+    ProcessAudioQueue returns them.
+    """
+    return {
+        "type": "final",
+        "chunk": chunk.index,
+        "clip_start": _round(chunk.start_time),
+        "clip_end": _round(chunk.end_time),
+        "segments": [
+            {
+                "speaker": phrase.get("speaker"),
+                "similarity": phrase.get("similarity"),
+                "track": phrase.get("track"),
+                "text": phrase["text"].strip(),
+                "start": _round(chunk.start_time + phrase["start"]),
+                "end": _round(chunk.start_time + phrase["end"]),
+                "words": [
+                    {
+                        "word": word["word"],
+                        "start": _round(chunk.start_time + word["start"]),
+                        "end": _round(chunk.start_time + word["end"]),
+                    }
+                    for word in phrase.get("words", [])
+                ],
+            }
+            for phrase in sorted(phrases, key=lambda phrase: phrase["start"])
+        ],
+    }
+
+
+class Subscription:
+    """
+    One client's view of a session's events, consumed with `await get()`.
+    """
+
+    def __init__(self, session_id, loop, partials=True, max_pending=256):
+        self.session_id = session_id
+        self.loop = loop
+        self.partials = partials
+        self.dropped = 0
+        self._queue = asyncio.Queue(maxsize=max_pending)
+
+    def _deliver(self, event):
+        # Runs on the event loop. A client that stopped reading loses its
+        # oldest events rather than growing without bound.
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(event)
+
+    async def get(self):
+        return await self._queue.get()
+
+
+class TranscriptBroadcaster:
+    """
+    Fans each session's transcript events out to its subscribers.
+
+    `publish` is safe to call from the inference worker threads; events
+    are handed to each subscriber's event loop. Every event gets an id
+    that increases per session, and the last `history` events are kept
+    so a reconnecting client can resume from its Last-Event-ID. History
+    is kept for the `max_sessions` most recently active sessions.
+    """
+
+    def __init__(self, history=256, max_sessions=1024):
+        self.history = history
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._histories = OrderedDict()
+        self._ids = itertools.count(1)
+        self.published = 0
+
+    def publish(self, session_id, event):
+        with self._lock:
+            event = dict(event, id=next(self._ids))
+            history = self._histories.get(session_id)
+            if history is None:
+                history = self._histories[session_id] = deque(maxlen=self.history)
+                while len(self._histories) > self.max_sessions:
+                    self._histories.popitem(last=False)
+            else:
+                self._histories.move_to_end(session_id)
+            history.append(event)
+            subscribers = list(self._subscribers.get(session_id, ()))
+            self.published += 1
+        for subscription in subscribers:
+            if event["type"] == "partial" and not subscription.partials:
+                continue
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, event)
+            except RuntimeError:
+                # The subscriber's loop is closed; it is removed on disconnect
+                pass
+        return event
+
+    def publish_partial(self, session_id, chunk, segments, provisional=False):
+        return self.publish(session_id, partial_event(chunk, segments, provisional))
+
+    def publish_final(self, session_id, chunk, phrases):
+        return self.publish(session_id, final_event(chunk, phrases))
+
+    def subscribe(self, session_id, partials=True, last_event_id=None):
+        """
+        Register a subscriber on the running event loop. With
+        `last_event_id`, events the client missed are queued first.
+        """
+        subscription = Subscription(session_id, asyncio.get_running_loop(), partials)
+        with self._lock:
+            self._subscribers.setdefault(session_id, set()).add(subscription)
+            if last_event_id is not None:
+                for event in self._histories.get(session_id, ()):
+                    if event["id"] > last_event_id and (partials or event["type"] != "partial"):
+                        subscription._deliver(event)
+        return subscription
+
+    def forget(self, session_id):
+        """
+        Drop a closed session's event history.
+        """
+        with self._lock:
+            self._histories.pop(session_id, None)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.session_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.session_id]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "published": self.published,
+                "subscribers": sum(len(subscribers) for subscribers in self._subscribers.values()),
+                "sessions_with_history": len(self._histories),
+            }
@@ -0,0 +1,207 @@
+import numpy as np
+
+SAMPLE_WIDTH = 2  # Bytes for 16-bit PCM
+
+
+def webrtc_vad(mode=3):
+    """
+    Return an is_speech(frame, sample_rate) callable backed by webrtcvad.
+    """
+    import webrtcvad
+    vad = webrtcvad.Vad()
+    vad.set_mode(mode)
+    return vad.is_speech
+
+
+class ChunkDescriptor:
+    """
+    Location of one finished chunk inside the segmenter's ring buffer.
+    """
+
+    __slots__ = ("index", "offset", "length", "start_time", "sample_rate")
+
+    def __init__(self, index, offset, length, start_time, sample_rate):
+        self.index = index
+        self.offset = offset
+        self.length = length
+        self.start_time = start_time
+        self.sample_rate = sample_rate
+
+    @property
+    def duration(self):
+        return self.length / (SAMPLE_WIDTH * self.sample_rate)
+
+    def __repr__(self):
+        return f"ChunkDescriptor(index={self.index}, offset={self.offset}, length={self.length}, start={self.start_time:.2f})"
+
+
+class VadSegmenter:
+    """
+    Cuts a stream of 16-bit mono PCM into speech chunks.
+
+    PCM arrives in blocks of any size through `feed`, is classified in
+    fixed VAD frames and written once into a preallocated ring buffer. A
+    chunk is closed after `max_silence_duration` of non-speech once it is
+    at least `min_chunk_duration` long, and is force-split at
+    `force_split_duration` so continuous speech cannot grow it unbounded.
+
+    Closed chunks are returned as ChunkDescriptors pointing into the ring;
+    `view` and `samples` read them without copying. A descriptor stays
+    valid until the ring wraps around to it, i.e. for at least
+    `ring_chunks - 1` further chunks, so consumers that keep a chunk longer
+    than that must copy it.
+    """
+
+    def __init__(self, sample_rate=16000, frame_duration_ms=20, min_chunk_duration=3, max_chunk_duration=5,
+                 max_silence_duration=0.1, force_split_duration=30, start_time=0.0, is_speech=None,
+                 vad_mode=3, ring_chunks=4):
+        self.sample_rate = sample_rate
+        self.frame_duration_ms = frame_duration_ms
+        self.frame_duration = frame_duration_ms / 1000
+        self.frame_size = int(sample_rate * frame_duration_ms / 1000) * SAMPLE_WIDTH
+        # Kept for reference: like the original player, chunks longer than
+        # this are still only cut at the next silence
+        self.max_chunk_duration = max_chunk_duration
+        self.min_chunk_frames = int(round(min_chunk_duration / self.frame_duration))
+        self.max_silence_frames = max(1, int(round(max_silence_duration / self.frame_duration)))
+        self.force_split_frames = int(round(force_split_duration / self.frame_duration))
+        self.max_chunk_bytes = self.force_split_frames * self.frame_size
+        self.is_speech = is_speech if is_speech is not None else webrtc_vad(vad_mode)
+
+        self._ring = bytearray(self.max_chunk_bytes * max(ring_chunks, 2))
+        self._ring_view = memoryview(self._ring)
+        self._partial = bytearray(self.frame_size)
+        self._partial_view = memoryview(self._partial)
+        self.reset(start_time)
+
+    def reset(self, start_time=0.0):
+        """
+        Discard any open chunk and restart timing at `start_time`.
+        """
+        self.start_time = start_time
+        self.frames_processed = 0
+        self.chunks_emitted = 0
+        self._partial_len = 0
+        self._write_pos = 0
+        self._chunk_offset = None
+        self._chunk_frames = 0
+        self._silence_frames = 0
+        self._chunk_start_time = None
+
+    def feed(self, block):
+        """
+        Consume a block of PCM bytes (or an int16 array) and return the
+        chunks it completed, oldest first.
+        """
+        data = memoryview(block).cast("B")
+        emitted = []
+        position = 0
+        size = len(data)
+        frame_size = self.frame_size
+
+        if self._partial_len:
+            needed = frame_size - self._partial_len
+            take = min(needed, size)
+            self._partial_view[self._partial_len:self._partial_len + take] = data[:take]
+            self._partial_len += take
+            position = take
+            if self._partial_len < frame_size:
+                return emitted
+            self._partial_len = 0
+            self._process_frame(self._partial_view, emitted)
+
+        while size - position >= frame_size:
+            self._process_frame(data[position:position + frame_size], emitted)
+            position += frame_size
+
+        remaining = size - position
+        if remaining:
+            self._partial_view[:remaining] = data[position:]
+            self._partial_len = remaining
+        return emitted
+
+    def flush(self):
+        """
+        Close and return the open chunk, if any. A trailing partial frame is
+        dropped, as the VAD cannot classify it.
+        """
+        self._partial_len = 0
+        if self._chunk_offset is None:
+            return None
+        return self._close_chunk()
+
+    def open_chunk(self):
+        """
+        Descriptor for the chunk still being collected, or None. It grows in
+        place, so it only describes the audio fed so far, and carries the
+        index the chunk will have once closed.
+        """
+        if self._chunk_offset is None:
+            return None
+        return ChunkDescriptor(
+            self.chunks_emitted,
+            self._chunk_offset,
+            self._chunk_frames * self.frame_size,
+            self._chunk_start_time,
+            self.sample_rate,
+        )
+
+    def view(self, descriptor):
+        """
+        Zero-copy memoryview of a chunk's PCM bytes.
+        """
+        return self._ring_view[descriptor.offset:descriptor.offset + descriptor.length]
+
+    def samples(self, descriptor):
+        """
+        Zero-copy int16 view of a chunk's samples.
+        """
+        return np.frombuffer(self._ring, dtype=np.int16, count=descriptor.length // SAMPLE_WIDTH,
+                             offset=descriptor.offset)
+
+    def _process_frame(self, frame, emitted):
+        frame_index = self.frames_processed
+        self.frames_processed += 1
+        is_speech = self.is_speech(frame, self.sample_rate)
+
+        if self._chunk_offset is None:
+            # Chunks are kept contiguous: wrap to the start of the ring when
+            # a maximum-length chunk would not fit before the end
+            if self._write_pos + self.max_chunk_bytes > len(self._ring):
+                self._write_pos = 0
+            self._chunk_offset = self._write_pos
+            self._chunk_frames = 0
+            self._silence_frames = 0
+            self._chunk_start_time = self.start_time + frame_index * self.frame_duration
+            first_frame = True
+        else:
+            first_frame = False
+
+        self._ring_view[self._write_pos:self._write_pos + self.frame_size] = frame
+        self._write_pos += self.frame_size
+        self._chunk_frames += 1
+
+        if not first_frame:
+            if is_speech:
+                self._silence_frames = 0
+            else:
+                self._silence_frames += 1
+                if self._silence_frames >= self.max_silence_frames and self._chunk_frames >= self.min_chunk_frames:
+                    emitted.append(self._close_chunk())
+                    return
+        if self._chunk_frames >= self.force_split_frames:
+            emitted.append(self._close_chunk())
+
+    def _close_chunk(self):
+        descriptor = ChunkDescriptor(
+            self.chunks_emitted,
+            self._chunk_offset,
+            self._chunk_frames * self.frame_size,
+            self._chunk_start_time,
+            self.sample_rate,
+        )
+        self.chunks_emitted += 1
+        self._chunk_offset = None
+        self._chunk_frames = 0
+        self._silence_frames = 0
+        return descriptor
@@ -0,0 +1,204 @@
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+import numpy as np
+from media_player.metrics import metrics
+from retrieval.phrase_index import HashingEmbedder
+
+CLAIM_CACHE_LOOKUPS = metrics.counter(
+    "claim_cache_lookups_total", "Fact-check cache lookups, by how they were answered", ["outcome"]
+)
+CLAIM_CACHE_EVICTIONS = metrics.counter("claim_cache_evictions_total", "Cached verdicts dropped", ["reason"])
+
+# Spoken hesitations that carry nothing a verdict depends on
+_FILLERS = {"uh", "um", "er", "ah", "erm", "hmm", "mm", "uhm"}
+# Openers that start a sentence without being part of the claim
+_OPENERS = (
+    ("let", "me", "tell", "you"), ("as", "i", "said"), ("you", "know"), ("i", "mean"),
+    ("and",), ("so",), ("well",), ("look",), ("listen",), ("folks",), ("now",), ("okay",), ("ok",),
+)
+# Words a near duplicate may add or drop; every other word is part of the
+# claim and must be there in both, in the same order
+_IGNORABLE = {"the", "a", "an", "really", "just", "very", "actually", "ever", "by", "that", "of"}
+_SUFFIXES = ("ing", "es", "ed", "s", "d")
+
+
+def normalize_claim(text):
+    """
+    Canonical form of a spoken claim: case-folded, punctuation, filler
+    words and leading openers ("and", "look", "let me tell you") removed,
+    contractions' "n't" spelled "not", whitespace collapsed.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold().replace("’", "'")
+    text = re.sub(r"n't\b", " not", text)
+    words = [word.strip(".") for word in re.findall(r"[\w%$.]+", text)]
+    words = [word for word in words if word and word not in _FILLERS]
+    stripped = True
+    while stripped:
+        stripped = False
+        for opener in _OPENERS:
+            if tuple(words[:len(opener)]) == opener and len(words) > len(opener):
+                words = words[len(opener):]
+                stripped = True
+    return " ".join(words)
+
+
+def _content(normalized):
+    """
+    The words of a normalized claim a verdict depends on: numbers as
+    written, everything else reduced to a crude stem so "price" and
+    "prices" agree while "rose" and "fell" do not.
+    """
+    content = []
+    for word in normalized.split():
+        if word in _IGNORABLE:
+            continue
+        if not any(char.isdigit() for char in word):
+            for suffix in _SUFFIXES:
+                if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+                    word = word[:-len(suffix)]
+                    break
+        else:
+            word = word.replace(",", "").lstrip("$")
+        content.append(word)
+    return tuple(content)
+
+
+class _Entry:
+    __slots__ = ("slot", "normalized", "content", "value", "expires_at")
+
+    def __init__(self, slot, normalized, value, expires_at):
+        self.slot = slot
+        self.normalized = normalized
+        self.content = _content(normalized)
+        self.value = value
+        self.expires_at = expires_at
+
+
+class ClaimCache:
+    """
+    Verdicts for claims already checked, looked up by what was said rather
+    than the exact words.
+
+    A lookup normalizes the text and first tries the hash of the normalized
+    form. If that misses, it scores the text's embedding against every
+    cached claim and takes the best one at or above `threshold` cosine
+    similarity whose content words match: the two may differ only in
+    articles, intensifiers and word endings, never in a number, a negation
+    or any other word. Word-hashing similarity alone cannot tell "fell to
+    3.5 percent" from "rose to 8.5 percent". Entries expire
+    `ttl` seconds after they were stored; past `max_entries` the least
+    recently used are dropped.
+    """
+
+    def __init__(self, embed=None, max_entries=10000, ttl=7 * 24 * 3600, threshold=0.85):
+        self.embed = embed or HashingEmbedder()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self._entries = OrderedDict()
+        self._vectors = np.zeros((max_entries, self.embed.dim), dtype=np.float32)
+        self._slot_keys = [None] * max_entries
+        self._free = list(range(max_entries - 1, -1, -1))
+        self._lock = threading.Lock()
+        self.lookups = {"exact": 0, "near": 0, "miss": 0}
+
+    def _key(self, normalized):
+        return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+    def lookup(self, text):
+        """
+        (outcome, value) for `text`: outcome is "exact", "near" or "miss",
+        and value is the stored verdict, or None on a miss.
+        """
+        normalized = normalize_claim(text)
+        key = self._key(normalized)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                self._remove(key, "ttl")
+                entry = None
+            if entry is not None:
+                return self._hit(key, entry, "exact")
+            if not self._entries:
+                return self._miss()
+        vector = self.embed([normalized])[0]
+        with self._lock:
+            scores = self._vectors @ vector
+            content = _content(normalized)
+            for slot in np.argsort(-scores)[:8]:
+                if scores[slot] < self.threshold:
+                    break
+                key = self._slot_keys[slot]
+                entry = self._entries.get(key) if key is not None else None
+                if entry is None:
+                    continue
+                if entry.expires_at <= now:
+                    self._remove(key, "ttl")
+                    continue
+                if entry.content == content:
+                    return self._hit(key, entry, "near")
+            return self._miss()
+
+    def _hit(self, key, entry, outcome):
+        self._entries.move_to_end(key)
+        self.lookups[outcome] += 1
+        CLAIM_CACHE_LOOKUPS.inc(outcome=outcome)
+        return outcome, entry.value
+
+    def _miss(self):
+        self.lookups["miss"] += 1
+        CLAIM_CACHE_LOOKUPS.inc(outcome="miss")
+        return "miss", None
+
+    def put(self, text, value):
+        """
+        Store the verdict for `text`, replacing any for the same normalized
+        claim.
+        """
+        normalized = normalize_claim(text)
+        key = self._key(normalized)
+        vector = self.embed([normalized])[0]
+        with self._lock:
+            if key in self._entries:
+                self._remove(key, "replaced")
+            if not self._free:
+                self._remove(next(iter(self._entries)), "lru")
+            slot = self._free.pop()
+            self._vectors[slot] = vector
+            self._slot_keys[slot] = key
+            self._entries[key] = _Entry(slot, normalized, value, time.monotonic() + self.ttl)
+
+    def _remove(self, key, reason):
+        entry = self._entries.pop(key)
+        self._vectors[entry.slot] = 0.0
+        self._slot_keys[entry.slot] = None
+        self._free.append(entry.slot)
+        if reason != "replaced":
+            CLAIM_CACHE_EVICTIONS.inc(reason=reason)
+
+    def purge_expired(self):
+        now = time.monotonic()
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry.expires_at <= now]:
+                self._remove(key, "ttl")
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            total = sum(self.lookups.values())
+            hits = self.lookups["exact"] + self.lookups["near"]
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "threshold": self.threshold,
+                "lookups": dict(self.lookups),
+                "hit_rate": round(hits / total, 4) if total else None,
+            }
@@ -0,0 +1,148 @@
+import importlib
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from media_player.metrics import metrics
+from retrieval.claim_cache import normalize_claim
+
+logger = logging.getLogger(__name__)
+
+VERIFIER_CALLS = metrics.counter("fact_check_verifier_calls_total", "Claims sent to the verifier", ["outcome"])
+
+
+def load_verifier(spec):
+    """
+    The verifier named by "package.module:function". It is called with a
+    claim's text and returns a dict with at least "verdict" and "evidence".
+    """
+    module_name, _, attribute = spec.partition(":")
+    if not attribute:
+        raise ValueError(f"Verifier must be given as module:function, got {spec}")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def fact_check_event(chunk, results):
+    """
+    Verdicts for a chunk's claims, with absolute media times, for the
+    transcript stream.
+    """
+    return {
+        "type": "fact_check",
+        "chunk": chunk.index,
+        "claims": [
+            {
+                "speaker": result["speaker"],
+                "text": result["claim"],
+                "start": round(float(chunk.start_time + result["start"]), 3),
+                "end": round(float(chunk.start_time + result["end"]), 3),
+                "verdict": result["verdict"],
+                "evidence": result["evidence"],
+                "cached": result["cached"],
+            }
+            for result in results
+        ],
+    }
+
+
+class FactChecker:
+    """
+    Fact-check stage for final phrases.
+
+    Each phrase of at least `min_words` words is a claim. A claim is looked
+    up in `cache` (a ClaimCache) first, so a line repeated across speeches
+    reuses its stored verdict and evidence; only misses reach `verify`, and
+    concurrent checks of the same claim share one call. Phrases are checked
+    on a small thread pool so the verifier's latency never holds up
+    transcription.
+    """
+
+    def __init__(self, verify, cache=None, min_words=5, workers=2):
+        self.verify = verify
+        self.cache = cache
+        self.min_words = min_words
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fact-check")
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.verifier_calls = 0
+        self.verifier_errors = 0
+
+    def check(self, claim):
+        """
+        The verdict for one claim: the verifier's dict plus "cached", which
+        is "exact", "near" or "miss".
+        """
+        if self.cache is not None:
+            outcome, value = self.cache.lookup(claim)
+            if value is not None:
+                return dict(value, cached=outcome)
+        key = normalize_claim(claim)
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+        if not owner:
+            return dict(future.result(), cached="in_flight")
+        try:
+            self.verifier_calls += 1
+            value = self.verify(claim)
+            VERIFIER_CALLS.inc(outcome="ok")
+        except Exception as e:
+            self.verifier_errors += 1
+            VERIFIER_CALLS.inc(outcome="error")
+            future.set_exception(e)
+            raise
+        else:
+            if self.cache is not None:
+                self.cache.put(claim, value)
+            future.set_result(value)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+        return dict(value, cached="miss")
+
+    def check_phrases(self, phrases):
+        results = []
+        for phrase in phrases:
+            claim = phrase["text"].strip()
+            if len(claim.split()) < self.min_words:
+                continue
+            try:
+                verdict = self.check(claim)
+            except Exception as e:
+                # Counted in verifier_errors; one line per claim would flood the output
+                logger.debug("Error fact-checking %r: %s", claim, e)
+                continue
+            results.append({
+                "claim": claim,
+                "speaker": phrase.get("speaker"),
+                "start": phrase["start"],
+                "end": phrase["end"],
+                "verdict": verdict.get("verdict"),
+                "evidence": verdict.get("evidence", []),
+                "cached": verdict["cached"],
+            })
+        return results
+
+    def submit(self, chunk, phrases, on_result):
+        """
+        Check `phrases` in the background and pass the chunk's results to
+        `on_result(chunk, results)` if any phrase was a claim.
+        """
+        def run():
+            results = self.check_phrases(phrases)
+            if results:
+                on_result(chunk, results)
+
+        return self._pool.submit(run)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+    def stats(self):
+        return {
+            "verifier_calls": self.verifier_calls,
+            "verifier_errors": self.verifier_errors,
+            "in_flight": len(self._in_flight),
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
@@ -0,0 +1,148 @@
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+import numpy as np
+from retrieval.vector_index import VectorIndex
+
+BASE_DIR = os.path.dirname(__file__)
+PHRASE_INDEX_DIR = os.path.join(BASE_DIR, 'index_data')
+
+EMBEDDING_DIM = 512
+
+
+def _span_key(video, start, end):
+    # Centiseconds of the float32 values the index stores, so keys read
+    # back from disk match keys of new phrases
+    return video, int(round(float(np.float32(start)) * 100)), int(round(float(np.float32(end)) * 100))
+
+
+class HashingEmbedder:
+    """
+    Text embedding by feature hashing: every word and every character
+    trigram of the normalized text lands in one of `dim` buckets, picked
+    and signed by a CRC32 of the feature, and the counts are normalized.
+
+    It needs no model and is stable across processes and restarts, so
+    vectors written by one run stay comparable with queries from the next.
+    Paraphrases only match where they share words or word fragments; swap
+    in a sentence-embedding model for real semantic recall.
+    """
+
+    def __init__(self, dim=EMBEDDING_DIM):
+        self.dim = dim
+
+    def _features(self, text):
+        words = re.findall(r"[\w']+", text.lower())
+        for word in words:
+            yield "w:" + word
+            padded = f" {word} "
+            for offset in range(len(padded) - 2):
+                yield "c:" + padded[offset:offset + 3]
+        for first, second in zip(words, words[1:]):
+            yield f"b:{first} {second}"
+
+    def __call__(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = zlib.crc32(feature.encode("utf-8"))
+                vectors[row, digest % self.dim] += 1.0 if digest & 0x80000000 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class PhraseIndex:
+    """
+    Searchable index of every transcribed phrase.
+
+    Each final phrase from the pipeline is embedded and appended to a
+    VectorIndex with its speaker, video and absolute start and end time in
+    that video. Phrases shorter than `min_words` carry too little to match
+    on and are left out. A phrase already indexed for the same video and
+    times (a replay served from the transcript cache, a repeated ingest) is
+    skipped. The indexed spans of the `max_videos` most recently indexed
+    videos are kept in memory for that check; an older video's are read
+    back from the index when it comes up again.
+    """
+
+    def __init__(self, index=None, embed=None, min_words=3, max_videos=64):
+        self.embed = embed or HashingEmbedder()
+        self.index = index if index is not None else VectorIndex(PHRASE_INDEX_DIR, dim=self.embed.dim)
+        self.min_words = min_words
+        self.max_videos = max_videos
+        self._lock = threading.Lock()
+        # {video: {span key}} of indexed phrases, least recently used first
+        self._spans = OrderedDict()
+        # Spans of adds still in progress, so concurrent replays skip them too
+        self._pending = set()
+        self.duplicates = 0
+
+    def _video_spans(self, video):
+        spans = self._spans.get(video)
+        if spans is None:
+            spans = self._spans[video] = {_span_key(*span) for span in self.index.spans(video)}
+            while len(self._spans) > self.max_videos:
+                self._spans.popitem(last=False)
+        else:
+            self._spans.move_to_end(video)
+        return spans
+
+    def add_phrases(self, video, chunk, phrases):
+        """
+        Index one chunk's phrases. Phrase times are relative to the chunk
+        and are stored relative to the start of `video`.
+        """
+        offset = chunk.start_time or 0.0
+        with self._lock:
+            indexed = self._video_spans(video)
+            fresh = []
+            keys = []
+            for phrase in phrases:
+                if len(phrase["text"].split()) < self.min_words:
+                    continue
+                key = _span_key(video, offset + phrase["start"], offset + phrase["end"])
+                if key in indexed or key in self._pending:
+                    self.duplicates += 1
+                    continue
+                self._pending.add(key)
+                fresh.append(phrase)
+                keys.append(key)
+        phrases = fresh
+        if not phrases:
+            return []
+        try:
+            ids = self.index.add(
+                self.embed([phrase["text"] for phrase in phrases]),
+                speakers=[phrase.get("speaker") for phrase in phrases],
+                videos=[video] * len(phrases),
+                starts=[offset + phrase["start"] for phrase in phrases],
+                ends=[offset + phrase["end"] for phrase in phrases],
+                payloads=[{"text": phrase["text"].strip()} for phrase in phrases],
+            )
+        except Exception:
+            # Not indexed, so a later replay may try again
+            with self._lock:
+                self._pending.difference_update(keys)
+            raise
+        with self._lock:
+            self._pending.difference_update(keys)
+            self._video_spans(video).update(keys)
+        return ids
+
+    def search(self, texts, k=10, speaker=None, video=None, start=None, end=None):
+        """
+        The `k` indexed phrases closest to each of `texts`, optionally
+        limited to a speaker, a video and a time window in it.
+        """
+        return self.index.search(self.embed(texts), k=k, speaker=speaker, video=video, start=start, end=end)
+
+    def stats(self):
+        return dict(self.index.stats(), duplicates_skipped=self.duplicates)
+
+
+def open_phrase_index(directory=PHRASE_INDEX_DIR, mode=None, **kwargs):
+    embed = HashingEmbedder()
+    return PhraseIndex(VectorIndex(directory, dim=embed.dim, mode=mode, **kwargs), embed=embed)
@@ -0,0 +1,494 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+from media_player.clustering import spherical_kmeans
+
+EXACT = "exact"
+IVF = "ivf"
+
+INDEX_VERSION = 1
+INITIAL_CAPACITY = 1024
+# Rows scored per matrix multiply in exact search, bounding scratch memory
+SEARCH_BLOCK_ROWS = 65536
+
+# Per-row columns stored next to the vectors; filters run over these
+_COLUMNS = {
+    "alive": np.uint8,
+    "speaker": np.int32,
+    "video": np.int32,
+    "start": np.float32,
+    "end": np.float32,
+    "cluster": np.int32,
+}
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _merge_top_k(best_scores, best_ids, scores, ids, k):
+    """
+    Fold a (q, n) block of scores for `ids` into the running (q, k) best.
+    """
+    scores = np.concatenate([best_scores, scores], axis=1)
+    ids = np.concatenate([best_ids, np.broadcast_to(ids, (len(scores), len(ids)))], axis=1)
+    if scores.shape[1] > k:
+        keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        scores = np.take_along_axis(scores, keep, axis=1)
+        ids = np.take_along_axis(ids, keep, axis=1)
+    return scores, ids
+
+
+class VectorIndex:
+    """
+    Cosine-similarity vector store kept in memory-mapped files under
+    `directory`, with speaker, video and time metadata per vector.
+
+    Vectors are L2-normalized on insert and appended to one growing
+    float32 matrix, and a vector's id is its row. Deletes only mark the row
+    dead. Each search applies the speaker, video and time-window filters as
+    a mask over the metadata columns, then scores the rows that pass.
+
+    In EXACT mode every row that passes is scored, block by block. In IVF
+    mode, once `train_size` vectors are in, `nlist` spherical k-means
+    centroids are trained on a background thread while adds and searches
+    go on. After that, every vector is filed under its nearest centroid
+    and a query scores only the lists of its `nprobe` nearest centroids.
+    Until the index is trained, IVF searches exactly. `background_train`
+    False leaves training to an explicit train() call instead.
+
+    Reopening an index keeps its stored mode and nlist unless `mode` or
+    `nlist` is given. A different value converts the index: switching to
+    EXACT drops the centroids, and switching to IVF or changing nlist
+    retrains as a new IVF index would.
+
+    JSON payloads (e.g. the phrase text) live in a SQLite table next to the
+    matrix and are returned with the hits.
+    """
+
+    def __init__(self, directory, dim=None, mode=None, nlist=None, nprobe=16, train_size=None,
+                 flush_interval=5.0, background_train=True):
+        if mode not in (None, EXACT, IVF):
+            raise ValueError(f"Unknown index mode: {mode}")
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.background_train = background_train
+        self._training = None
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._meta_path = os.path.join(directory, "index.json")
+        self._db = sqlite3.connect(os.path.join(directory, "payloads.sqlite3"), check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS payloads (id INTEGER PRIMARY KEY, data TEXT NOT NULL)")
+        self._db.commit()
+
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                meta = json.load(f)
+            if meta["version"] != INDEX_VERSION:
+                raise ValueError(f"Unsupported vector index version {meta['version']}: {directory}")
+            if dim is not None and dim != meta["dim"]:
+                raise ValueError(f"Index in {directory} has dim {meta['dim']}, not {dim}")
+        else:
+            if dim is None:
+                raise ValueError("A new vector index needs a dim")
+            meta = {
+                "version": INDEX_VERSION,
+                "dim": dim,
+                "mode": mode or EXACT,
+                "nlist": nlist or 1024,
+                "nprobe": nprobe,
+                "train_size": train_size or (nlist or 1024) * 40,
+                "count": 0,
+                "capacity": INITIAL_CAPACITY,
+                "speakers": [],
+                "videos": [],
+                "trained": False,
+            }
+        self.dim = meta["dim"]
+        self.mode = meta["mode"]
+        self.nlist = meta["nlist"]
+        # nprobe is a search-time knob, so the caller's value wins on reopen
+        self.nprobe = nprobe
+        self.train_size = meta["train_size"]
+        self.count = meta["count"]
+        self.capacity = meta["capacity"]
+        self.speakers = meta["speakers"]
+        self.videos = meta["videos"]
+        self._speaker_codes = {name: code for code, name in enumerate(self.speakers)}
+        self._video_codes = {name: code for code, name in enumerate(self.videos)}
+        self.trained = meta["trained"]
+        self._open_arrays()
+        self.centroids = None
+        self._lists = None
+        if self.trained:
+            self.centroids = np.load(os.path.join(directory, "centroids.npy"))
+            self._build_lists()
+        self._last_flush = time.monotonic()
+        if (mode is not None and mode != self.mode) or (nlist is not None and nlist != self.nlist):
+            self._convert(mode or self.mode, nlist or self.nlist, train_size)
+        self._write_meta()
+        self._maybe_train()
+
+    def _convert(self, mode, nlist, train_size):
+        print(f"Vector index in {self.directory}: converting from {self.mode} (nlist {self.nlist}) "
+              f"to {mode} (nlist {nlist})")
+        self.mode = mode
+        self.nlist = nlist
+        self.train_size = train_size or nlist * 40
+        self.trained = False
+        self.centroids = None
+        self._lists = None
+        centroids_path = os.path.join(self.directory, "centroids.npy")
+        if os.path.exists(centroids_path):
+            os.remove(centroids_path)
+
+    def __len__(self):
+        return int(self.count - (self._columns["alive"][:self.count] == 0).sum())
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}.bin")
+
+    def _map(self, name, dtype, shape):
+        path = self._path(name)
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        with open(path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+    def _open_arrays(self):
+        self._vectors = self._map("vectors", np.float32, (self.capacity, self.dim))
+        self._columns = {name: self._map(name, dtype, (self.capacity,)) for name, dtype in _COLUMNS.items()}
+
+    def _grow(self, needed):
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        self._vectors.flush()
+        for column in self._columns.values():
+            column.flush()
+        self.capacity = capacity
+        self._open_arrays()
+
+    def _code(self, codes, names, name):
+        code = codes.get(name)
+        if code is None:
+            code = codes[name] = len(names)
+            names.append(name)
+        return code
+
+    def add(self, vectors, speakers=None, videos=None, starts=None, ends=None, payloads=None):
+        """
+        Insert a batch of vectors with optional per-vector metadata and JSON
+        payloads. Returns their ids.
+        """
+        vectors = _normalize_rows(np.atleast_2d(np.asarray(vectors, dtype=np.float32)))
+        n = len(vectors)
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-dim vectors, got {vectors.shape[1]}")
+        with self._lock:
+            first = self.count
+            if first + n > self.capacity:
+                self._grow(first + n)
+            rows = slice(first, first + n)
+            self._vectors[rows] = vectors
+            columns = self._columns
+            columns["alive"][rows] = 1
+            columns["speaker"][rows] = [
+                self._code(self._speaker_codes, self.speakers, speaker) if speaker is not None else -1
+                for speaker in (speakers if speakers is not None else [None] * n)
+            ]
+            columns["video"][rows] = [
+                self._code(self._video_codes, self.videos, video) if video is not None else -1
+                for video in (videos if videos is not None else [None] * n)
+            ]
+            columns["start"][rows] = starts if starts is not None else np.nan
+            columns["end"][rows] = ends if ends is not None else np.nan
+            columns["cluster"][rows] = -1
+            if self.trained:
+                self._file(np.arange(first, first + n), vectors)
+            if payloads is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO payloads (id, data) VALUES (?, ?)",
+                    [(first + offset, json.dumps(payload)) for offset, payload in enumerate(payloads)],
+                )
+                self._db.commit()
+            self.count = first + n
+            self._maybe_train()
+            self._maybe_flush()
+        return list(range(first, first + n))
+
+    def _maybe_train(self):
+        with self._lock:
+            if (self.mode != IVF or self.trained or not self.background_train or self._training is not None
+                    or self.count < self.train_size):
+                return
+            self._training = threading.Thread(target=self._train_in_background, name="vector-index-train",
+                                              daemon=True)
+            self._training.start()
+
+    def _train_in_background(self):
+        try:
+            self.train()
+        except Exception as e:
+            print(f"Error training vector index in {self.directory}: {e}")
+        finally:
+            with self._lock:
+                self._training = None
+
+    def wait_trained(self, timeout=None):
+        """
+        Wait for a background training run, if one is going. Returns
+        whether the index is trained.
+        """
+        training = self._training
+        if training is not None:
+            training.join(timeout)
+        return self.trained
+
+    def spans(self, video=None):
+        """
+        (video, start, end) of every live vector, as stored; only those of
+        `video` if given.
+        """
+        with self._lock:
+            if video is not None and video not in self._video_codes:
+                return
+            columns = {name: np.asarray(column[:self.count]) for name, column in self._columns.items()}
+        live = columns["alive"] != 0
+        if video is not None:
+            live &= columns["video"] == self._video_codes[video]
+        live = np.flatnonzero(live)
+        for row in live:
+            video = int(columns["video"][row])
+            yield (self.videos[video] if video >= 0 else None,
+                   float(columns["start"][row]), float(columns["end"][row]))
+
+    def delete(self, ids):
+        """
+        Tombstone vectors by id; they are skipped by every later search.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        with self._lock:
+            ids = ids[(ids >= 0) & (ids < self.count)]
+            self._columns["alive"][ids] = 0
+            self._db.executemany("DELETE FROM payloads WHERE id = ?", [(int(i),) for i in ids])
+            self._db.commit()
+            self._maybe_flush()
+
+    def train(self, sample_size=None):
+        """
+        Fit the IVF centroids on a sample of the live vectors and file every
+        vector under its nearest one. The clustering runs without holding
+        the index lock, so adds and (exact) searches carry on meanwhile;
+        vectors added during training are filed when it is swapped in.
+        """
+        with self._lock:
+            count = self.count
+            vectors = self._vectors
+            live = np.flatnonzero(self._columns["alive"][:count])
+            if len(live) < self.nlist:
+                raise ValueError(f"Need at least {self.nlist} vectors to train, have {len(live)}")
+        sample_size = sample_size or self.nlist * 64
+        rng = np.random.default_rng(0)
+        sample = np.sort(rng.choice(live, size=min(sample_size, len(live)), replace=False))
+        # Written rows never change, so the snapshot's map can be read
+        # unlocked even if the index grows and remaps meanwhile
+        centroids = spherical_kmeans(vectors[sample], self.nlist).astype(np.float32)
+        clusters = np.empty(count, dtype=np.int32)
+        for start in range(0, count, SEARCH_BLOCK_ROWS):
+            stop = min(start + SEARCH_BLOCK_ROWS, count)
+            clusters[start:stop] = (vectors[start:stop] @ centroids.T).argmax(axis=1)
+
+        with self._lock:
+            np.save(os.path.join(self.directory, "centroids.npy"), centroids)
+            self.centroids = centroids
+            self._columns["cluster"][:count] = clusters
+            if self.count > count:
+                self._columns["cluster"][count:self.count] = (
+                    self._vectors[count:self.count] @ centroids.T
+                ).argmax(axis=1)
+            self.trained = True
+            self._build_lists()
+            self.flush()
+
+    def _build_lists(self):
+        clusters = np.asarray(self._columns["cluster"][:self.count])
+        order = np.argsort(clusters, kind="stable")
+        bounds = np.searchsorted(clusters[order], np.arange(len(self.centroids) + 1))
+        self._lists = [
+            [order[bounds[cluster]:bounds[cluster + 1]].astype(np.int64)] for cluster in range(len(self.centroids))
+        ]
+
+    def _file(self, rows, vectors):
+        clusters = (vectors @ self.centroids.T).argmax(axis=1)
+        self._columns["cluster"][rows] = clusters
+        for cluster in np.unique(clusters):
+            self._lists[cluster].append(rows[clusters == cluster])
+
+    def _list_rows(self, cluster):
+        blocks = self._lists[cluster]
+        if len(blocks) > 1:
+            # Inserts append small blocks; merge them on first read
+            blocks[:] = [np.concatenate(blocks)]
+        return blocks[0]
+
+    def _filter_mask(self, rows, speaker=None, video=None, start=None, end=None):
+        """
+        Which of `rows` (a slice or an index array) are alive and pass the
+        filters. The time filter keeps vectors overlapping [start, end].
+        """
+        columns = self._columns
+        mask = columns["alive"][rows] == 1
+        if speaker is not None:
+            codes = [self._speaker_codes[name] for name in np.atleast_1d(speaker) if name in self._speaker_codes]
+            mask &= np.isin(columns["speaker"][rows], codes)
+        if video is not None:
+            codes = [self._video_codes[name] for name in np.atleast_1d(video) if name in self._video_codes]
+            mask &= np.isin(columns["video"][rows], codes)
+        if start is not None:
+            mask &= columns["end"][rows] >= start
+        if end is not None:
+            mask &= columns["start"][rows] <= end
+        return mask
+
+    def search(self, queries, k=10, speaker=None, video=None, start=None, end=None, with_payloads=True):
+        """
+        Top-`k` neighbours of each query among the vectors passing the
+        filters. `speaker` and `video` take a name or a list of names.
+        Returns one list per query of {"id", "score", "speaker", "video",
+        "start", "end", "payload"} dicts, best first.
+        """
+        queries = _normalize_rows(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        filters = {"speaker": speaker, "video": video, "start": start, "end": end}
+        with self._lock:
+            if self.trained:
+                scores, ids = self._search_ivf(queries, k, filters)
+            else:
+                scores, ids = self._search_exact(queries, k, filters)
+            return [self._hits(query_scores, query_ids, with_payloads) for query_scores, query_ids in zip(scores, ids)]
+
+    def _search_exact(self, queries, k, filters):
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_ids = np.zeros((len(queries), 0), dtype=np.int64)
+        for first in range(0, self.count, SEARCH_BLOCK_ROWS):
+            block = slice(first, min(first + SEARCH_BLOCK_ROWS, self.count))
+            mask = self._filter_mask(block, **filters)
+            if mask.all():
+                rows = np.arange(block.start, block.stop)
+                scores = queries @ self._vectors[block].T
+            else:
+                rows = block.start + np.flatnonzero(mask)
+                if not len(rows):
+                    continue
+                scores = queries @ self._vectors[rows].T
+            best_scores, best_ids = _merge_top_k(best_scores, best_ids, scores, rows, k)
+        return best_scores, best_ids
+
+    def _search_ivf(self, queries, k, filters):
+        nprobe = min(self.nprobe, len(self.centroids))
+        probes = np.argpartition(-(queries @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+        results = []
+        for query, clusters in zip(queries, probes):
+            rows = np.concatenate([self._list_rows(cluster) for cluster in clusters])
+            rows = rows[self._filter_mask(rows, **filters)]
+            scores = (self._vectors[rows] @ query)[None]
+            empty = (np.full((1, 0), -np.inf, dtype=np.float32), np.zeros((1, 0), dtype=np.int64))
+            results.append(_merge_top_k(*empty, scores, rows, k))
+        width = max((scores.shape[1] for scores, _ in results), default=0)
+        all_scores = np.full((len(queries), width), -np.inf, dtype=np.float32)
+        all_ids = np.full((len(queries), width), -1, dtype=np.int64)
+        for row, (scores, ids) in enumerate(results):
+            all_scores[row, :scores.shape[1]] = scores[0]
+            all_ids[row, :ids.shape[1]] = ids[0]
+        return all_scores, all_ids
+
+    def _hits(self, scores, ids, with_payloads):
+        order = np.argsort(-scores, kind="stable")
+        hits = []
+        for position in order:
+            row = int(ids[position])
+            if row < 0 or not np.isfinite(scores[position]):
+                continue
+            speaker = int(self._columns["speaker"][row])
+            video = int(self._columns["video"][row])
+            start = float(self._columns["start"][row])
+            end = float(self._columns["end"][row])
+            hits.append({
+                "id": row,
+                "score": round(float(scores[position]), 4),
+                "speaker": self.speakers[speaker] if speaker >= 0 else None,
+                "video": self.videos[video] if video >= 0 else None,
+                # Unset times are NaN on disk, which JSON cannot carry
+                "start": start if start == start else None,
+                "end": end if end == end else None,
+            })
+        if with_payloads and hits:
+            placeholders = ",".join("?" * len(hits))
+            payloads = dict(self._db.execute(
+                f"SELECT id, data FROM payloads WHERE id IN ({placeholders})", [hit["id"] for hit in hits]
+            ).fetchall())
+            for hit in hits:
+                data = payloads.get(hit["id"])
+                hit["payload"] = json.loads(data) if data is not None else None
+        return hits
+
+    def _maybe_flush(self):
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the mapped arrays and the index metadata to disk.
+        """
+        with self._lock:
+            self._vectors.flush()
+            for column in self._columns.values():
+                column.flush()
+            self._write_meta()
+            self._last_flush = time.monotonic()
+
+    def _write_meta(self):
+        meta = {
+            "version": INDEX_VERSION,
+            "dim": self.dim,
+            "mode": self.mode,
+            "nlist": self.nlist,
+            "nprobe": self.nprobe,
+            "train_size": self.train_size,
+            "count": self.count,
+            "capacity": self.capacity,
+            "speakers": self.speakers,
+            "videos": self.videos,
+            "trained": self.trained,
+        }
+        temp_path = f"{self._meta_path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(temp_path, self._meta_path)
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._db.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "dim": self.dim,
+                "vectors": self.count,
+                "live": len(self),
+                "capacity": self.capacity,
+                "trained": self.trained,
+                "training": self._training is not None,
+                "nlist": self.nlist if self.mode == IVF else None,
+                "nprobe": self.nprobe if self.mode == IVF else None,
+                "speakers": len(self.speakers),
+                "videos": len(self.videos),
+            }
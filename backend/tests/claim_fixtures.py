@@ -0,0 +1,92 @@
+"""
+Claims for the claim cache tests and benchmark: a synthetic stump-speech
+corpus, recorded near misses and a stub verifier.
+"""
+import itertools
+import random
+import time
+from retrieval.claim_cache import normalize_claim
+
+SUBJECTS = [
+    "unemployment", "inflation", "crime", "the deficit", "gas prices", "wages", "border crossings",
+    "manufacturing jobs", "health insurance premiums", "rent", "violent crime", "the trade deficit",
+    "school funding", "drug overdoses", "farm income", "energy production",
+]
+CHANGES = [
+    "went up", "went down", "doubled", "fell by half", "hit a record high", "dropped to a record low",
+    "rose 3.5 percent", "rose 8.5 percent", "fell 3.5 percent",
+]
+PERIODS = ["since I took office", "in the last four years", "under my opponent", "since 2019", "since 2009", "last year"]
+OPENERS = ["", "", "And ", "Folks, ", "Let me tell you, ", "As I said, ", "Look, "]
+FILLERS = ["uh", "um"]
+DROPPABLE = {"the", "really", "just", "by"}
+VERDICTS = ["true", "false", "misleading", "unverifiable"]
+# Recorded pairs that score as near duplicates on word hashing but state
+# different facts; a cache must never answer the second with the first
+NEAR_MISS_PAIRS = [
+    ("The unemployment rate fell to 3.5 percent under my administration.",
+     "The unemployment rate fell to 8.5 percent under my administration."),
+    ("Gas prices rose to four dollars a gallon last summer.",
+     "Gas prices fell to four dollars a gallon last summer."),
+    ("We passed the biggest tax cut in history in 2019.",
+     "We passed the biggest tax cut in history in 2009."),
+    ("Violent crime went up in every major city last year.",
+     "Violent crime went down in every major city last year."),
+    ("We created two million manufacturing jobs.",
+     "We created three million manufacturing jobs."),
+    ("My opponent voted for the border bill.",
+     "My opponent never voted for the border bill."),
+]
+
+
+def synthetic_corpus(speeches, claims_per_speech, pool_size, seed=0):
+    """
+    [(phrase, claim id)] over `speeches` speeches drawing from a pool of
+    `pool_size` claims, the popular lines far more often than the rest.
+    """
+    rng = random.Random(seed)
+    pool = []
+    for subject, change, period in rng.sample(list(itertools.product(SUBJECTS, CHANGES, PERIODS)), pool_size):
+        pool.append(f"{subject} {change} {period}")
+        pool.append(f"{subject} never {change} {period}")
+    weights = [1.0 / (rank + 1) for rank in range(len(pool))]
+    corpus = []
+    for _ in range(speeches):
+        for claim_id in rng.choices(range(len(pool)), weights=weights, k=claims_per_speech):
+            corpus.append((_say(pool[claim_id], rng), claim_id))
+    return corpus
+
+
+def _say(claim, rng):
+    words = []
+    for word in claim.split():
+        if word in DROPPABLE and rng.random() < 0.3:
+            continue
+        if rng.random() < 0.08:
+            words.append(rng.choice(FILLERS) + ",")
+        words.append(word)
+    text = rng.choice(OPENERS) + " ".join(words)
+    text = text.replace("never", "never ever") if rng.random() < 0.2 else text
+    return text[0].upper() + text[1:] + rng.choice([".", "!", "...", ""])
+
+
+class StubVerifier:
+    """
+    Stands in for the retrieval and LLM verification a real deployment
+    plugs in: sleeps `seconds` and answers with a verdict derived from the
+    claim, naming the claim it was asked about.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.calls = 0
+
+    def __call__(self, claim):
+        self.calls += 1
+        time.sleep(self.seconds)
+        normalized = normalize_claim(claim)
+        return {
+            "verdict": VERDICTS[sum(map(ord, normalized)) % len(VERDICTS)],
+            "evidence": [{"source": "stub", "quote": normalized}],
+            "checked": claim,
+        }
@@ -0,0 +1,89 @@
+import threading
+import numpy as np
+import pytest
+import media_player.speech_to_text.batch_transcriber as batch_transcriber
+from media_player.chunk_queue import SAMPLE_RATE
+from media_player.speech_to_text.batch_transcriber import BatchTranscriber
+from media_player.speech_to_text.model_registry import ModelRegistry, WHISPERX_ASR
+
+
+class StubPipeline:
+    """
+    Looks like a whisperx pipeline loaded with a language: decodes batches
+    of segments, naming each by its loudness so the test can trace it.
+    """
+
+    tokenizer = object()
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, inputs, batch_size, num_workers):
+        inputs = list(inputs)
+        self.batches.append(len(inputs))
+        return [{"text": f"level {np.abs(item['inputs']).max():.1f}"} for item in inputs]
+
+
+def energy_segments(model, audio):
+    # Stands in for the model's VAD: runs of non-zero samples
+    voiced = np.append(np.abs(audio) > 0, False).astype(np.int8)
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], voiced])))
+    return [(int(start), int(end)) for start, end in zip(edges[::2], edges[1::2])]
+
+
+def clip(seconds, *speech):
+    audio = np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+    for start, end, level in speech:
+        audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)] = level
+    return audio
+
+
+@pytest.fixture
+def model():
+    return StubPipeline()
+
+
+@pytest.fixture
+def transcriber(monkeypatch, model):
+    monkeypatch.setattr(batch_transcriber, "_speech_segments", energy_segments)
+    registry = ModelRegistry()
+    registry.register(WHISPERX_ASR, lambda: model)
+    transcriber = BatchTranscriber(registry=registry, max_wait=0.5)
+    yield transcriber
+    transcriber.shutdown()
+
+
+def test_one_segment_per_speech_segment(transcriber, model):
+    first = clip(10, (1.0, 2.5, 0.1), (4.0, 7.0, 0.2))
+    second = clip(20, (0.5, 1.0, 0.3), (12.0, 19.0, 0.4), (19.5, 20.0, 0.5))
+    results = {}
+    threads = [
+        threading.Thread(target=lambda name=name, audio=audio: results.update({name: transcriber.transcribe(audio)}))
+        for name, audio in (("first", first), ("second", second))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert model.batches == [5]
+    assert results["first"]["segments"] == [
+        {"text": "level 0.1", "start": 1.0, "end": 2.5},
+        {"text": "level 0.2", "start": 4.0, "end": 7.0},
+    ]
+    assert results["second"]["segments"] == [
+        {"text": "level 0.3", "start": 0.5, "end": 1.0},
+        {"text": "level 0.4", "start": 12.0, "end": 19.0},
+        {"text": "level 0.5", "start": 19.5, "end": 20.0},
+    ]
+
+
+def test_silent_clip_has_no_segments(transcriber):
+    assert transcriber.transcribe(clip(5))["segments"] == []
+
+
+def test_models_without_a_vad_decode_30_second_windows():
+    audio = clip(70, (0.0, 70.0, 0.1))
+    assert batch_transcriber._speech_segments(StubPipeline(), audio) == [
+        (0, 30 * SAMPLE_RATE), (30 * SAMPLE_RATE, 60 * SAMPLE_RATE), (60 * SAMPLE_RATE, 70 * SAMPLE_RATE),
+    ]
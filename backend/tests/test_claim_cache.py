@@ -0,0 +1,75 @@
+import pytest
+from tests.claim_fixtures import NEAR_MISS_PAIRS, StubVerifier, synthetic_corpus
+from retrieval.claim_cache import ClaimCache, normalize_claim
+from retrieval.fact_check import FactChecker
+
+STORED = "The unemployment rate fell to 3.5 percent in 2019 under my administration."
+
+
+@pytest.fixture
+def cache():
+    cache = ClaimCache()
+    cache.put(STORED, {"verdict": "true"})
+    return cache
+
+
+def test_normalize_drops_fillers_openers_and_punctuation():
+    assert normalize_claim("And, uh, crime WENT up!") == "crime went up"
+    assert normalize_claim("Let me tell you, look, wages didn't rise.") == "wages did not rise"
+
+
+@pytest.mark.parametrize("text", [
+    "the unemployment rate fell to 3.5 percent in 2019 under my administration",
+    "So, um, the unemployment rate fell to 3.5 percent in 2019 under my administration...",
+])
+def test_exact_hit(cache, text):
+    assert cache.lookup(text)[0] == "exact"
+
+
+@pytest.mark.parametrize("text", [
+    "The unemployment rate really fell to 3.5 percent in 2019 under my administration",
+    "Unemployment rate fell to 3.5 percent in 2019 under my administration",
+])
+def test_paraphrase_is_near_hit(cache, text):
+    outcome, value = cache.lookup(text)
+    assert outcome == "near"
+    assert value == {"verdict": "true"}
+
+
+@pytest.mark.parametrize("text", [
+    "The unemployment rate fell to 8.5 percent in 2019 under my administration.",
+    "The unemployment rate rose to 3.5 percent in 2019 under my administration.",
+    "The unemployment rate fell to 3.5 percent in 2009 under my administration.",
+    "The unemployment rate never fell to 3.5 percent in 2019 under my administration.",
+    "The unemployment rate didn't fall to 3.5 percent in 2019 under my administration.",
+])
+def test_changed_fact_misses(cache, text):
+    assert cache.lookup(text) == ("miss", None)
+
+
+@pytest.mark.parametrize("stored, probe", NEAR_MISS_PAIRS)
+def test_recorded_near_misses_miss(stored, probe):
+    cache = ClaimCache()
+    cache.put(stored, {"checked": stored})
+    assert cache.lookup(probe)[0] == "miss"
+
+
+def test_cache_saves_verifier_calls_without_wrong_verdicts():
+    corpus = synthetic_corpus(speeches=10, claims_per_speech=30, pool_size=30, seed=1)
+    claim_ids = {text: claim_id for text, claim_id in corpus}
+    verifier = StubVerifier(0)
+    checker = FactChecker(verifier, cache=ClaimCache(), min_words=1)
+    wrong = 0
+    near = 0
+    try:
+        for text, claim_id in corpus:
+            result = checker.check(text)
+            near += result["cached"] == "near"
+            if result["cached"] != "miss" and claim_ids[result["checked"]] != claim_id:
+                wrong += 1
+    finally:
+        checker.shutdown()
+    assert wrong == 0
+    assert near > 0
+    assert verifier.calls < len({normalize_claim(text) for text, _ in corpus})
+    assert verifier.calls < len(corpus) / 2
@@ -0,0 +1,193 @@
+import threading
+import time
+import numpy as np
+import pytest
+from media_player.chunk_queue import AudioChunk, SAMPLE_RATE
+from media_player.speech_to_text.inference_scheduler import (
+    InferenceScheduler,
+    coalesce_chunks,
+    BLOCK,
+    COALESCE,
+    DROP_OLDEST,
+)
+
+
+def chunk(session_id, index, start=None, seconds=1.0, level=1):
+    start = float(index) if start is None else start
+    return AudioChunk(session_id, index, start, np.full(int(seconds * SAMPLE_RATE), level, dtype=np.int16))
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+class Recorder:
+    """
+    Handler that logs the chunks it runs, holding each one until `gate` is
+    set.
+    """
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.ran = []
+        self.lock = threading.Lock()
+
+    def __call__(self, chunk):
+        self.gate.wait(5)
+        with self.lock:
+            self.ran.append((chunk.session_id, chunk.index))
+        return chunk
+
+
+@pytest.fixture
+def scheduler():
+    schedulers = []
+
+    def make(**options):
+        schedulers.append(InferenceScheduler(**options))
+        return schedulers[-1]
+
+    yield make
+    for scheduler in schedulers:
+        scheduler.shutdown()
+
+
+def hold_worker(scheduler, recorder, session_id="gate", **options):
+    # Occupy the only worker so everything submitted next stays queued
+    scheduler.register_session(session_id, recorder, **options)
+    scheduler.submit(session_id, chunk(session_id, 0))
+    wait_for(lambda: scheduler.stats()["busy_workers"] == 1)
+
+
+def test_sessions_are_served_round_robin(scheduler):
+    scheduler = scheduler(workers=1)
+    recorder = Recorder()
+    hold_worker(scheduler, recorder)
+    scheduler.register_session("a", recorder)
+    scheduler.register_session("b", recorder)
+    for index in range(1, 5):
+        scheduler.submit("a", chunk("a", index))
+    for index in range(1, 3):
+        scheduler.submit("b", chunk("b", index))
+    recorder.gate.set()
+    wait_for(lambda: len(recorder.ran) == 7)
+    assert recorder.ran[1:] == [("a", 1), ("b", 1), ("a", 2), ("b", 2), ("a", 3), ("a", 4)]
+
+
+def test_background_sessions_wait_for_live_ones(scheduler):
+    scheduler = scheduler(workers=1)
+    recorder = Recorder()
+    hold_worker(scheduler, recorder)
+    scheduler.register_session("ingest", recorder, background=True)
+    scheduler.register_session("live", recorder)
+    for index in range(1, 3):
+        scheduler.submit("ingest", chunk("ingest", index))
+    for index in range(1, 3):
+        scheduler.submit("live", chunk("live", index))
+    recorder.gate.set()
+    wait_for(lambda: len(recorder.ran) == 5)
+    assert recorder.ran[1:] == [("live", 1), ("live", 2), ("ingest", 1), ("ingest", 2)]
+
+
+def test_background_sessions_keep_to_their_share_of_workers(scheduler):
+    scheduler = scheduler(workers=4, background_workers=1)
+    recorder = Recorder()
+    scheduler.register_session("ingest", recorder, background=True, max_in_flight=4)
+    for index in range(4):
+        scheduler.submit("ingest", chunk("ingest", index))
+    wait_for(lambda: scheduler.stats()["busy_workers"] == 1)
+    time.sleep(0.05)
+    assert scheduler.stats()["background_busy_workers"] == 1
+    assert scheduler.depth("ingest") == 3
+    recorder.gate.set()
+    wait_for(lambda: len(recorder.ran) == 4)
+
+
+def test_drop_oldest_sheds_the_oldest_pending_chunk(scheduler):
+    scheduler = scheduler(workers=1, max_session_depth=2, policy=DROP_OLDEST)
+    recorder = Recorder()
+    hold_worker(scheduler, recorder, "s")
+    for index in range(1, 4):
+        assert scheduler.submit("s", chunk("s", index))
+    assert scheduler.stats()["sessions"]["s"]["dropped"] == 1
+    recorder.gate.set()
+    wait_for(lambda: len(recorder.ran) == 3)
+    assert recorder.ran == [("s", 0), ("s", 2), ("s", 3)]
+
+
+def test_coalesce_merges_into_the_newest_pending_chunk(scheduler):
+    results = []
+    scheduler = scheduler(workers=1, max_session_depth=2, policy=COALESCE)
+    recorder = Recorder()
+    hold_worker(scheduler, recorder, "s", on_result=lambda chunk, result: results.append(result))
+    for index in range(1, 4):
+        assert scheduler.submit("s", chunk("s", index))
+    stats = scheduler.stats()["sessions"]["s"]
+    assert (stats["depth"], stats["coalesced"], stats["dropped"]) == (2, 1, 0)
+    recorder.gate.set()
+    wait_for(lambda: len(results) == 3)
+    assert [(result.index, result.start_time, result.end_time) for result in results] == [
+        (0, 0.0, 1.0), (1, 1.0, 2.0), (2, 2.0, 4.0),
+    ]
+
+
+def test_coalesce_falls_back_to_dropping_when_chunks_are_not_adjacent(scheduler):
+    scheduler = scheduler(workers=1, max_session_depth=2, policy=COALESCE)
+    recorder = Recorder()
+    hold_worker(scheduler, recorder, "s")
+    scheduler.submit("s", chunk("s", 1))
+    scheduler.submit("s", chunk("s", 2))
+    scheduler.submit("s", chunk("s", 3, start=10.0))
+    stats = scheduler.stats()["sessions"]["s"]
+    assert (stats["coalesced"], stats["dropped"]) == (0, 1)
+    recorder.gate.set()
+    wait_for(lambda: len(recorder.ran) == 3)
+    assert recorder.ran == [("s", 0), ("s", 2), ("s", 3)]
+
+
+def test_block_waits_for_room(scheduler):
+    scheduler = scheduler(workers=1, max_session_depth=1, policy=BLOCK, block_timeout=5.0)
+    recorder = Recorder()
+    hold_worker(scheduler, recorder, "s")
+    assert scheduler.submit("s", chunk("s", 1))
+    accepted = []
+    producer = threading.Thread(target=lambda: accepted.append(scheduler.submit("s", chunk("s", 2))))
+    producer.start()
+    time.sleep(0.1)
+    assert producer.is_alive()
+    recorder.gate.set()
+    producer.join(5)
+    assert accepted == [True]
+    wait_for(lambda: len(recorder.ran) == 3)
+    assert scheduler.stats()["sessions"]["s"]["dropped"] == 0
+
+
+def test_block_gives_up_after_the_timeout(scheduler):
+    scheduler = scheduler(workers=1, max_session_depth=1, policy=BLOCK, block_timeout=0.1)
+    recorder = Recorder()
+    hold_worker(scheduler, recorder, "s")
+    assert scheduler.submit("s", chunk("s", 1))
+    assert not scheduler.submit("s", chunk("s", 2))
+    assert scheduler.stats()["sessions"]["s"]["dropped"] == 1
+    recorder.gate.set()
+
+
+def test_coalesce_chunks_pads_the_gap_with_silence():
+    merged = coalesce_chunks(chunk("s", 0, start=0.0), chunk("s", 1, start=1.5, level=2))
+    assert (merged.index, merged.start_time, merged.end_time) == (0, 0.0, 2.5)
+    samples = merged.samples
+    assert (samples[:SAMPLE_RATE] == 1).all()
+    assert (samples[SAMPLE_RATE:SAMPLE_RATE * 3 // 2] == 0).all()
+    assert (samples[SAMPLE_RATE * 3 // 2:] == 2).all()
+
+
+@pytest.mark.parametrize("second", [
+    chunk("s", 1, start=0.5),
+    chunk("s", 1, start=2.5),
+    chunk("s", 1, start=1.0, seconds=29.5),
+])
+def test_coalesce_chunks_refuses_overlapping_distant_or_oversized(second):
+    assert coalesce_chunks(chunk("s", 0, start=0.0), second) is None
@@ -0,0 +1,87 @@
+import random
+import time
+import numpy as np
+import pytest
+from benchmarks.pipeline_bench import (
+    StubAligner,
+    StubAsr,
+    StubDiarizer,
+    StubEmbedder,
+    StubStages,
+)
+from benchmarks.soak_test import NullTimings
+import media_player.speech_to_text.process_audio_queue as process_audio_queue
+from media_player.chunk_queue import AudioChunk, SAMPLE_RATE
+from media_player.ingest import IngestJob
+from media_player.speech_to_text.inference_scheduler import InferenceScheduler
+from media_player.speech_to_text.model_registry import (
+    ModelRegistry,
+    WHISPERX_ASR,
+    WHISPERX_ALIGN_EN,
+    WHISPERX_DIARIZE,
+    PYANNOTE_EMBEDDING,
+)
+
+
+class JitterAsr(StubAsr):
+    """
+    Finishes chunks in a random order.
+    """
+
+    def transcribe(self, audio, batch_size=16):
+        time.sleep(random.random() * 0.01)
+        return super().transcribe(audio, batch_size)
+
+
+@pytest.fixture(autouse=True)
+def stub_models(monkeypatch):
+    registry = ModelRegistry()
+    registry.register(WHISPERX_ASR, lambda: JitterAsr(0.0))
+    registry.register(WHISPERX_ALIGN_EN, lambda: (StubAligner(0.0), {"language": "en"}))
+    registry.register(WHISPERX_DIARIZE, lambda: StubDiarizer(0.0))
+    registry.register(PYANNOTE_EMBEDDING, lambda: StubEmbedder(0.0))
+    monkeypatch.setattr(process_audio_queue, "model_registry", registry)
+    monkeypatch.setattr(process_audio_queue, "WhisperxStages", lambda: StubStages(NullTimings()))
+
+
+def chunks(session_id, count=12):
+    """
+    8 s chunks of two 4 s tones each, the diarizer's turn length, drawn
+    from a few distinct voices.
+    """
+    t = np.arange(8 * SAMPLE_RATE) / SAMPLE_RATE
+    result = []
+    for index in range(count):
+        frequency = np.where(t < 4, [300, 500, 700][index % 3], [900, 1100][index % 2])
+        samples = (0.3 * np.sin(2 * np.pi * frequency * t) * 32767).astype(np.int16)
+        result.append(AudioChunk(session_id, index, index * 8.0, samples))
+    return result
+
+
+def transcribe(workers, scheduler=None):
+    job = IngestJob("clip.mp4", workers=workers, scheduler=scheduler)
+    job_chunks = chunks(job.id)
+    job.total_chunks = len(job_chunks)
+    results = job._process(job_chunks)
+    assert job.completed_chunks == len(job_chunks)
+    return [
+        (chunk.start_time + phrase["start"], phrase["speaker"])
+        for chunk, phrases in sorted(results, key=lambda result: result[0].index)
+        for phrase in phrases
+    ]
+
+
+def test_parallel_ingest_labels_speakers_as_a_serial_one_does():
+    serial = transcribe(workers=1)
+    assert len({speaker for _, speaker in serial}) > 1
+    for _ in range(3):
+        assert transcribe(workers=6) == serial
+
+
+def test_scheduled_ingest_labels_speakers_as_a_serial_one_does():
+    serial = transcribe(workers=1)
+    scheduler = InferenceScheduler(workers=6)
+    try:
+        assert transcribe(workers=6, scheduler=scheduler) == serial
+    finally:
+        scheduler.shutdown()
@@ -0,0 +1,171 @@
+import threading
+import time
+import pytest
+from media_player.speech_to_text.job_transport import InProcessTransport, TransportExecutor, JobFailed
+from media_player.speech_to_text.transcription_worker import TranscriptionWorker, start_worker_threads
+
+
+def executor(transport, result_timeout=10.0):
+    return TransportExecutor(lambda: transport, result_timeout=result_timeout)
+
+
+@pytest.fixture
+def workers():
+    started = []
+    yield started
+    for worker in started:
+        worker.stop()
+
+
+def test_reserve_ack_and_result():
+    transport = InProcessTransport()
+    transport.put("j1", {"n": 1}, "client")
+    job_id, payload, attempt = transport.reserve("w1", timeout=0.1)
+    assert (job_id, payload, attempt) == ("j1", {"n": 1}, 1)
+    assert transport.reserve("w2", timeout=0.05) is None
+    assert transport.ack("j1", "w1", "done")
+    assert transport.get_result("client", timeout=0.1) == ("j1", True, "done")
+    # A second result for the same job is dropped
+    assert not transport.ack("j1", "w1", "again")
+    assert transport.stats()["completed"] == 1
+
+
+def test_expired_lease_is_redelivered():
+    transport = InProcessTransport(lease_seconds=0.1)
+    transport.put("j1", "payload", "client")
+    assert transport.reserve("w1", timeout=0.1)[0] == "j1"
+    time.sleep(0.15)
+    job_id, _, attempt = transport.reserve("w2", timeout=0.5)
+    assert (job_id, attempt) == ("j1", 2)
+    assert not transport.extend("j1", "w1")
+    assert transport.extend("j1", "w2")
+    assert transport.stats()["retried"] == 1
+
+
+def test_stale_ack_is_refused():
+    transport = InProcessTransport(lease_seconds=0.1)
+    transport.put("j1", "payload", "client")
+    transport.reserve("w1", timeout=0.1)
+    time.sleep(0.15)
+    transport.reserve("w2", timeout=0.5)
+    assert not transport.ack("j1", "w1", "stale")
+    assert transport.stats()["stale_acks"] == 1
+    assert transport.ack("j1", "w2", "fresh")
+    assert transport.get_result("client", timeout=0.1) == ("j1", True, "fresh")
+
+
+def test_late_ack_counts_while_no_one_else_holds_the_job():
+    transport = InProcessTransport(lease_seconds=0.1)
+    transport.put("j1", "payload", "client")
+    transport.reserve("w1", timeout=0.1)
+    time.sleep(0.15)
+    transport.put("j2", "payload", "client")
+    # Expires w1's lease; j1 goes back behind j2
+    assert transport.reserve("w2", timeout=0.1)[0] == "j2"
+    assert transport.ack("j1", "w1", "late but first")
+    assert transport.get_result("client", timeout=0.1) == ("j1", True, "late but first")
+    assert transport.stats()["stale_acks"] == 0
+
+
+def test_failures_retry_until_max_attempts():
+    transport = InProcessTransport(max_attempts=2)
+    transport.put("j1", "payload", "client")
+    for worker in ("w1", "w2"):
+        job_id, _, _ = transport.reserve(worker, timeout=0.1)
+        transport.fail(job_id, worker, "boom")
+    assert transport.reserve("w3", timeout=0.05) is None
+    job_id, ok, error = transport.get_result("client", timeout=0.1)
+    assert (job_id, ok) == ("j1", False)
+    assert "boom" in error and "2 attempts" in error
+    assert transport.stats()["dead"] == 1
+
+
+def test_fail_from_a_worker_without_the_lease_is_ignored():
+    transport = InProcessTransport()
+    transport.put("j1", "payload", "client")
+    transport.reserve("w1", timeout=0.1)
+    transport.fail("j1", "w2", "not mine")
+    assert transport.stats()["leased"] == 1
+
+
+def test_drop_client_cancels_its_queued_jobs():
+    transport = InProcessTransport()
+    transport.put("a1", "payload", "a")
+    transport.put("a2", "payload", "a")
+    transport.put("b1", "payload", "b")
+    transport.reserve("w1", timeout=0.1)
+    transport.drop_client("a")
+    # a1 is leased and finishes; a2 is gone
+    assert transport.stats()["queued"] == 1
+    assert transport.reserve("w1", timeout=0.1)[0] == "b1"
+    assert transport.ack("a1", "w1", "done")
+    assert transport.get_result("a", timeout=0.05) is None
+
+
+def test_workers_run_jobs_through_the_executor(workers):
+    transport = InProcessTransport()
+    workers.extend(start_worker_threads(transport, 3, process=lambda job: job * 2))
+    pool = executor(transport)
+    try:
+        futures = [pool.submit(None, n) for n in range(20)]
+        assert [future.result(timeout=5) for future in futures] == [n * 2 for n in range(20)]
+    finally:
+        pool.shutdown()
+    assert sum(worker.processed for worker in workers) == 20
+
+
+def test_failing_job_raises_job_failed(workers):
+    transport = InProcessTransport(max_attempts=3)
+
+    def process(job):
+        raise RuntimeError(f"bad job {job}")
+
+    workers.extend(start_worker_threads(transport, 2, process=process))
+    pool = executor(transport)
+    try:
+        with pytest.raises(JobFailed, match="bad job 7"):
+            pool.submit(None, 7).result(timeout=5)
+    finally:
+        pool.shutdown()
+    assert sum(worker.failed for worker in workers) == 3
+
+
+def test_executor_times_out_without_workers():
+    pool = executor(InProcessTransport(), result_timeout=0.2)
+    try:
+        with pytest.raises(TimeoutError):
+            pool.submit(None, "job").result(timeout=5)
+    finally:
+        pool.shutdown()
+
+
+def test_heartbeat_keeps_a_slow_job_leased():
+    transport = InProcessTransport(lease_seconds=0.2)
+    transport.put("j1", "slow", "client")
+    worker = TranscriptionWorker(transport, name="w1", process=lambda job: time.sleep(0.6) or "done",
+                                 heartbeat=0.05)
+    leased = transport.reserve("w1", timeout=0.1)
+    rival = threading.Thread(target=lambda: transport.reserve("w2", timeout=0.8))
+    rival.start()
+    worker.run_job(*leased)
+    rival.join()
+    assert transport.get_result("client", timeout=0.1) == ("j1", True, "done")
+    assert transport.stats()["retried"] == 0
+
+
+def test_without_heartbeat_a_slow_job_goes_to_another_worker():
+    transport = InProcessTransport(lease_seconds=0.2)
+    transport.put("j1", "slow", "client")
+    worker = TranscriptionWorker(transport, name="w1", process=lambda job: time.sleep(0.6) or "late",
+                                 heartbeat=10.0)
+    redelivered = []
+    leased = transport.reserve("w1", timeout=0.1)
+    rival = threading.Thread(target=lambda: redelivered.append(transport.reserve("w2", timeout=0.8)))
+    rival.start()
+    worker.run_job(*leased)
+    rival.join()
+    assert redelivered[0][0] == "j1"
+    # w1's late result is refused; w2's counts
+    assert transport.stats()["stale_acks"] == 1
+    assert transport.ack("j1", "w2", "on time")
+    assert transport.get_result("client", timeout=0.1) == ("j1", True, "on time")
@@ -0,0 +1,77 @@
+import os
+import threading
+import time
+import pytest
+import media_player.media_catalog as media_catalog
+from media_player.media_catalog import MediaCatalog
+
+
+@pytest.fixture
+def probes(monkeypatch):
+    probed = []
+    lock = threading.Lock()
+
+    def probe(path):
+        with lock:
+            probed.append((os.path.basename(path), os.path.getsize(path)))
+        return {"duration": 1.0}
+
+    monkeypatch.setattr(media_catalog, "probe_media", probe)
+    return probed
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = MediaCatalog(str(tmp_path / "videos"), catalog_path=str(tmp_path / "catalog.json"),
+                           settle_seconds=0.2).load()
+    yield catalog
+    catalog.stop()
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def write_in_pieces(catalog, path, pieces, pause=0.05):
+    with open(path, "ab") as f:
+        for _ in range(pieces):
+            f.write(b"x" * 1000)
+            f.flush()
+            os.utime(path, ns=(time.time_ns(), time.time_ns()))
+            catalog.refresh(path, settled=False)
+            time.sleep(pause)
+
+
+def test_file_being_copied_is_probed_once_it_settles(catalog, probes):
+    path = os.path.join(catalog.video_dir, "copy.mp4")
+    write_in_pieces(catalog, path, pieces=10)
+    # Listed straight away, but not probed while it was still growing
+    assert "copy.mp4" in catalog
+    assert probes == []
+    wait_for(lambda: catalog.get("copy.mp4")["probed"])
+    assert probes == [("copy.mp4", 10000)]
+
+
+def test_close_probes_without_waiting(catalog, probes):
+    catalog.settle_seconds = 60.0
+    path = os.path.join(catalog.video_dir, "upload.webm")
+    write_in_pieces(catalog, path, pieces=3, pause=0.0)
+    catalog.refresh(path)
+    wait_for(lambda: catalog.get("upload.webm")["probed"])
+    # Another close of the unchanged file does not probe again
+    catalog.refresh(path)
+    time.sleep(0.1)
+    assert probes == [("upload.webm", 3000)]
+
+
+def test_file_deleted_before_settling_is_never_probed(catalog, probes):
+    path = os.path.join(catalog.video_dir, "gone.mp4")
+    write_in_pieces(catalog, path, pieces=2, pause=0.0)
+    os.remove(path)
+    catalog.remove(path)
+    time.sleep(0.4)
+    assert probes == []
+    assert "gone.mp4" not in catalog
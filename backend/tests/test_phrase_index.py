@@ -0,0 +1,67 @@
+import pytest
+from retrieval.phrase_index import PhraseIndex, HashingEmbedder
+from retrieval.vector_index import VectorIndex
+
+
+class Chunk:
+    def __init__(self, start_time):
+        self.start_time = start_time
+
+
+PHRASES = [
+    {"text": "the quick brown fox", "start": 0.0, "end": 1.5, "speaker": "a"},
+    {"text": "jumps over the lazy dog", "start": 1.5, "end": 3.0, "speaker": "b"},
+    {"text": "too short", "start": 3.0, "end": 3.5, "speaker": "a"},
+]
+
+
+def phrase_index(path, **kwargs):
+    embed = HashingEmbedder()
+    return PhraseIndex(VectorIndex(str(path), dim=embed.dim, flush_interval=0), embed=embed, **kwargs)
+
+
+def test_short_phrases_are_left_out(tmp_path):
+    index = phrase_index(tmp_path)
+    assert len(index.add_phrases("v", Chunk(10.0), PHRASES)) == 2
+    hit = index.search(["lazy dog"], k=1)[0][0]
+    assert (hit["video"], hit["start"], hit["end"], hit["speaker"]) == ("v", 11.5, 13.0, "b")
+
+
+def test_replayed_phrases_are_skipped(tmp_path):
+    index = phrase_index(tmp_path)
+    index.add_phrases("v", Chunk(10.0), PHRASES)
+    # The same media times from a chunk cut differently
+    shifted = [dict(phrase, start=phrase["start"] + 5, end=phrase["end"] + 5) for phrase in PHRASES]
+    assert index.add_phrases("v", Chunk(5.0), shifted) == []
+    assert index.duplicates == 2
+    assert len(index.add_phrases("other", Chunk(10.0), PHRASES)) == 2
+
+
+def test_dedupe_survives_reopen(tmp_path):
+    phrase_index(tmp_path).add_phrases("v", Chunk(0.0), PHRASES)
+    reopened = phrase_index(tmp_path)
+    assert reopened.add_phrases("v", Chunk(0.0), PHRASES) == []
+    assert len(reopened.index) == 2
+
+
+def test_failed_add_can_be_retried(tmp_path, monkeypatch):
+    index = phrase_index(tmp_path)
+
+    def broken(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(index.index, "add", broken)
+    with pytest.raises(OSError):
+        index.add_phrases("v", Chunk(0.0), PHRASES)
+    monkeypatch.undo()
+    assert len(index.add_phrases("v", Chunk(0.0), PHRASES)) == 2
+
+
+def test_span_memory_is_bounded(tmp_path):
+    index = phrase_index(tmp_path, max_videos=2)
+    for video in ("a", "b", "c"):
+        index.add_phrases(video, Chunk(0.0), PHRASES)
+    assert list(index._spans) == ["b", "c"]
+    # An evicted video's spans are read back from the index
+    assert index.add_phrases("a", Chunk(0.0), PHRASES) == []
+    assert len(index.index) == 6
@@ -0,0 +1,142 @@
+import threading
+import time
+import pytest
+from media_player.session_manager import SessionCapacityError, SessionManager
+
+
+class StubPlayer:
+    """
+    Plays on a thread until paused or stopped, like AudioPlayer.
+    """
+
+    def __init__(self):
+        self.thread = None
+        self._stop = threading.Event()
+
+    def play(self, audio_path, start_time, on_chunk=None, on_provisional=None):
+        self._stop.clear()
+        self.thread = threading.Thread(target=self._stop.wait, daemon=True)
+        self.thread.start()
+
+    def pause(self):
+        self.stop()
+
+    def stop(self):
+        self._stop.set()
+        if self.thread is not None:
+            self.thread.join()
+
+
+class StubQueue:
+    def __init__(self):
+        self.stopped = False
+
+    def enqueue(self, chunk):
+        pass
+
+    def enqueue_provisional(self, chunk):
+        pass
+
+    def stop(self, wait=True):
+        self.stopped = True
+
+
+@pytest.fixture
+def closed():
+    return []
+
+
+@pytest.fixture
+def make_manager(closed):
+    managers = []
+
+    def make(**options):
+        manager = SessionManager(lambda session_id: StubPlayer(), lambda session: StubQueue(),
+                                 on_close=closed.append, **options)
+        managers.append(manager)
+        return manager
+
+    yield make
+    for manager in managers:
+        manager.stop_reaper()
+        manager.close_all()
+
+
+def test_admission_is_capped(make_manager):
+    manager = make_manager(max_active=2, retry_after=30.0)
+    manager.play("a", "a.wav")
+    manager.play("b", "b.wav")
+    with pytest.raises(SessionCapacityError) as error:
+        manager.play("c", "c.wav")
+    # Both sessions are playing, so no slot is about to free up
+    assert error.value.retry_after == 30
+    assert manager.stats()["rejected"] == 1
+    # A session that already has a pipeline keeps it
+    assert manager.play("a", "a.wav") is not None
+    assert len(manager) == 2
+
+
+def test_retry_hint_counts_down_to_the_next_reap(make_manager):
+    manager = make_manager(max_active=1, idle_timeout=100.0)
+    manager.play("a", "a.wav")
+    manager.pause("a")
+    with pytest.raises(SessionCapacityError) as error:
+        manager.play("b", "b.wav")
+    assert 99 <= error.value.retry_after <= 101
+
+
+def test_idle_session_makes_room_for_a_new_one(make_manager, closed):
+    manager = make_manager(max_active=1, idle_timeout=0.1)
+    first = manager.play("a", "a.wav")
+    queue = first.audio_queue
+    manager.pause("a")
+    time.sleep(0.15)
+    manager.play("b", "b.wav")
+    assert closed == [first]
+    assert queue.stopped
+    assert not first.playing
+    assert [session["session_id"] for session in manager.stats()["sessions"]] == ["b"]
+
+
+def test_reap_spares_playing_sessions(make_manager, closed):
+    manager = make_manager(idle_timeout=0.1)
+    manager.play("playing", "a.wav")
+    idle = manager.play("idle", "b.wav")
+    manager.pause("idle")
+    time.sleep(0.15)
+    assert manager.reap() == 1
+    assert closed == [idle]
+    assert len(manager) == 1
+    assert manager.stats()["reaped"] == 1
+
+
+def test_reaper_thread_tears_down_idle_sessions(make_manager, closed):
+    manager = make_manager(idle_timeout=0.05)
+    session = manager.play("a", "a.wav")
+    manager.pause("a")
+    manager.start_reaper(interval=0.02)
+    deadline = time.monotonic() + 5
+    while len(manager) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert closed == [session]
+
+
+def test_replay_stops_the_old_queue_first(make_manager):
+    manager = make_manager()
+    session = manager.play("a", "a.wav")
+    first = session.audio_queue
+    manager.play("a", "b.wav", video_name="b")
+    assert first.stopped
+    assert not session.audio_queue.stopped
+    assert session.video_name == "b"
+
+
+@pytest.mark.parametrize("release", [False, True])
+def test_pause_releases_the_queue_only_when_asked(make_manager, release):
+    manager = make_manager(release_on_pause=release)
+    session = manager.play("a", "a.wav")
+    queue = session.audio_queue
+    manager.pause("a")
+    assert not session.playing
+    assert queue.stopped == release
+    assert (session.audio_queue is None) == release
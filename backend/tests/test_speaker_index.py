@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+from media_player.speech_to_text.speaker_bank import write_bank
+from media_player.speech_to_text.speaker_index import SpeakerIndex
+
+DIM = 8
+
+
+def unit(rows):
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def bank(tmp_path):
+    rng = np.random.default_rng(0)
+    # Different row counts per speaker, so block boundaries matter
+    speakers = {
+        "Alice Smith": rng.standard_normal((1, DIM)).astype(np.float32),
+        "Bob": rng.standard_normal((4, DIM)).astype(np.float32),
+        "Carol": rng.standard_normal((7, DIM)).astype(np.float32),
+    }
+    np.save(tmp_path / "alice_smith_embedding.npy", speakers["Alice Smith"])
+    write_bank(str(tmp_path / "enrolled.bank"), {"Bob": speakers["Bob"], "Carol": speakers["Carol"]},
+               dtype="float32")
+    return tmp_path, speakers
+
+
+def expected_scores(speakers, queries, aggregation, top_k):
+    scores = []
+    for rows in speakers.values():
+        similarities = unit(queries) @ unit(rows).T
+        if aggregation == "mean":
+            scores.append(similarities.mean(axis=1))
+        elif aggregation == "max":
+            scores.append(similarities.max(axis=1))
+        else:
+            k = min(top_k, len(rows))
+            scores.append(-np.sort(-similarities, axis=1)[:, :k].mean(axis=1))
+    return np.stack(scores, axis=1)
+
+
+@pytest.mark.parametrize("aggregation", SpeakerIndex.AGGREGATIONS)
+def test_aggregation_matches_per_speaker_loop(bank, aggregation):
+    directory, speakers = bank
+    index = SpeakerIndex(str(directory), aggregation=aggregation, top_k=3)
+    queries = np.random.default_rng(1).standard_normal((5, DIM)).astype(np.float32)
+    assert index.names == ["Alice Smith", "Bob", "Carol"]
+    np.testing.assert_allclose(index.score(queries), expected_scores(speakers, queries, aggregation, 3), atol=1e-5)
+
+
+def test_single_embedding_scores_as_a_batch_of_one(bank):
+    directory, speakers = bank
+    index = SpeakerIndex(str(directory), aggregation="max")
+    query = speakers["Bob"][2]
+    assert index.score(query).shape == (1, 3)
+    similarities = index.similarities(query)
+    assert similarities["Bob"] == pytest.approx(1.0, abs=1e-5)
+    assert max(similarities, key=similarities.get) == "Bob"
+
+
+def test_identify_labels_weak_matches_unknown(bank):
+    directory, speakers = bank
+    index = SpeakerIndex(str(directory), aggregation="max")
+    stranger = np.zeros(DIM, dtype=np.float32)
+    stranger[0] = 1.0
+    (name, score), (unknown, _) = index.identify(np.stack([speakers["Carol"][0], stranger]), threshold=0.99)
+    assert (name, round(score, 4)) == ("Carol", 1.0)
+    assert unknown == "Unknown"
+
+
+def test_bank_file_replaces_a_same_named_npy_speaker(bank):
+    directory, speakers = bank
+    replacement = np.random.default_rng(2).standard_normal((2, DIM)).astype(np.float32)
+    write_bank(str(directory / "override.bank"), {"Alice Smith": replacement}, dtype="float32")
+    index = SpeakerIndex(str(directory), aggregation="max")
+    assert index.names == ["Bob", "Carol", "Alice Smith"]
+    assert index.similarities(replacement[1])["Alice Smith"] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_reloads_when_the_bank_changes(bank):
+    directory, _ = bank
+    index = SpeakerIndex(str(directory), reload_interval=0.0)
+    assert not index.maybe_reload()
+    np.save(directory / "dave_embedding.npy", np.ones((1, DIM), dtype=np.float32))
+    assert index.score(np.ones(DIM)).shape == (1, 4)
+    assert index.names == ["Alice Smith", "Dave", "Bob", "Carol"]
+
+
+def test_empty_bank_identifies_no_one(tmp_path):
+    index = SpeakerIndex(str(tmp_path))
+    assert index.score(np.ones((2, DIM))).shape == (2, 0)
+    assert index.identify(np.ones(DIM)) == [("Unknown", 0.0)]
@@ -0,0 +1,77 @@
+import numpy as np
+from media_player.speech_to_text.speaker_tracker import SpeakerTracker
+
+DIM = 16
+
+
+def at_angle(degrees):
+    # Unit vector in the plane of the first two axes
+    vector = np.zeros(DIM, dtype=np.float32)
+    vector[0], vector[1] = np.cos(np.radians(degrees)), np.sin(np.radians(degrees))
+    return vector
+
+
+def speakers(count, seed=0):
+    return np.linalg.qr(np.random.default_rng(seed).standard_normal((DIM, count)))[0].T.astype(np.float32)
+
+
+def noisy(vector, n, scale=0.1, seed=0):
+    rng = np.random.default_rng(seed)
+    return vector + scale * rng.standard_normal((n, DIM)).astype(np.float32)
+
+
+def test_same_speaker_keeps_one_track_across_chunks():
+    tracker = SpeakerTracker()
+    alice, bob = speakers(2)
+    first = tracker.assign(np.stack([alice, bob]))
+    later = [tracker.assign(np.stack([a, b])) for a, b in zip(noisy(alice, 5), noisy(bob, 5, seed=1))]
+    assert first[0] != first[1]
+    assert all(ids == first for ids in later)
+    assert [track["count"] for track in tracker.stats()["tracks"]] == [6, 6]
+
+
+def test_centroid_is_the_normalized_running_mean():
+    tracker = SpeakerTracker()
+    samples = [at_angle(0), 2 * at_angle(20), at_angle(40)]
+    for sample in samples:
+        tracker.assign(sample)
+    expected = sum(sample / np.linalg.norm(sample) for sample in samples)
+    centroid = tracker.known_centroids()[0]
+    np.testing.assert_allclose(centroid, expected / np.linalg.norm(expected), atol=1e-6)
+    np.testing.assert_allclose(centroid, at_angle(20), atol=1e-6)
+
+
+def test_tracks_that_drift_together_merge_and_old_ids_resolve():
+    tracker = SpeakerTracker(threshold=0.5, merge_threshold=0.7)
+    first, second = tracker.assign(np.stack([at_angle(0), at_angle(70)]))
+    tracker.name(second, "Bob", 0.9)
+    assert len(tracker) == 2
+    # Between the two: joins the first track and pulls its centroid over
+    for _ in range(4):
+        tracker.assign(at_angle(35))
+    assert len(tracker) == 1
+    assert tracker.merges == 1
+    assert tracker.resolve(second) == first
+    assert tracker.label(second) == f"Speaker {first}"
+    assert tracker.stats()["tracks"][0]["name"] == "Bob"
+    assert tracker.assign(at_angle(70)) == [first]
+
+
+def test_least_seen_track_is_evicted_past_max_tracks():
+    tracker = SpeakerTracker(max_tracks=3)
+    voices = speakers(4)
+    tracker.assign(np.stack([voices[0], voices[0], voices[1], voices[1], voices[2]]))
+    (newest,) = tracker.assign(voices[3])
+    ids = [track["id"] for track in tracker.stats()["tracks"]]
+    assert len(ids) == 3 and newest in ids
+    # Speaker 3, seen once, made room
+    assert 3 not in ids
+    assert not tracker.centroids([3]).any()
+
+
+def test_dominant_needs_the_threshold():
+    tracker = SpeakerTracker()
+    (track_id,) = tracker.assign(at_angle(0))
+    assert tracker.dominant(at_angle(10), threshold=0.9) == track_id
+    assert tracker.dominant(at_angle(60), threshold=0.9) is None
+    assert SpeakerTracker().dominant(at_angle(0), threshold=0.0) is None
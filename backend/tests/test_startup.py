@@ -0,0 +1,60 @@
+import pytest
+from media_player.speech_to_text.model_registry import ModelRegistry
+from media_player.startup import ModelWarmup
+
+NAMES = ["asr", "align", "embedding"]
+
+
+@pytest.fixture
+def registry():
+    registry = ModelRegistry()
+    for name in NAMES:
+        registry.register(name, lambda name=name: object())
+    return registry
+
+
+def warm(registry, **options):
+    warmup = ModelWarmup(registry, NAMES, **options).start()
+    assert warmup.wait(timeout=5)
+    return warmup
+
+
+def test_warmed_models_are_held_and_keep_the_app_ready(registry):
+    warmup = warm(registry)
+    assert warmup.ready
+    assert not any(registry.unload(name) for name in NAMES)
+    registry.idle_timeout = 0.0
+    registry.evict()
+    assert warmup.ready
+    assert warmup.status_dict()["models"]["asr"] == {"state": "ready", "loaded": True, "error": None}
+
+
+def test_readiness_follows_the_registry(registry):
+    warmup = warm(registry, hold=["asr"])
+    assert warmup.ready
+    assert registry.unload("embedding")
+    assert not warmup.ready
+    assert warmup.status_dict()["models"]["embedding"]["loaded"] is False
+    # Loaded again on first use
+    with registry.borrow("embedding"):
+        pass
+    assert warmup.ready
+
+
+def test_released_models_may_be_evicted(registry):
+    warmup = warm(registry)
+    warmup.release()
+    registry.idle_timeout = 0.0
+    registry.evict()
+    assert not warmup.ready
+
+
+def test_failed_model_keeps_the_app_unready(registry):
+    def fail():
+        raise RuntimeError("no weights")
+
+    registry.register("align", fail, replace=True)
+    warmup = warm(registry)
+    assert not warmup.ready
+    status = warmup.status_dict()["models"]["align"]
+    assert (status["state"], status["error"]) == ("failed", "no weights")
@@ -0,0 +1,103 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from App.utilities.stream_response import MAX_RANGES, parse_range_header, stream_video
+
+SIZE = 1000
+CONTENT = bytes(index % 251 for index in range(SIZE))
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", [(0, 99)]),
+    ("bytes=900-", [(900, 999)]),
+    ("bytes=-100", [(900, 999)]),
+    ("bytes=-5000", [(0, 999)]),
+    ("bytes=950-5000", [(950, 999)]),
+    ("BYTES = 0-0", [(0, 0)]),
+    # Sorted, and overlapping or adjacent ranges merged
+    ("bytes=500-599, 0-99", [(0, 99), (500, 599)]),
+    ("bytes=0-99,50-149,150-199", [(0, 199)]),
+    ("bytes=0-9,,20-29", [(0, 9), (20, 29)]),
+    # Unsatisfiable parts are dropped
+    ("bytes=0-9,2000-2999", [(0, 9)]),
+    ("bytes=1000-", []),
+    ("bytes=-0", []),
+])
+def test_parse_range_header(header, expected):
+    assert parse_range_header(header, SIZE) == expected
+
+
+@pytest.mark.parametrize("header", ["items=0-9", "bytes=", "bytes=10", "bytes=a-b", "bytes=20-10"])
+def test_malformed_range_is_ignored(header):
+    assert parse_range_header(header, SIZE) is None
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "video.mp4"
+    path.write_bytes(CONTENT)
+    app = FastAPI()
+
+    @app.get("/video")
+    def video(request: Request):
+        return stream_video(str(path), request.headers)
+
+    return TestClient(app)
+
+
+def test_single_range(client):
+    response = client.get("/video", headers={"Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 100-199/{SIZE}"
+    assert response.content == CONTENT[100:200]
+
+
+def test_multiple_ranges_are_multipart(client):
+    response = client.get("/video", headers={"Range": "bytes=0-9,500-519"})
+    assert response.status_code == 206
+    content_type = response.headers["content-type"]
+    assert content_type.startswith("multipart/byteranges; boundary=")
+    boundary = content_type.split("boundary=")[1].encode()
+    assert int(response.headers["content-length"]) == len(response.content)
+    parts = response.content.split(b"--" + boundary)
+    assert parts[-1] == b"--\r\n"
+    bodies = [part.split(b"\r\n\r\n", 1) for part in parts[1:-1]]
+    assert [b"Content-Range: bytes 0-9/1000" in head for head, _ in bodies] == [True, False]
+    assert [body.removesuffix(b"\r\n") for _, body in bodies] == [CONTENT[:10], CONTENT[500:520]]
+
+
+def test_unsatisfiable_range(client):
+    response = client.get("/video", headers={"Range": f"bytes={SIZE}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{SIZE}"
+
+
+def test_too_many_ranges_get_the_whole_file(client):
+    header = "bytes=" + ",".join(f"{start}-{start}" for start in range(0, 2 * (MAX_RANGES + 1), 2))
+    response = client.get("/video", headers={"Range": header})
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+def test_if_range_with_current_validators_honours_the_range(client):
+    full = client.get("/video")
+    for validator in (full.headers["etag"], full.headers["last-modified"]):
+        response = client.get("/video", headers={"Range": "bytes=0-9", "If-Range": validator})
+        assert response.status_code == 206
+        assert response.content == CONTENT[:10]
+
+
+def test_if_range_with_stale_validators_sends_the_whole_file(client):
+    full = client.get("/video")
+    stale_date = "Mon, 01 Jan 2001 00:00:00 GMT"
+    for validator in ('"0-0"', f"W/{full.headers['etag']}", stale_date):
+        response = client.get("/video", headers={"Range": "bytes=0-9", "If-Range": validator})
+        assert response.status_code == 200
+        assert response.content == CONTENT
+
+
+def test_conditional_get(client):
+    full = client.get("/video")
+    assert client.get("/video", headers={"If-None-Match": full.headers["etag"]}).status_code == 304
+    assert client.get("/video", headers={"If-Modified-Since": full.headers["last-modified"]}).status_code == 304
+    assert client.get("/video", headers={"If-None-Match": '"other"'}).status_code == 200
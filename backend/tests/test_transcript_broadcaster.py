@@ -0,0 +1,102 @@
+import asyncio
+import threading
+from media_player.transcript_broadcaster import TranscriptBroadcaster
+
+
+def event(kind, n):
+    return {"type": kind, "n": n}
+
+
+async def receive(subscription, count):
+    return [await asyncio.wait_for(subscription.get(), timeout=2) for _ in range(count)]
+
+
+def pending(subscription):
+    return subscription._queue.qsize()
+
+
+def test_resume_replays_only_what_the_client_missed():
+    broadcaster = TranscriptBroadcaster()
+    ids = [broadcaster.publish("s", event("final", n))["id"] for n in range(5)]
+
+    async def run():
+        subscription = broadcaster.subscribe("s", last_event_id=ids[1])
+        missed = await receive(subscription, 3)
+        broadcaster.publish("s", event("final", 5))
+        live = await receive(subscription, 1)
+        return missed + live, pending(subscription)
+
+    received, left = asyncio.run(run())
+    assert [item["n"] for item in received] == [2, 3, 4, 5]
+    assert [item["id"] for item in received[:3]] == ids[2:]
+    assert left == 0
+
+
+def test_new_subscriber_gets_no_history():
+    broadcaster = TranscriptBroadcaster()
+    broadcaster.publish("s", event("final", 0))
+
+    async def run():
+        return pending(broadcaster.subscribe("s"))
+
+    assert asyncio.run(run()) == 0
+
+
+def test_replay_skips_partials_for_final_only_subscribers():
+    broadcaster = TranscriptBroadcaster()
+    for n, kind in enumerate(["partial", "final", "partial", "final"]):
+        broadcaster.publish("s", event(kind, n))
+
+    async def run():
+        subscription = broadcaster.subscribe("s", partials=False, last_event_id=0)
+        return await receive(subscription, 2), pending(subscription)
+
+    received, left = asyncio.run(run())
+    assert [item["n"] for item in received] == [1, 3]
+    assert left == 0
+
+
+def test_history_is_per_session_and_bounded():
+    broadcaster = TranscriptBroadcaster(history=3)
+    for n in range(6):
+        broadcaster.publish("a", event("final", n))
+        broadcaster.publish("b", event("final", 100 + n))
+
+    async def run():
+        subscription = broadcaster.subscribe("a", last_event_id=0)
+        return await receive(subscription, 3), pending(subscription)
+
+    received, left = asyncio.run(run())
+    assert [item["n"] for item in received] == [3, 4, 5]
+    assert left == 0
+
+
+def test_least_recently_active_histories_are_dropped():
+    broadcaster = TranscriptBroadcaster(max_sessions=2)
+    broadcaster.publish("a", event("final", 0))
+    broadcaster.publish("b", event("final", 0))
+    broadcaster.publish("a", event("final", 1))
+    broadcaster.publish("c", event("final", 0))
+    broadcaster.forget("c")
+
+    async def run():
+        return [pending(broadcaster.subscribe(session_id, last_event_id=0)) for session_id in "abc"]
+
+    assert asyncio.run(run()) == [2, 0, 0]
+
+
+def test_events_published_from_worker_threads_arrive_in_order():
+    broadcaster = TranscriptBroadcaster()
+
+    async def run():
+        subscription = broadcaster.subscribe("s")
+        worker = threading.Thread(target=lambda: [broadcaster.publish("s", event("final", n)) for n in range(20)])
+        worker.start()
+        received = await receive(subscription, 20)
+        worker.join()
+        broadcaster.unsubscribe(subscription)
+        return received
+
+    received = asyncio.run(run())
+    assert [item["n"] for item in received] == list(range(20))
+    assert broadcaster.stats()["subscribers"] == 0
@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+from media_player.vad_segmenter import VadSegmenter, SAMPLE_WIDTH
+
+SAMPLE_RATE = 16000
+FRAME_MS = 20
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+FRAME_BYTES = FRAME_SAMPLES * SAMPLE_WIDTH
+
+
+def loud(frame, sample_rate):
+    return np.abs(np.frombuffer(frame, dtype=np.int16)).max() > 1000
+
+
+def pcm(*sections):
+    """
+    int16 PCM from (kind, seconds) sections: "speech" is a loud tone,
+    "silence" is zeros.
+    """
+    parts = []
+    for kind, seconds in sections:
+        n = int(round(seconds * SAMPLE_RATE))
+        if kind == "speech":
+            parts.append((8000 * np.sin(np.arange(n) * 0.3)).astype(np.int16))
+        else:
+            parts.append(np.zeros(n, dtype=np.int16))
+    return np.concatenate(parts)
+
+
+def segmenter(**kwargs):
+    options = dict(sample_rate=SAMPLE_RATE, frame_duration_ms=FRAME_MS, is_speech=loud)
+    options.update(kwargs)
+    return VadSegmenter(**options)
+
+
+def run(seg, samples, block_bytes):
+    """
+    Feed `samples` in blocks of `block_bytes` and flush; returns (start
+    time, frames, PCM bytes) per chunk, copied as each is emitted.
+    """
+    data = samples.tobytes()
+    chunks = []
+
+    def keep(descriptor):
+        chunks.append((round(descriptor.start_time, 6), descriptor.length // FRAME_BYTES,
+                       bytes(seg.view(descriptor))))
+
+    for position in range(0, len(data), block_bytes):
+        for descriptor in seg.feed(data[position:position + block_bytes]):
+            keep(descriptor)
+    remaining = seg.flush()
+    if remaining is not None:
+        keep(remaining)
+    return chunks
+
+
+SPEECH = pcm(("speech", 1.0), ("silence", 0.2), ("speech", 3.0), ("silence", 0.5),
+             ("speech", 4.0), ("silence", 0.3), ("speech", 2.0))
+
+
+@pytest.mark.parametrize("block_bytes", [1, 7, FRAME_BYTES - 1, FRAME_BYTES, 3 * FRAME_BYTES + 5, 2048, 64000])
+def test_segments_do_not_depend_on_block_size(block_bytes):
+    expected = run(segmenter(), SPEECH, FRAME_BYTES)
+    assert run(segmenter(), SPEECH, block_bytes) == expected
+
+
+def test_feed_accepts_int16_arrays():
+    seg = segmenter()
+    chunks = []
+    for position in range(0, len(SPEECH), 1000):
+        chunks.extend((d.start_time, d.length) for d in seg.feed(SPEECH[position:position + 1000]))
+    last = seg.flush()
+    chunks.append((last.start_time, last.length))
+    expected = [(start, frames * FRAME_BYTES) for start, frames, _ in run(segmenter(), SPEECH, 4096)]
+    assert chunks == expected
+
+
+def test_silence_shorter_than_min_chunk_does_not_split():
+    chunks = run(segmenter(min_chunk_duration=3), pcm(("speech", 1.0), ("silence", 0.2), ("speech", 3.0),
+                                                     ("silence", 0.5)), 4096)
+    # The 0.2 s pause comes 1 s in, before the 3 s minimum; the chunk closes
+    # after 0.1 s (5 frames) of the final silence
+    assert [(start, frames) for start, frames, _ in chunks] == [(0.0, 215), (4.3, 20)]
+
+
+def test_max_chunk_duration_only_splits_at_silence():
+    chunks = run(segmenter(max_chunk_duration=5), pcm(("speech", 6.0), ("silence", 0.2)), 4096)
+    assert [(start, frames) for start, frames, _ in chunks] == [(0.0, 305), (6.1, 5)]
+
+
+def test_continuous_speech_is_force_split():
+    chunks = run(segmenter(force_split_duration=2), pcm(("speech", 7.0)), 4096)
+    assert [(start, frames) for start, frames, _ in chunks] == [(0.0, 100), (2.0, 100), (4.0, 100), (6.0, 50)]
+
+
+def test_flush_closes_the_open_chunk_and_drops_partial_frames():
+    seg = segmenter()
+    samples = pcm(("speech", 1.0))
+    assert seg.feed(samples.tobytes() + b"\x01\x02\x03") == []
+    descriptor = seg.flush()
+    assert descriptor.length == 50 * FRAME_BYTES
+    assert bytes(seg.view(descriptor)) == samples.tobytes()
+    assert seg.flush() is None
+
+
+def test_start_times_are_absolute():
+    seg = segmenter(force_split_duration=1, start_time=120.0)
+    chunks = run(seg, pcm(("speech", 2.5)), 4096)
+    assert [start for start, _, _ in chunks] == [120.0, 121.0, 122.0]
+
+    seg.reset(start_time=30.0)
+    chunks = run(seg, pcm(("speech", 1.5)), 4096)
+    assert [start for start, _, _ in chunks] == [30.0, 31.0]
+    assert seg.chunks_emitted == 2
+
+
+def test_ring_buffer_is_reused_without_copies():
+    seg = segmenter(force_split_duration=1, ring_chunks=2)
+    ring = seg._ring
+    data = pcm(("speech", 6.0)).tobytes()
+    descriptors = seg.feed(data)
+    assert len(descriptors) == 6
+    # Two chunk slots, used in turn
+    assert [d.offset for d in descriptors] == [0, seg.max_chunk_bytes] * 3
+    assert seg._ring is ring and len(ring) == 2 * seg.max_chunk_bytes
+
+    samples = seg.samples(descriptors[-1])
+    assert not samples.flags.owndata
+    assert np.shares_memory(samples, np.frombuffer(ring, dtype=np.int16))
+    assert samples.tobytes() == data[-len(samples) * SAMPLE_WIDTH:]
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+from retrieval.vector_index import VectorIndex, EXACT, IVF
+
+DIM = 32
+
+
+def clustered(n, clusters=16, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, DIM)).astype(np.float32)
+    labels = rng.integers(clusters, size=n)
+    return centers[labels] + 0.3 * rng.standard_normal((n, DIM)).astype(np.float32)
+
+
+def ids(hits):
+    return [hit["id"] for hit in hits]
+
+
+def test_exact_search_finds_the_vector_itself(tmp_path):
+    index = VectorIndex(str(tmp_path), dim=DIM)
+    vectors = clustered(500)
+    index.add(vectors)
+    for row in (0, 123, 499):
+        assert index.search(vectors[row], k=1)[0][0]["id"] == row
+
+
+def test_ivf_recall_against_exact(tmp_path):
+    vectors = clustered(4000)
+    queries = clustered(50, seed=1)
+    exact = VectorIndex(str(tmp_path / "exact"), dim=DIM)
+    ivf = VectorIndex(str(tmp_path / "ivf"), dim=DIM, mode=IVF, nlist=16, nprobe=4, train_size=2000)
+    exact.add(vectors)
+    ivf.add(vectors[:2500])
+    assert ivf.wait_trained(timeout=30)
+    ivf.add(vectors[2500:])
+    expected = [set(ids(hits)) for hits in exact.search(queries, k=10)]
+    found = [set(ids(hits)) for hits in ivf.search(queries, k=10)]
+    recall = np.mean([len(e & f) / len(e) for e, f in zip(expected, found)])
+    assert recall >= 0.9
+    assert ivf.stats()["trained"]
+
+
+def test_filters_and_delete(tmp_path):
+    index = VectorIndex(str(tmp_path), dim=DIM)
+    vectors = clustered(10)
+    index.add(vectors, speakers=["a", "b"] * 5, videos=["v"] * 10, starts=np.arange(10.0), ends=np.arange(10.0) + 1)
+    hits = index.search(vectors[0], k=10, speaker="b")[0]
+    assert {hit["speaker"] for hit in hits} == {"b"}
+    hits = index.search(vectors[0], k=10, start=2.5, end=4.5)[0]
+    assert sorted(hit["start"] for hit in hits) == [2.0, 3.0, 4.0]
+    index.delete([0])
+    assert 0 not in ids(index.search(vectors[0], k=10)[0])
+    assert len(index) == 9
+
+
+def test_reopen_keeps_vectors_payloads_and_training(tmp_path):
+    vectors = clustered(600)
+    index = VectorIndex(str(tmp_path), dim=DIM, mode=IVF, nlist=8, train_size=500, flush_interval=0)
+    index.add(vectors, videos=["v"] * 600, starts=np.zeros(600), ends=np.ones(600),
+              payloads=[{"row": row} for row in range(600)])
+    assert index.wait_trained(timeout=30)
+    index.close()
+
+    reopened = VectorIndex(str(tmp_path), nprobe=8)
+    assert (reopened.mode, reopened.nlist, reopened.count, reopened.trained) == (IVF, 8, 600, True)
+    hit = reopened.search(vectors[42], k=1)[0][0]
+    assert hit["id"] == 42
+    assert hit["payload"] == {"row": 42}
+    assert len(list(reopened.spans("v"))) == 600
+    assert list(reopened.spans("other")) == []
+
+
+def test_reopen_with_other_mode_converts(tmp_path):
+    vectors = clustered(600)
+    VectorIndex(str(tmp_path), dim=DIM, flush_interval=0).add(vectors)
+
+    ivf = VectorIndex(str(tmp_path), mode=IVF, nlist=8, train_size=500)
+    assert ivf.mode == IVF
+    assert ivf.wait_trained(timeout=30)
+    ivf.flush()
+
+    exact = VectorIndex(str(tmp_path), mode=EXACT)
+    assert (exact.mode, exact.trained) == (EXACT, False)
+    assert exact.search(vectors[7], k=1)[0][0]["id"] == 7
+
+
+def test_explicit_training_without_background(tmp_path):
+    index = VectorIndex(str(tmp_path), dim=DIM, mode=IVF, nlist=8, train_size=100, background_train=False)
+    index.add(clustered(300))
+    assert not index.trained
+    index.train()
+    assert index.trained
+
+
+def test_training_does_not_block_adds(tmp_path, monkeypatch):
+    import threading
+    import retrieval.vector_index as vector_index
+
+    release = threading.Event()
+    real_kmeans = vector_index.spherical_kmeans
+
+    def slow_kmeans(*args, **kwargs):
+        release.wait(10)
+        return real_kmeans(*args, **kwargs)
+
+    monkeypatch.setattr(vector_index, "spherical_kmeans", slow_kmeans)
+    index = VectorIndex(str(tmp_path), dim=DIM, mode=IVF, nlist=8, train_size=200)
+    vectors = clustered(400)
+    index.add(vectors[:200])
+    assert index.stats()["training"]
+    # Adds and searches go on while the centroids are being fitted
+    index.add(vectors[200:])
+    assert index.search(vectors[300], k=1)[0][0]["id"] == 300
+    release.set()
+    assert index.wait_trained(timeout=30)
+    assert index.search(vectors[300], k=1)[0][0]["id"] == 300
+    assert (np.asarray(index._columns["cluster"][:400]) >= 0).all()